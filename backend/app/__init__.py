@@ -1,13 +1,17 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.openapi.utils import get_openapi
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 from .core.config import get_settings
 from .core.logging import configure_logging, get_logger
-from .core.middleware import LoggingMiddleware
+from .core.middleware import LoggingMiddleware, ClientInfoMiddleware
 from .routes import api_router
 from .routes import health
+from .services.notification import notification_dispatcher
+from .services.export_jobs import export_job_queue
 
 settings = get_settings()
 
@@ -139,14 +143,25 @@ app = FastAPI(
     debug=settings.debug,
     docs_url="/docs",
     redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    default_response_class=ORJSONResponse
 )
 
 app.openapi = custom_openapi
 
+# Compress report-sized JSON bodies for clients talking to the API directly;
+# behind nginx the already-encoded response is passed through untouched.
+# Registered first so it wraps the app itself: outside LoggingMiddleware every
+# body arrives as a stream and minimum_size would never apply. Level 6 matches
+# nginx's gzip_comp_level and is much cheaper than the default 9
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=6)
+
 # Add logging middleware first
 app.add_middleware(LoggingMiddleware)
 
+# Parse client IP / user agent once per request
+app.add_middleware(ClientInfoMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -172,6 +187,14 @@ app.include_router(api_router, prefix="/api/v1")
 app.include_router(health.router, tags=["Health Check"])
 
 
+@app.on_event("startup")
+async def start_background_tasks():
+    """Start the health sampler, the notification dispatcher and the export workers"""
+    health.start_system_sampler()
+    notification_dispatcher.start()
+    export_job_queue.start()
+
+
 @app.get("/")
 def read_root():
     logger.info("Root endpoint accessed")
@@ -3,14 +3,16 @@ Enhanced authentication and authorization dependencies
 """
 
 from typing import Optional, List
+from dataclasses import dataclass
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timezone
 
 from app.core.database import get_db
-from app.core.security import verify_access_token, SecurityUtils
+from app.core.security import verify_access_token
 from app.core.rate_limiting import check_api_rate_limit
+from app.core.middleware import parse_client_info
 from app.models.user import User
 from app.crud.user import get_user_by_id, get_user_by_email
 
@@ -18,71 +20,156 @@ from app.crud.user import get_user_by_id, get_user_by_email
 security = HTTPBearer()
 
 
+@dataclass(slots=True)
+class Principal:
+    """
+    Authenticated user identity decoded from access token claims.
+    Mirrors the authorization helpers on the User model so routes can
+    authorize requests without loading the user row.
+    """
+    id: int
+    email: str
+    username: Optional[str]
+    full_name: Optional[str]
+    role: str
+    is_active: bool
+    is_verified: bool
+    
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        """Build a principal from a loaded User row"""
+        return cls(
+            id=user.id,
+            email=user.email,
+            username=user.username,
+            full_name=user.full_name,
+            role=user.role,
+            is_active=user.is_active,
+            is_verified=user.is_verified,
+        )
+    
+    def is_admin(self) -> bool:
+        """Check if user has admin role"""
+        return self.role == "admin"
+    
+    def can_access_user_data(self, target_user_id: int) -> bool:
+        """Check if user can access another user's data"""
+        return self.is_admin() or self.id == target_user_id
+
+
+# Claims added by create_tokens_for_user; tokens issued before they
+# existed fall back to a database lookup
+PRINCIPAL_CLAIMS = ("username", "is_active", "is_verified")
+
+
+def _get_token_payload(request: Request, credentials: HTTPAuthorizationCredentials) -> dict:
+    """Apply API rate limiting, then verify the bearer token and return its payload"""
+    check_api_rate_limit(request)
+    
+    try:
+        payload = verify_access_token(credentials.credentials)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials"
+        )
+    
+    if not payload.get("user_id") or not payload.get("email"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token payload"
+        )
+    
+    return payload
+
+
+def _load_user(db: Session, payload: dict) -> User:
+    """Load and check the user row referenced by a token payload"""
+    try:
+        user = get_user_by_id(db, user_id=int(payload["user_id"]))
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials"
+        )
+    
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+    
+    # Check if user is active
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User account is deactivated"
+        )
+    
+    # Check if user is locked due to failed login attempts
+    if user.locked_until and user.locked_until > datetime.now(timezone.utc):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User account is temporarily locked"
+        )
+    
+    return user
+
+
 async def get_current_user(
     request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-) -> User:
+) -> Principal:
     """
     Get current authenticated user with rate limiting and security checks
+    
+    The principal is built from the token claims, so no database query is
+    made. Deactivation takes effect when the token expires or is revoked;
+    use get_current_user_orm where the user row itself is needed.
     """
-    # Apply rate limiting for API requests
-    check_api_rate_limit(request)
+    payload = _get_token_payload(request, credentials)
     
-    # Verify token format and extract payload
-    token = credentials.credentials
+    if not all(claim in payload for claim in PRINCIPAL_CLAIMS):
+        return Principal.from_user(_load_user(db, payload))
     
-    try:
-        payload = verify_access_token(token)
-        user_id = payload.get("user_id")
-        email = payload.get("email")
-        
-        if not user_id or not email:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token payload"
-            )
-        
-        # Get user from database
-        user = get_user_by_id(db, user_id=int(user_id))
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found"
-            )
-        
-        # Check if user is active
-        if not user.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User account is deactivated"
-            )
-        
-        # Check if user is locked due to failed login attempts
-        if user.locked_until and user.locked_until > datetime.utcnow():
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User account is temporarily locked"
-            )
-        
-        # Update last login (optional, might be too frequent)
-        # user.last_login = datetime.utcnow()
-        # db.commit()
-        
-        return user
-        
-    except HTTPException:
-        raise
-    except Exception as e:
+    if not payload["is_active"]:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials"
+            detail="User account is deactivated"
         )
+    
+    return Principal(
+        id=int(payload["user_id"]),
+        email=payload["email"],
+        username=payload["username"],
+        full_name=payload.get("full_name"),
+        role=payload.get("role", "user"),
+        is_active=payload["is_active"],
+        is_verified=payload["is_verified"],
+    )
 
 
-def get_current_active_user(
-    current_user: User = Depends(get_current_user)
+def get_current_user_orm(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
 ) -> User:
+    """
+    Get current authenticated user row from the database
+    
+    For endpoints that read or modify profile fields not carried in the
+    token (profile details, password changes).
+    """
+    payload = _get_token_payload(request, credentials)
+    return _load_user(db, payload)
+
+
+def get_current_active_user(
+    current_user: Principal = Depends(get_current_user)
+) -> Principal:
     """
     Get current active user (additional check)
     """
@@ -95,8 +182,8 @@ def get_current_active_user(
 
 
 def get_current_admin_user(
-    current_user: User = Depends(get_current_active_user)
-) -> User:
+    current_user: Principal = Depends(get_current_active_user)
+) -> Principal:
     """
     Get current user and verify admin privileges
     """
@@ -109,8 +196,8 @@ def get_current_admin_user(
 
 
 def get_current_verified_user(
-    current_user: User = Depends(get_current_active_user)
-) -> User:
+    current_user: Principal = Depends(get_current_active_user)
+) -> Principal:
     """
     Get current user and verify email verification
     """
@@ -130,7 +217,7 @@ class PermissionChecker:
     def __init__(self, required_permissions: List[str] = None):
         self.required_permissions = required_permissions or []
     
-    def __call__(self, current_user: User = Depends(get_current_active_user)) -> User:
+    def __call__(self, current_user: Principal = Depends(get_current_active_user)) -> Principal:
         """
         Check if user has required permissions
         """
@@ -148,7 +235,7 @@ class PermissionChecker:
         
         return current_user
     
-    def _user_has_permission(self, user: User, permission: str) -> bool:
+    def _user_has_permission(self, user: Principal, permission: str) -> bool:
         """
         Check if user has specific permission
         Extend this method based on your permission system
@@ -184,8 +271,8 @@ class ResourceOwnerChecker:
     def __call__(
         self,
         resource_user_id: int,
-        current_user: User = Depends(get_current_active_user)
-    ) -> User:
+        current_user: Principal = Depends(get_current_active_user)
+    ) -> Principal:
         """
         Check if user can access resource
         """
@@ -230,7 +317,7 @@ async def get_optional_user(
     request: Request,
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
     db: Session = Depends(get_db)
-) -> Optional[User]:
+) -> Optional[Principal]:
     """
     Get current user if authenticated, otherwise return None
     Useful for optional authentication endpoints
@@ -246,11 +333,11 @@ async def get_optional_user(
 
 def get_client_info(request: Request) -> dict:
     """
-    Extract client information from request
+    Get client information computed by ClientInfoMiddleware,
+    parsing the headers directly if the middleware did not run
     """
-    return {
-        "ip_address": SecurityUtils.get_client_ip(request),
-        "user_agent": request.headers.get("User-Agent", "Unknown"),
-        "referer": request.headers.get("Referer"),
-        "accept_language": request.headers.get("Accept-Language"),
-    }
+    client_info = getattr(request.state, "client_info", None)
+    if client_info is None:
+        client_info = parse_client_info(request)
+        request.state.client_info = client_info
+    return client_info
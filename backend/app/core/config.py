@@ -5,6 +5,13 @@ from functools import lru_cache
 class Settings(BaseSettings):
     # Database
     database_url: str
+    # Per engine and worker process: the sync and async engines each get a pool,
+    # so a deployment opens up to 2 x (pool size + overflow) x workers
+    # connections; 80 with 4 workers, under PostgreSQL's default 100
+    db_pool_size: int = 5
+    db_max_overflow: int = 5
+    db_pool_timeout: int = 30  # seconds to wait for a free connection
+    db_pool_recycle: int = 3600  # seconds
     
     # JWT
     jwt_secret_key: str
@@ -12,6 +19,9 @@ class Settings(BaseSettings):
     jwt_access_token_expire_minutes: int = 30
     jwt_refresh_token_expire_days: int = 7
     
+    # Redis (shared FCM token store); empty uses a per-process store
+    redis_url: str = ""
+    
     # App
     app_name: str = "Expense Tracker API"
     app_version: str = "1.0.0"
@@ -35,6 +45,7 @@ class Settings(BaseSettings):
     create_thumbnails: bool = True
     compress_images: bool = True
     image_quality: int = 85
+    thumbnail_workers: int = 1  # image processes per API worker
 
     class Config:
         env_file = ".env"
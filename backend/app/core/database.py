@@ -1,19 +1,72 @@
 from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, sessionmaker
 from .config import get_settings
 
 settings = get_settings()
 
-engine = create_engine(settings.database_url)
+# asyncio driver used for each sync driver configured in DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_url(database_url: str):
+    """Return DATABASE_URL rewritten to use its asyncio driver"""
+    url = make_url(database_url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+
+# asyncpg keeps prepared statements per connection; sized for every query shape
+ASYNCPG_CONNECT_ARGS = {"statement_cache_size": 512, "prepared_statement_cache_size": 512}
+
+
+def get_engine_options(database_url: str):
+    """Engine keyword arguments shared by the sync and async engines
+
+    A compiled-statement cache large enough to hold every distinct query shape,
+    and (for server databases) a pool sized so probes cannot starve API requests.
+    """
+    options = dict(query_cache_size=1200, pool_pre_ping=True)
+    if make_url(database_url).get_backend_name() != "sqlite":
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+        )
+    return options
+
+
+engine = create_engine(settings.database_url, **get_engine_options(settings.database_url))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
+async_database_url = get_async_database_url(settings.database_url)
+async_engine = create_async_engine(
+    async_database_url,
+    connect_args=ASYNCPG_CONNECT_ARGS if async_database_url.get_driver_name() == "asyncpg" else {},
+    **get_engine_options(settings.database_url)
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+class Base(DeclarativeBase):
+    pass
 
 
 def get_db():
+    """One session per request; FastAPI caches it so every dependency shares it"""
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Async counterpart of get_db, returned to the pool when the request ends"""
+    async with AsyncSessionLocal() as db:
+        yield db
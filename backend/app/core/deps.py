@@ -1,43 +1,86 @@
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from jose import JWTError
-from ..core.database import get_db
-from ..core.security import verify_token
+from ..core.database import SessionLocal
+from ..core.security import verify_access_token, token_blacklist
+from ..core.auth_deps import Principal
 from ..crud import user as crud_user
-from ..models.user import User
 
 security = HTTPBearer()
 
+# Verified users keyed by raw access token: token -> (expires, jti, principal).
+# Repeat callers skip signature verification and the user lookup until the
+# entry expires; revoked tokens are still rejected via the blacklist check.
+CURRENT_USER_CACHE_TTL_SECONDS = 30
+CURRENT_USER_CACHE_MAX_SIZE = 10_000
+_current_user_cache: Dict[str, Tuple[float, Optional[str], Principal]] = {}
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+
+def _cached_principal(token: str) -> Optional[Principal]:
+    """Return the cached principal for a token if still fresh and not revoked"""
+    entry = _current_user_cache.get(token)
+    if entry is None:
+        return None
+
+    expires, jti, principal = entry
+    if time.time() >= expires or (jti and token_blacklist.is_blacklisted(jti)):
+        _current_user_cache.pop(token, None)
+        return None
+
+    return principal
+
+
+def _cache_principal(token: str, payload: dict, principal: Principal):
+    """Cache a principal, never beyond the token's own expiry"""
+    if len(_current_user_cache) >= CURRENT_USER_CACHE_MAX_SIZE:
+        # Evict the oldest entry (dicts keep insertion order)
+        _current_user_cache.pop(next(iter(_current_user_cache)), None)
+
+    expires = time.time() + CURRENT_USER_CACHE_TTL_SECONDS
+    if payload.get("exp"):
+        expires = min(expires, payload["exp"])
+    _current_user_cache[token] = (expires, payload.get("jti"), principal)
+
+
+def _load_principal(token: str) -> Principal:
+    """Verify a token and load its user; runs in a worker thread with its own session"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    try:
-        payload = verify_token(credentials.credentials)
-        if payload is None:
-            raise credentials_exception
-        
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-            
-    except JWTError:
+
+    payload = verify_access_token(token)
+
+    # Tokens carry the user's email as the subject
+    email: str = payload.get("sub")
+    if email is None:
         raise credentials_exception
-    
-    user = crud_user.get_user_by_username(db, username=username)
+
+    db = SessionLocal()
+    try:
+        user = crud_user.get_user_by_email(db, email=email)
+    finally:
+        db.close()
     if user is None:
         raise credentials_exception
-    
-    return user
+
+    principal = Principal.from_user(user)
+    _cache_principal(token, payload, principal)
+    return principal
+
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Principal:
+    # A cached principal is returned on the event loop: no session, no thread
+    token = credentials.credentials
+    principal = _cached_principal(token)
+    if principal is not None:
+        return principal
+
+    return await asyncio.to_thread(_load_principal, token)
 
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_active_user(current_user: Principal = Depends(get_current_user)) -> Principal:
     return current_user
@@ -2,30 +2,41 @@
 File upload and storage management
 """
 
+import asyncio
+import hashlib
 import os
 import uuid
 import aiofiles
 from typing import Optional, Dict, Any, List
 from pathlib import Path
-from PIL import Image, ImageOps
 import boto3
 from botocore.exceptions import ClientError, NoCredentialsError
 from fastapi import UploadFile, HTTPException, status
 import logging
 from datetime import datetime
 
+from app.core import thumbnailer
 from app.core.config import get_settings
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Uploads are copied in blocks of this size rather than read whole into memory
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def thumbnail_name(filename: str) -> str:
+    """Path of a stored receipt's thumbnail under thumbnails/ (same folder, ``thumb_`` prefix)"""
+    folder, _, name = filename.rpartition('/')
+    return f"{folder}/thumb_{name}" if folder else f"thumb_{name}"
+
 
 class StorageConfig:
     """Storage configuration management"""
     
     def __init__(self):
-        self.storage_type = getattr(settings, 'STORAGE_TYPE', 'local')  # 'local' or 's3'
-        self.max_file_size = getattr(settings, 'MAX_FILE_SIZE', 5 * 1024 * 1024)  # 5MB
+        self.storage_type = settings.storage_type  # 'local' or 's3'
+        self.max_file_size = settings.max_file_size
         self.allowed_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
         self.allowed_mime_types = [
             'image/jpeg', 'image/jpg', 'image/png', 
@@ -33,21 +44,22 @@ class StorageConfig:
         ]
         
         # Local storage settings
-        self.upload_dir = Path(getattr(settings, 'UPLOAD_DIR', 'storage/uploads'))
-        self.base_url = getattr(settings, 'BASE_URL', 'http://localhost:8000')
+        self.upload_dir = Path(settings.upload_dir)
+        self.base_url = settings.base_url
         
         # S3 settings
-        self.s3_bucket = getattr(settings, 'S3_BUCKET_NAME', '')
-        self.s3_region = getattr(settings, 'S3_REGION', 'us-east-1')
-        self.s3_access_key = getattr(settings, 'S3_ACCESS_KEY_ID', '')
-        self.s3_secret_key = getattr(settings, 'S3_SECRET_ACCESS_KEY', '')
-        self.s3_endpoint = getattr(settings, 'S3_ENDPOINT_URL', None)  # For S3-compatible services
+        self.s3_bucket = settings.s3_bucket_name
+        self.s3_region = settings.s3_region
+        self.s3_access_key = settings.s3_access_key_id
+        self.s3_secret_key = settings.s3_secret_access_key
+        self.s3_endpoint = settings.s3_endpoint_url or None  # For S3-compatible services
         
         # Image processing settings
-        self.create_thumbnails = getattr(settings, 'CREATE_THUMBNAILS', True)
+        self.create_thumbnails = settings.create_thumbnails
         self.thumbnail_size = (300, 300)
-        self.compress_images = getattr(settings, 'COMPRESS_IMAGES', True)
-        self.image_quality = getattr(settings, 'IMAGE_QUALITY', 85)
+        self.thumbnail_quality = 82
+        self.compress_images = settings.compress_images
+        self.image_quality = settings.image_quality
 
 
 class FileValidator:
@@ -97,56 +109,38 @@ class ImageProcessor:
     def __init__(self, config: StorageConfig):
         self.config = config
     
-    async def process_image(self, file_path: Path, original_filename: str) -> Dict[str, Any]:
-        """Process uploaded image (resize, compress, create thumbnail)"""
+    async def process_image(self, file_path: Path) -> Dict[str, Any]:
+        """
+        Compress an uploaded image in place and write its thumbnail
+        
+        Runs in the thumbnailer's process pool. The thumbnail goes under
+        thumbnails/ at the receipt's path in transactions/ (see ``thumbnail_name``).
+        """
+        if not (self.config.create_thumbnails or self.config.compress_images):
+            return {'processed': False}
+        
+        thumbnail_path = None
+        if self.config.create_thumbnails:
+            filename = file_path.relative_to(self.config.upload_dir / 'transactions').as_posix()
+            thumbnail_path = self.config.upload_dir / 'thumbnails' / thumbnail_name(filename)
+            thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
+        
         try:
-            # Open and process image
-            with Image.open(file_path) as img:
-                # Auto-rotate based on EXIF data
-                img = ImageOps.exif_transpose(img)
-                
-                # Convert to RGB if necessary (for JPEG compatibility)
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'P':
-                        img = img.convert('RGBA')
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
-                
-                # Create thumbnail if enabled
-                thumbnail_path = None
-                if self.config.create_thumbnails:
-                    thumbnail_path = file_path.parent / f"thumb_{file_path.name}"
-                    thumbnail = img.copy()
-                    thumbnail.thumbnail(self.config.thumbnail_size, Image.Resampling.LANCZOS)
-                    
-                    # Save thumbnail
-                    if self.config.compress_images:
-                        thumbnail.save(
-                            thumbnail_path, 
-                            format='JPEG', 
-                            quality=self.config.image_quality,
-                            optimize=True
-                        )
-                    else:
-                        thumbnail.save(thumbnail_path, format='JPEG')
-                
-                # Compress main image if enabled
-                if self.config.compress_images:
-                    img.save(
-                        file_path, 
-                        format='JPEG', 
-                        quality=self.config.image_quality,
-                        optimize=True
-                    )
-                
-                return {
-                    'processed': True,
-                    'thumbnail_path': thumbnail_path,
-                    'original_size': img.size,
-                    'thumbnail_size': self.config.thumbnail_size if thumbnail_path else None
-                }
-                
+            original_size = await thumbnailer.process_image(
+                str(file_path),
+                str(thumbnail_path) if thumbnail_path else None,
+                self.config.thumbnail_size,
+                self.config.thumbnail_quality,
+                self.config.image_quality if self.config.compress_images else None
+            )
+            
+            return {
+                'processed': True,
+                'thumbnail_path': thumbnail_path,
+                'original_size': original_size,
+                'thumbnail_size': self.config.thumbnail_size if thumbnail_path else None
+            }
+            
         except Exception as e:
             logger.error(f"Error processing image {file_path}: {e}")
             return {
@@ -170,30 +164,45 @@ class LocalStorage:
         (self.upload_dir / 'transactions').mkdir(exist_ok=True)
         (self.upload_dir / 'thumbnails').mkdir(exist_ok=True)
     
-    def generate_filename(self, original_filename: str, user_id: int) -> str:
-        """Generate unique filename"""
-        file_ext = Path(original_filename).suffix.lower()
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        unique_id = str(uuid.uuid4())[:8]
-        return f"user_{user_id}_{timestamp}_{unique_id}{file_ext}"
-    
     async def save_file(self, file: UploadFile, user_id: int, subfolder: str = 'transactions') -> Dict[str, Any]:
-        """Save file to local storage"""
+        """
+        Save file to local storage, named by its content in a folder per user
+        
+        The folder makes ownership part of the path (``<subfolder>/<user_id>/...``),
+        so serving a file needs no database lookup. Re-uploading a file the user already stored reuses the existing copy
+        (``created`` is False) instead of writing and processing it again.
+        """
+        tmp_path = self.upload_dir / subfolder / str(user_id) / f".upload_{uuid.uuid4().hex}.tmp"
         try:
-            # Generate unique filename
-            filename = self.generate_filename(file.filename, user_id)
-            file_path = self.upload_dir / subfolder / filename
-            
             # Ensure directory exists
-            file_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.parent.mkdir(parents=True, exist_ok=True)
             
-            # Save file
-            async with aiofiles.open(file_path, 'wb') as f:
-                content = await file.read()
-                await f.write(content)
+            # Copy in fixed-size blocks, hashing as it goes and stopping as soon
+            # as the limit is passed (the size is not always declared up front)
+            hasher = hashlib.blake2b(digest_size=16)
+            file_size = 0
+            async with aiofiles.open(tmp_path, 'wb') as f:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    file_size += len(chunk)
+                    if file_size > self.config.max_file_size:
+                        break
+                    hasher.update(chunk)
+                    await f.write(chunk)
+            
+            if file_size > self.config.max_file_size:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail={
+                        'success': False,
+                        'message': f"File exceeds maximum allowed size {self.config.max_file_size}"
+                    }
+                )
             
-            # Get file size
-            file_size = file_path.stat().st_size
+            filename = f"{user_id}/{hasher.hexdigest()}{Path(file.filename).suffix.lower()}"
+            file_path = self.upload_dir / subfolder / filename
+            created = not file_path.exists()
+            if created:
+                os.replace(tmp_path, file_path)
             
             # Generate URL
             file_url = f"{self.base_url}/storage/{subfolder}/{filename}"
@@ -204,15 +213,20 @@ class LocalStorage:
                 'file_path': str(file_path),
                 'file_url': file_url,
                 'file_size': file_size,
-                'original_filename': file.filename
+                'original_filename': file.filename,
+                'created': created
             }
             
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error saving file to local storage: {e}")
             return {
                 'success': False,
                 'error': str(e)
             }
+        finally:
+            tmp_path.unlink(missing_ok=True)
     
     async def delete_file(self, filename: str, subfolder: str = 'transactions') -> bool:
         """Delete file from local storage"""
@@ -222,7 +236,7 @@ class LocalStorage:
                 file_path.unlink()
                 
                 # Also delete thumbnail if exists
-                thumbnail_path = self.upload_dir / 'thumbnails' / f"thumb_{filename}"
+                thumbnail_path = self.upload_dir / 'thumbnails' / thumbnail_name(filename)
                 if thumbnail_path.exists():
                     thumbnail_path.unlink()
                 
@@ -280,19 +294,20 @@ class S3Storage:
             # Generate object key
             object_key = self.generate_key(file.filename, user_id, subfolder)
             
-            # Read file content
-            content = await file.read()
-            
-            # Upload to S3
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=object_key,
-                Body=content,
-                ContentType=file.content_type,
-                Metadata={
-                    'original-filename': file.filename,
-                    'user-id': str(user_id),
-                    'uploaded-at': datetime.now().isoformat()
+            # Upload straight from the spooled upload, in parts, off the event loop
+            await file.seek(0)
+            await asyncio.to_thread(
+                self.s3_client.upload_fileobj,
+                file.file,
+                self.bucket_name,
+                object_key,
+                ExtraArgs={
+                    'ContentType': file.content_type,
+                    'Metadata': {
+                        'original-filename': file.filename,
+                        'user-id': str(user_id),
+                        'uploaded-at': datetime.now().isoformat()
+                    }
                 }
             )
             
@@ -306,7 +321,7 @@ class S3Storage:
                 'filename': Path(object_key).name,
                 'object_key': object_key,
                 'file_url': file_url,
-                'file_size': len(content),
+                'file_size': file.size,
                 'original_filename': file.filename
             }
             
@@ -339,14 +354,22 @@ class FileUploadService:
         self.validator = FileValidator(self.config)
         self.image_processor = ImageProcessor(self.config)
         
+        # Stored files with a processing job running in this worker
+        self._processing: set = set()
+        
         # Initialize storage backend
         if self.config.storage_type == 's3':
             self.storage = S3Storage(self.config)
         else:
             self.storage = LocalStorage(self.config)
     
-    async def upload_transaction_receipt(self, file: UploadFile, user_id: int, transaction_id: int) -> Dict[str, Any]:
-        """Upload transaction receipt/proof"""
+    async def store_original(self, file: UploadFile, user_id: int) -> Dict[str, Any]:
+        """
+        Validate and store a transaction receipt/proof as uploaded
+        
+        Image processing is left to ``make_thumbnail``; ``file_path`` is set
+        when a new local file was written for it to process.
+        """
         
         # Validate file
         validation_result = self.validator.validate_file(file)
@@ -374,24 +397,10 @@ class FileUploadService:
                     }
                 )
             
-            # Process image if it's a local file and image processing is enabled
-            thumbnail_url = None
-            if (isinstance(self.storage, LocalStorage) and 
-                validation_result['content_type'].startswith('image/')):
-                
-                file_path = Path(save_result['file_path'])
-                process_result = await self.image_processor.process_image(
-                    file_path, save_result['original_filename']
-                )
-                
-                if process_result.get('thumbnail_path'):
-                    thumbnail_filename = Path(process_result['thumbnail_path']).name
-                    thumbnail_url = f"{self.config.base_url}/storage/thumbnails/{thumbnail_filename}"
-            
             return {
                 'success': True,
                 'file_url': save_result['file_url'],
-                'thumbnail_url': thumbnail_url,
+                'file_path': save_result['file_path'] if save_result.get('created') else None,
                 'filename': save_result['filename'],
                 'original_filename': save_result['original_filename'],
                 'file_size': save_result['file_size'],
@@ -411,6 +420,21 @@ class FileUploadService:
                 }
             )
     
+    async def make_thumbnail(self, file_path: str) -> None:
+        """Compress a stored image and write its thumbnail (run as a background task)"""
+        # Identical uploads racing each other can both queue a job for the same
+        # file; the one already running produces the same output
+        if file_path in self._processing:
+            return
+        
+        self._processing.add(file_path)
+        try:
+            result = await self.image_processor.process_image(Path(file_path))
+        finally:
+            self._processing.discard(file_path)
+        if result.get('error'):
+            logger.warning(f"Thumbnail not created for {file_path}: {result['error']}")
+    
     async def delete_transaction_receipt(self, filename: str, user_id: int) -> bool:
         """Delete transaction receipt"""
         try:
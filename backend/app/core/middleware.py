@@ -5,7 +5,8 @@ Logging middleware for FastAPI to add request ID and structured logging.
 import time
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from starlette.types import ASGIApp, Receive, Scope, Send
+from .security import SecurityUtils
 from .logging import (
     generate_request_id, 
     set_request_id, 
@@ -68,3 +69,32 @@ class LoggingMiddleware(BaseHTTPMiddleware):
             
             # Re-raise the exception
             raise
+
+
+class ClientInfoMiddleware:
+    """
+    Extract client information once per request and store it on
+    ``request.state.client_info`` so rate limiting, auth logging and
+    ``get_client_info`` all share the same parsed headers.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            request = Request(scope)
+            request.state.client_info = parse_client_info(request)
+        
+        await self.app(scope, receive, send)
+
+
+def parse_client_info(request: Request) -> dict:
+    """Build the client information dict from request headers"""
+    headers = request.headers
+    return {
+        "ip_address": SecurityUtils.get_client_ip(request),
+        "user_agent": headers.get("User-Agent", "Unknown"),
+        "referer": headers.get("Referer"),
+        "accept_language": headers.get("Accept-Language"),
+    }
@@ -177,6 +177,11 @@ class RateLimiter:
     
     def _get_client_ip(self, request: Request) -> str:
         """Get client IP address"""
+        # Reuse the IP resolved by ClientInfoMiddleware when available
+        client_info = getattr(request.state, "client_info", None)
+        if client_info:
+            return client_info["ip_address"]
+        
         forwarded_for = request.headers.get("X-Forwarded-For")
         if forwarded_for:
             return forwarded_for.split(",")[0].strip()
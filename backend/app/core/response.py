@@ -1,4 +1,7 @@
-from typing import Dict, Any, Optional
+import hashlib
+from typing import Dict, Any, Mapping, Optional
+from fastapi import Request, Response, status
+from fastapi.responses import ORJSONResponse
 
 
 def create_response(
@@ -36,6 +39,67 @@ def success_response(message: str = "", data: Any = None, meta: Optional[Dict[st
     return create_response("success", message, data, meta)
 
 
+def json_success_response(
+    message: str = "",
+    data: Any = None,
+    meta: Optional[Dict[str, Any]] = None,
+    status_code: int = status.HTTP_200_OK,
+    headers: Optional[Mapping[str, str]] = None
+) -> ORJSONResponse:
+    """
+    Create a success response encoded once with orjson
+    
+    Skips FastAPI's response_model validation and jsonable_encoder pass.
+    ``data`` must already be plain Python (``model_dump()`` pydantic models);
+    datetimes, enums and UUIDs are handled natively by orjson.
+    """
+    return ORJSONResponse(
+        create_response("success", message, data, meta),
+        status_code=status_code,
+        headers=headers
+    )
+
+
 def error_response(message: str = "", data: Any = None):
     """Create error response"""
     return create_response("error", message, data)
+
+
+def weak_etag(*parts: Any) -> str:
+    """
+    Build a weak ETag from the values that identify a representation
+    
+    Callers pass cheap version markers (ids, ``updated_at`` timestamps)
+    rather than the serialized body, so the tag is known before any
+    serialization happens.
+    """
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def not_modified_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    cache_control: str = "private, no-cache"
+) -> Optional[Response]:
+    """
+    Apply conditional GET handling for a precomputed ETag
+    
+    Sets ``ETag`` and ``Cache-Control`` on the outgoing response and returns
+    a bodiless 304 response when the client's ``If-None-Match`` already
+    matches, so the caller can skip serialization entirely.
+    
+    Returns:
+        A 304 Response to return as-is, or None to continue normally
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {tag.strip() for tag in if_none_match.split(",")}
+        if etag in candidates or "*" in candidates:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    response.headers.update(headers)
+    return None
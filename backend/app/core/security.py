@@ -196,7 +196,10 @@ def create_tokens_for_user(user_data: Dict[str, Any]) -> Dict[str, str]:
         "email": user_data.get("email"),
         "user_id": user_data.get("id"),
         "role": user_data.get("role", "user"),
-        "full_name": user_data.get("full_name")
+        "full_name": user_data.get("full_name"),
+        "username": user_data.get("username"),
+        "is_active": user_data.get("is_active", True),
+        "is_verified": user_data.get("is_verified", False)
     }
     
     # Create tokens
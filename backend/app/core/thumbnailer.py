@@ -0,0 +1,108 @@
+"""
+Receipt image processing in worker processes
+
+Resizing and re-encoding is CPU-bound and holds the GIL for most of its run,
+so even from a thread it stalls the event loop. It runs in a process pool
+instead, one per API worker, started on first use.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from .config import get_settings
+
+_POOL: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        # Every API worker has its own pool, so it stays small to leave the
+        # cores to request handling. Workers are spawned rather than forked
+        # from the API process, which is already running threads
+        _POOL = ProcessPoolExecutor(
+            max_workers=get_settings().thumbnail_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _POOL
+
+
+def _process(
+    file_path: str,
+    thumbnail_path: Optional[str],
+    thumbnail_size: Tuple[int, int],
+    thumbnail_quality: int,
+    image_quality: Optional[int]
+) -> Tuple[int, int]:
+    """Runs in a pool worker; returns the image size after EXIF rotation"""
+    with Image.open(file_path) as img:
+        # Without a full-size re-encode a JPEG only needs decoding at the
+        # smallest DCT scale that still covers the thumbnail
+        if image_quality is None:
+            img.draft('RGB', thumbnail_size)
+
+        # Auto-rotate based on EXIF data
+        img = ImageOps.exif_transpose(img)
+
+        # Convert to RGB if necessary (for JPEG compatibility)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            if img.mode == 'P':
+                img = img.convert('RGBA')
+            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+            img = background
+
+        original_size = img.size
+
+        # Written aside and swapped in so the file is never served half-written
+        if image_quality is not None:
+            tmp_path = f"{file_path}.tmp"
+            img.save(tmp_path, format='JPEG', quality=image_quality, optimize=True)
+            os.replace(tmp_path, file_path)
+
+        # The main image is saved, so the thumbnail can shrink it in place
+        # rather than from a full-size copy. Swapped in like the main image, as
+        # its existence is what tells the API the thumbnail is ready
+        if thumbnail_path is not None:
+            img.thumbnail(thumbnail_size, Image.Resampling.LANCZOS)
+            tmp_path = f"{thumbnail_path}.tmp"
+            img.save(
+                tmp_path,
+                format='JPEG',
+                quality=thumbnail_quality,
+                optimize=True,
+                progressive=True
+            )
+            os.replace(tmp_path, thumbnail_path)
+
+        return original_size
+
+
+async def process_image(
+    file_path: str,
+    thumbnail_path: Optional[str],
+    thumbnail_size: Tuple[int, int],
+    thumbnail_quality: int,
+    image_quality: Optional[int] = None
+) -> Tuple[int, int]:
+    """
+    Re-encode ``file_path`` at ``image_quality`` (if given) and write its
+    thumbnail to ``thumbnail_path`` (if given), in the process pool
+    """
+    global _POOL
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            _get_pool(), _process,
+            file_path, thumbnail_path, thumbnail_size, thumbnail_quality, image_quality
+        )
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); the next job gets a fresh pool
+        _POOL = None
+        raise
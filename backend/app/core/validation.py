@@ -11,6 +11,38 @@ from fastapi import HTTPException, status
 from pydantic import BaseModel, ValidationError
 
 
+# Password character-class checks, compiled once at import
+_LOWERCASE_RE = re.compile(r"[a-z]")
+_UPPERCASE_RE = re.compile(r"[A-Z]")
+_DIGIT_RE = re.compile(r"\d")
+_SPECIAL_CHAR_RE = re.compile(r"[!@#$%^&*()_+\-=\[\]{};':\"\\|,.<>\/?]")
+
+# Common weak passwords, matched in a single pass over the lowercased password
+WEAK_PASSWORD_PATTERNS = (
+    "123456",
+    "password",
+    "qwerty",
+    "abc123",
+    "admin",
+    "letmein",
+)
+_WEAK_PASSWORD_RE = re.compile("|".join(map(re.escape, WEAK_PASSWORD_PATTERNS)))
+
+# Script injection attempts removed by sanitize_string, applied in order
+_DANGEROUS_PATTERNS = tuple(
+    re.compile(pattern, re.IGNORECASE | re.DOTALL)
+    for pattern in (
+        r'<script[^>]*>.*?</script>',
+        r'javascript:',
+        r'on\w+\s*=',
+        r'<iframe[^>]*>.*?</iframe>',
+    )
+)
+
+_CATEGORY_NAME_RE = re.compile(r'^[a-zA-Z0-9\s\-_&]+$')
+_HEX_COLOR_RE = re.compile(r'^#[0-9A-Fa-f]{6}$')
+
+
 class ValidationError(Exception):
     """Custom validation error"""
     def __init__(self, message: str, field: str = None):
@@ -24,9 +56,9 @@ class InputValidator:
     
     @staticmethod
     def validate_email_format(email: str) -> bool:
-        """Validate email format using email-validator library"""
+        """Validate email format using email-validator library (syntax only, no DNS lookup)"""
         try:
-            validate_email(email)
+            validate_email(email, check_deliverability=False)
             return True
         except EmailNotValidError:
             return False
@@ -45,32 +77,21 @@ class InputValidator:
         if len(password) > 128:
             errors.append("Password must not exceed 128 characters")
         
-        if not re.search(r"[a-z]", password):
+        if not _LOWERCASE_RE.search(password):
             errors.append("Password must contain at least one lowercase letter")
         
-        if not re.search(r"[A-Z]", password):
+        if not _UPPERCASE_RE.search(password):
             errors.append("Password must contain at least one uppercase letter")
         
-        if not re.search(r"\d", password):
+        if not _DIGIT_RE.search(password):
             errors.append("Password must contain at least one digit")
         
-        if not re.search(r"[!@#$%^&*()_+\-=\[\]{};':\"\\|,.<>\/?]", password):
+        if not _SPECIAL_CHAR_RE.search(password):
             errors.append("Password must contain at least one special character")
         
         # Check for common weak passwords
-        weak_patterns = [
-            r"123456",
-            r"password",
-            r"qwerty",
-            r"abc123",
-            r"admin",
-            r"letmein"
-        ]
-        
-        for pattern in weak_patterns:
-            if re.search(pattern, password.lower()):
-                errors.append("Password contains common weak patterns")
-                break
+        if _WEAK_PASSWORD_RE.search(password.lower()):
+            errors.append("Password contains common weak patterns")
         
         return len(errors) == 0, errors
     
@@ -172,16 +193,9 @@ class InputValidator:
             return str(value)
         
         # Remove potential script injection attempts
-        dangerous_patterns = [
-            r'<script[^>]*>.*?</script>',
-            r'javascript:',
-            r'on\w+\s*=',
-            r'<iframe[^>]*>.*?</iframe>',
-        ]
-        
         sanitized = value
-        for pattern in dangerous_patterns:
-            sanitized = re.sub(pattern, '', sanitized, flags=re.IGNORECASE | re.DOTALL)
+        for pattern in _DANGEROUS_PATTERNS:
+            sanitized = pattern.sub('', sanitized)
         
         # Trim whitespace
         sanitized = sanitized.strip()
@@ -205,7 +219,7 @@ class InputValidator:
             errors.extend(name_errors)
             
             # Check for valid characters in category name
-            if not re.match(r'^[a-zA-Z0-9\s\-_&]+$', category_data['name']):
+            if not _CATEGORY_NAME_RE.match(category_data['name']):
                 errors.append("Category name contains invalid characters")
         
         if 'type' in category_data:
@@ -216,7 +230,7 @@ class InputValidator:
         
         if 'color' in category_data and category_data['color']:
             # Color validation (hex color)
-            if not re.match(r'^#[0-9A-Fa-f]{6}$', category_data['color']):
+            if not _HEX_COLOR_RE.match(category_data['color']):
                 errors.append("Color must be a valid hex color code (e.g., #FF0000)")
         
         return errors
@@ -1,31 +1,56 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from ..models.category import Category
 from ..schemas.category import CategoryCreate, CategoryUpdate
 
 
-def get_category(db: Session, category_id: int) -> Optional[Category]:
-    return db.query(Category).filter(Category.id == category_id).first()
+async def get_category(db: AsyncSession, category_id: int, user_id: int) -> Optional[Category]:
+    """A category by id, only if it belongs to ``user_id``"""
+    return await db.scalar(
+        select(Category).where(Category.user_id == user_id, Category.id == category_id)
+    )
 
 
-def get_categories(db: Session, skip: int = 0, limit: int = 100) -> List[Category]:
-    return db.query(Category).offset(skip).limit(limit).all()
+async def get_categories(db: AsyncSession, user_id: int, after_id: Optional[int] = None, limit: int = 100) -> List[Category]:
+    """Keyset page of a user's categories ordered by id, starting after ``after_id``"""
+    stmt = select(Category).where(Category.user_id == user_id)
+    if after_id is not None:
+        stmt = stmt.where(Category.id > after_id)
+    result = await db.scalars(stmt.order_by(Category.id).limit(limit))
+    return list(result)
 
 
-def get_categories_by_type(db: Session, category_type: str) -> List[Category]:
-    return db.query(Category).filter(Category.type == category_type).all()
+async def get_category_cursor_for_offset(db: AsyncSession, user_id: int, skip: int) -> Optional[int]:
+    """Translate a legacy ``skip`` offset into the equivalent keyset cursor"""
+    return await db.scalar(
+        select(Category.id)
+        .where(Category.user_id == user_id)
+        .order_by(Category.id)
+        .offset(skip - 1)
+        .limit(1)
+    )
 
 
-def create_category(db: Session, category: CategoryCreate) -> Category:
-    db_category = Category(**category.dict())
+async def get_categories_by_type(db: AsyncSession, category_type: str) -> List[Category]:
+    result = await db.scalars(select(Category).where(Category.type == category_type))
+    return list(result)
+
+
+# Writes load server-generated columns before committing: the commit is the last
+# statement, so the connection is back in the pool before the response is sent
+# (the session keeps attribute values because expire_on_commit is off).
+async def create_category(db: AsyncSession, category: CategoryCreate, user_id: int) -> Category:
+    db_category = Category(**category.dict(), user_id=user_id)
     db.add(db_category)
-    db.commit()
-    db.refresh(db_category)
+    await db.flush()
+    await db.refresh(db_category)
+    await db.commit()
     return db_category
 
 
-def update_category(db: Session, category_id: int, category_update: CategoryUpdate) -> Optional[Category]:
-    db_category = get_category(db, category_id)
+async def update_category(db: AsyncSession, category_id: int, user_id: int, category_update: CategoryUpdate) -> Optional[Category]:
+    db_category = await get_category(db, category_id, user_id)
     if not db_category:
         return None
     
@@ -33,16 +58,17 @@ def update_category(db: Session, category_id: int, category_update: CategoryUpda
     for field, value in update_data.items():
         setattr(db_category, field, value)
     
-    db.commit()
-    db.refresh(db_category)
+    await db.flush()
+    await db.refresh(db_category)
+    await db.commit()
     return db_category
 
 
-def delete_category(db: Session, category_id: int) -> bool:
-    db_category = get_category(db, category_id)
+async def delete_category(db: AsyncSession, category_id: int, user_id: int) -> bool:
+    db_category = await get_category(db, category_id, user_id)
     if not db_category:
         return False
     
-    db.delete(db_category)
-    db.commit()
+    await db.delete(db_category)
+    await db.commit()
     return True
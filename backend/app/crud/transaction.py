@@ -1,12 +1,16 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
-from typing import List, Optional
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import func, delete, insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, List, Optional, Tuple
 from datetime import date
 from decimal import Decimal
 from ..models.transaction import Transaction
 from ..models.category import Category
 from ..schemas.transaction import TransactionCreate, TransactionUpdate, TransactionFilter, TransactionSummary
 
+# Rows fetched per round trip when streaming
+STREAM_BATCH_SIZE = 500
+
 
 class TransactionCRUD:
     def get_by_id(self, db: Session, transaction_id: int) -> Optional[Transaction]:
@@ -20,113 +24,216 @@ class TransactionCRUD:
             db.commit()
             db.refresh(db_transaction)
         return db_transaction
+    
+    def update_if_owned(
+        self, db: Session, transaction_id: int, user_id: int, is_admin: bool, values: dict
+    ) -> Optional[Transaction]:
+        """Update a transaction the user owns (any, for admins) in one UPDATE ... RETURNING"""
+        stmt = update(Transaction).where(Transaction.id == transaction_id)
+        if not is_admin:
+            stmt = stmt.where(Transaction.user_id == user_id)
+        db_transaction = db.scalar(stmt.values(**values).returning(Transaction))
+        if db_transaction is not None:
+            # Detached so the commit does not expire the returned row
+            db.expunge(db_transaction)
+        db.commit()
+        return db_transaction
+    
+    def attachment_in_use(
+        self, db: Session, user_id: int, attachment_url: str, exclude_id: Optional[int] = None
+    ) -> bool:
+        """Whether another of the user's transactions still links to ``attachment_url``"""
+        stmt = select(Transaction.id).where(
+            Transaction.user_id == user_id, Transaction.attachment_url == attachment_url
+        )
+        if exclude_id is not None:
+            stmt = stmt.where(Transaction.id != exclude_id)
+        return db.scalar(stmt.limit(1)) is not None
 
 
 transaction_crud = TransactionCRUD()
 
 
-def get_transaction(db: Session, transaction_id: int) -> Optional[Transaction]:
-    return db.query(Transaction).filter(Transaction.id == transaction_id).first()
+def _select_transaction():
+    # Responses embed the category, and AsyncSession cannot lazy-load it later
+    return select(Transaction).options(joinedload(Transaction.category))
 
 
-def get_transactions(
-    db: Session, 
-    user_id: int,
-    skip: int = 0, 
-    limit: int = 100,
-    filters: Optional[TransactionFilter] = None
-) -> List[Transaction]:
-    query = db.query(Transaction).filter(Transaction.user_id == user_id)
+def _select_transactions():
+    # Pages load their categories in one IN query, each distinct category once,
+    # instead of repeating the category columns (and joining twice when
+    # filtering by category type) on every row
+    return select(Transaction).options(selectinload(Transaction.category))
+
+
+async def get_transaction(db: AsyncSession, transaction_id: int) -> Optional[Transaction]:
+    return await db.scalar(_select_transaction().where(Transaction.id == transaction_id))
+
+
+async def get_transaction_date(db: AsyncSession, transaction_id: int) -> Optional[date]:
+    # Column only, so no Transaction is loaded into the session ahead of a write
+    return await db.scalar(select(Transaction.trans_date).where(Transaction.id == transaction_id))
+
+
+def _filter_transactions(stmt, user_id: int, filters: Optional[TransactionFilter]):
+    # Equality predicates first, then the date range, matching the column order
+    # of the (user_id, category_id, trans_date, id) index
+    conditions = [Transaction.user_id == user_id]
     
     if filters:
-        if filters.start_date:
-            query = query.filter(Transaction.trans_date >= filters.start_date)
-        if filters.end_date:
-            query = query.filter(Transaction.trans_date <= filters.end_date)
         if filters.category_id:
-            query = query.filter(Transaction.category_id == filters.category_id)
+            conditions.append(Transaction.category_id == filters.category_id)
         if filters.category_type:
-            query = query.join(Category).filter(Category.type == filters.category_type)
+            stmt = stmt.join(Category, Transaction.category_id == Category.id)
+            conditions.append(Category.type == filters.category_type)
+        if filters.start_date:
+            conditions.append(Transaction.trans_date >= filters.start_date)
+        if filters.end_date:
+            conditions.append(Transaction.trans_date <= filters.end_date)
+    
+    return stmt.where(*conditions)
+
+
+def _list_transactions(user_id: int, filters: Optional[TransactionFilter], before: Optional[Tuple[date, int]]):
+    stmt = _filter_transactions(_select_transactions(), user_id, filters)
+    if before is not None:
+        stmt = stmt.where(tuple_(Transaction.trans_date, Transaction.id) < before)
+    return stmt.order_by(Transaction.trans_date.desc(), Transaction.id.desc())
+
+
+async def get_transactions(
+    db: AsyncSession, 
+    user_id: int,
+    skip: int = 0, 
+    limit: int = 100,
+    filters: Optional[TransactionFilter] = None,
+    before: Optional[Tuple[date, int]] = None
+) -> List[Transaction]:
+    """
+    A page of a user's transactions, newest first
     
-    return query.order_by(Transaction.trans_date.desc()).offset(skip).limit(limit).all()
+    With ``before`` (the ``(trans_date, id)`` of the last row already seen)
+    the page is found by an index seek and ``skip`` is ignored.
+    """
+    stmt = _list_transactions(user_id, filters, before)
+    if before is None:
+        stmt = stmt.offset(skip)
+    result = await db.scalars(stmt.limit(limit))
+    return list(result)
+
+
+async def stream_transactions(
+    db: AsyncSession,
+    user_id: int,
+    filters: Optional[TransactionFilter] = None,
+    before: Optional[Tuple[date, int]] = None
+) -> AsyncIterator[Transaction]:
+    """Every matching transaction in list order, read from a server-side cursor in batches"""
+    result = await db.stream_scalars(
+        _list_transactions(user_id, filters, before).execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+    async for transaction in result:
+        yield transaction
 
 
-def create_transaction(db: Session, transaction: TransactionCreate, user_id: int) -> Transaction:
-    db_transaction = Transaction(**transaction.dict(), user_id=user_id)
+async def count_transactions(db: AsyncSession, user_id: int, filters: Optional[TransactionFilter] = None) -> int:
+    """Number of transactions matching ``filters``, counted in the database"""
+    stmt = _filter_transactions(select(func.count(Transaction.id)), user_id, filters)
+    return await db.scalar(stmt)
+
+
+async def _reload(db: AsyncSession, db_transaction: Transaction) -> Transaction:
+    """Flush pending changes and re-read server-set columns and the category in one query"""
+    await db.flush()
+    return await db.scalar(
+        _select_transaction()
+        .where(Transaction.id == db_transaction.id)
+        .execution_options(populate_existing=True)
+    )
+
+
+# As for categories, writes load what the response needs before committing so
+# the connection is back in the pool before the response is sent.
+async def create_transaction(db: AsyncSession, transaction: TransactionCreate, user_id: int) -> Transaction:
+    db_transaction = Transaction(**transaction.model_dump(), user_id=user_id)
     db.add(db_transaction)
-    db.commit()
-    db.refresh(db_transaction)
+    db_transaction = await _reload(db, db_transaction)
+    await db.commit()
     return db_transaction
 
 
-def update_transaction(
-    db: Session, 
+async def create_transactions(db: AsyncSession, transactions: List[TransactionCreate], user_id: int) -> List[int]:
+    """Insert a batch in one multi-row INSERT ... RETURNING; ids come back in input order"""
+    result = await db.scalars(
+        insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True),
+        [{**transaction.model_dump(), "user_id": user_id} for transaction in transactions]
+    )
+    ids = list(result)
+    await db.commit()
+    return ids
+
+
+async def update_transaction(
+    db: AsyncSession, 
     transaction_id: int, 
     transaction_update: TransactionUpdate,
     user_id: int
 ) -> Optional[Transaction]:
-    db_transaction = db.query(Transaction).filter(
-        and_(Transaction.id == transaction_id, Transaction.user_id == user_id)
-    ).first()
-    
-    if not db_transaction:
-        return None
+    update_data = transaction_update.model_dump(exclude_unset=True)
+    if not update_data:
+        db_transaction = await get_transaction(db, transaction_id)
+        return db_transaction if db_transaction and db_transaction.user_id == user_id else None
     
-    update_data = transaction_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_transaction, field, value)
-    
-    db.commit()
-    db.refresh(db_transaction)
+    # Ownership check, write and re-read of server-set columns in one UPDATE ... RETURNING
+    db_transaction = await db.scalar(
+        update(Transaction)
+        .where(Transaction.id == transaction_id, Transaction.user_id == user_id)
+        .values(**update_data)
+        .returning(Transaction)
+        .options(selectinload(Transaction.category))
+    )
+    await db.commit()
     return db_transaction
 
 
-def delete_transaction(db: Session, transaction_id: int, user_id: int) -> bool:
-    db_transaction = db.query(Transaction).filter(
-        and_(Transaction.id == transaction_id, Transaction.user_id == user_id)
-    ).first()
-    
-    if not db_transaction:
-        return False
-    
-    db.delete(db_transaction)
-    db.commit()
-    return True
+async def delete_transaction(db: AsyncSession, transaction_id: int, user_id: int) -> Optional[date]:
+    """Delete an owned transaction; returns its date, or None if there was none to delete"""
+    trans_date = await db.scalar(
+        delete(Transaction)
+        .where(Transaction.id == transaction_id, Transaction.user_id == user_id)
+        .returning(Transaction.trans_date)
+    )
+    await db.commit()
+    return trans_date
 
 
-def get_transaction_summary(
-    db: Session, 
+async def get_transaction_summary(
+    db: AsyncSession, 
     user_id: int,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None
 ) -> TransactionSummary:
-    query = db.query(
-        func.sum(Transaction.amount).label('total_amount'),
-        Category.type
-    ).join(Category).filter(Transaction.user_id == user_id)
+    # One row of conditional aggregates; the arithmetic stays in the database
+    stmt = select(
+        func.coalesce(func.sum(Transaction.amount).filter(Category.type == 'income'), 0).label('total_income'),
+        func.coalesce(func.sum(Transaction.amount).filter(Category.type == 'expense'), 0).label('total_expense'),
+        func.count(Transaction.id).label('transaction_count')
+    ).join(Category).where(Transaction.user_id == user_id)
     
     if start_date:
-        query = query.filter(Transaction.trans_date >= start_date)
+        stmt = stmt.where(Transaction.trans_date >= start_date)
     if end_date:
-        query = query.filter(Transaction.trans_date <= end_date)
-    
-    results = query.group_by(Category.type).all()
-    
-    total_income = Decimal('0')
-    total_expense = Decimal('0')
-    
-    for total_amount, category_type in results:
-        if category_type == 'income':
-            total_income = total_amount or Decimal('0')
-        elif category_type == 'expense':
-            total_expense = total_amount or Decimal('0')
+        stmt = stmt.where(Transaction.trans_date <= end_date)
     
-    balance = total_income - total_expense
+    total_income, total_expense, transaction_count = (await db.execute(stmt)).one()
+    total_income = Decimal(total_income)
+    total_expense = Decimal(total_expense)
     
     return TransactionSummary(
         total_income=total_income,
         total_expense=total_expense,
-        balance=balance,
+        balance=total_income - total_expense,
+        transaction_count=transaction_count,
         period_start=start_date,
         period_end=end_date
     )
@@ -4,14 +4,18 @@ Enhanced CRUD operations for user management with role-based access
 
 from typing import Optional, List
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from datetime import datetime
+from sqlalchemy import and_, or_, select, exists
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from datetime import datetime, timezone
 
 from ..models.user import User
-from ..schemas.user import UserCreate, UserUpdate, UserRoleUpdate
+from ..schemas.user import UserCreate, UserUpdate, UserRoleUpdate, UserRow, USER_ROW_FIELDS
 from ..core.security import password_security, get_password_hash, verify_password
 from ..core.validation import InputValidator
 
+# Columns selected for admin listings, in UserRow field order
+_USER_ROW_COLUMNS = tuple(getattr(User, field) for field in USER_ROW_FIELDS)
+
 
 def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
     """Get user by ID"""
@@ -40,11 +44,14 @@ def get_users(
     role: Optional[str] = None,
     is_active: Optional[bool] = None,
     search: Optional[str] = None
-) -> List[User]:
+) -> List[UserRow]:
     """
     Get users with filtering options (admin only)
+    
+    Selects only the listed columns and builds slotted UserRow instances
+    instead of hydrating full ORM objects.
     """
-    query = db.query(User)
+    query = db.query(*_USER_ROW_COLUMNS)
     
     # Apply filters
     if role:
@@ -63,7 +70,7 @@ def get_users(
             )
         )
     
-    return query.offset(skip).limit(limit).all()
+    return [UserRow(*row) for row in query.order_by(User.id).offset(skip).limit(limit).all()]
 
 
 def get_users_count(
@@ -95,26 +102,54 @@ def get_users_count(
 
 
 def create_user(db: Session, user: UserCreate) -> User:
-    """Create new user with enhanced security"""
+    """
+    Create new user with enhanced security
+
+    Uses a single INSERT ... ON CONFLICT DO NOTHING RETURNING so the happy
+    path costs one round trip. When nothing is returned a unique constraint
+    fired, and one follow-up query reports which field conflicted.
+
+    Raises:
+        ValueError: If the email or username is already registered
+    """
     
     # Hash password using enhanced security
     hashed_password = get_password_hash(user.password)
     
-    # Create user instance with new fields
-    db_user = User(
-        username=user.username,
-        email=user.email,
-        password_hash=hashed_password,
-        full_name=getattr(user, 'full_name', None),
-        role="user",  # Default role
-        is_active=True,
-        is_verified=False,  # Require email verification
-        failed_login_attempts=0
+    stmt = (
+        pg_insert(User)
+        .values(
+            username=user.username,
+            email=user.email,
+            password_hash=hashed_password,
+            full_name=getattr(user, 'full_name', None),
+            role="user",  # Default role
+            is_active=True,
+            is_verified=False,  # Require email verification
+            failed_login_attempts=0
+        )
+        .on_conflict_do_nothing()
+        .returning(User)
     )
     
-    db.add(db_user)
+    db_user = db.scalars(stmt).first()
+    
+    if db_user is None:
+        email_taken, username_taken = db.execute(
+            select(
+                exists().where(User.email == user.email),
+                exists().where(User.username == user.username)
+            )
+        ).one()
+        db.rollback()
+        
+        if email_taken:
+            raise ValueError("User with this email already exists")
+        if username_taken:
+            raise ValueError("Username already taken")
+        raise ValueError("User could not be created")
+    
     db.commit()
-    db.refresh(db_user)
     
     return db_user
 
@@ -132,9 +167,6 @@ def update_user(db: Session, user_id: int, user_update: UserUpdate) -> Optional[
         if hasattr(user, field):
             setattr(user, field, value)
     
-    if hasattr(user, 'updated_at'):
-        user.updated_at = datetime.utcnow()
-    
     db.commit()
     db.refresh(user)
     
@@ -155,8 +187,6 @@ def update_user_role(db: Session, user_id: int, role_update: UserRoleUpdate, cur
         raise ValueError("Cannot change your own admin role")
     
     user.role = role_update.role
-    if hasattr(user, 'updated_at'):
-        user.updated_at = datetime.utcnow()
     
     db.commit()
     db.refresh(user)
@@ -178,8 +208,6 @@ def deactivate_user(db: Session, user_id: int, current_user: User) -> Optional[U
         raise ValueError("Cannot deactivate your own account")
     
     user.is_active = False
-    if hasattr(user, 'updated_at'):
-        user.updated_at = datetime.utcnow()
     
     db.commit()
     db.refresh(user)
@@ -201,8 +229,6 @@ def activate_user(db: Session, user_id: int, current_user: User) -> Optional[Use
         user.failed_login_attempts = 0
     if hasattr(user, 'locked_until'):
         user.locked_until = None
-    if hasattr(user, 'updated_at'):
-        user.updated_at = datetime.utcnow()
     
     db.commit()
     db.refresh(user)
@@ -223,8 +249,6 @@ def reset_user_failed_attempts(db: Session, user_id: int, current_user: User) ->
         user.failed_login_attempts = 0
     if hasattr(user, 'locked_until'):
         user.locked_until = None
-    if hasattr(user, 'updated_at'):
-        user.updated_at = datetime.utcnow()
     
     db.commit()
     db.refresh(user)
@@ -235,7 +259,7 @@ def reset_user_failed_attempts(db: Session, user_id: int, current_user: User) ->
 def update_user_login_info(db: Session, user: User, client_info: dict = None):
     """Update user login information"""
     if hasattr(user, 'last_login'):
-        user.last_login = datetime.utcnow()
+        user.last_login = datetime.now(timezone.utc)
     if hasattr(user, 'failed_login_attempts'):
         user.failed_login_attempts = 0
     if hasattr(user, 'locked_until'):
@@ -1,9 +1,15 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, BigInteger
+from datetime import datetime
+from typing import List, Optional, TYPE_CHECKING
+from sqlalchemy import Integer, String, DateTime, Enum, ForeignKey
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from ..core.database import Base
 import enum
 
+if TYPE_CHECKING:
+    from .transaction import Transaction
+    from .user import User
+
 
 class CategoryType(str, enum.Enum):
     income = "income"
@@ -13,18 +19,18 @@ class CategoryType(str, enum.Enum):
 class Category(Base):
     __tablename__ = "categories"
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    name = Column(String(80), nullable=False)
-    type = Column(Enum(CategoryType), nullable=False)
-    icon = Column(String(10), nullable=True)  # Emoji or icon identifier
-    color = Column(String(7), nullable=True)  # Hex color code
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String(80), nullable=False)
+    type: Mapped[CategoryType] = mapped_column(Enum(CategoryType), nullable=False)
+    icon: Mapped[Optional[str]] = mapped_column(String(10), nullable=True)  # Emoji or icon identifier
+    color: Mapped[Optional[str]] = mapped_column(String(7), nullable=True)  # Hex color code
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     # Relationships
-    user = relationship("User", back_populates="categories")
-    transactions = relationship("Transaction", back_populates="category")
+    user: Mapped["User"] = relationship(back_populates="categories")
+    transactions: Mapped[List["Transaction"]] = relationship(back_populates="category")
     
     def __repr__(self):
         return f"<Category(id={self.id}, name={self.name}, type={self.type}, user_id={self.user_id})>"
@@ -1,29 +1,36 @@
-from sqlalchemy import Column, Integer, String, DateTime, BigInteger, ForeignKey, Date, DECIMAL, Text
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional, TYPE_CHECKING
+from sqlalchemy import Integer, String, DateTime, ForeignKey, Date, DECIMAL, Text
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from ..core.database import Base
 
+if TYPE_CHECKING:
+    from .category import Category
+    from .user import User
+
 
 class Transaction(Base):
     __tablename__ = "transactions"
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
-    amount = Column(DECIMAL(12, 2), nullable=False)
-    description = Column(String(255), nullable=True)
-    trans_date = Column(Date, nullable=False, index=True)
-    type = Column(String(10), nullable=False)  # "income" or "expense"
-    attachment_url = Column(String(500), nullable=True)  # URL to receipt/proof image
-    attachment_filename = Column(String(255), nullable=True)  # Original filename
-    attachment_size = Column(Integer, nullable=True)  # File size in bytes
-    notes = Column(Text, nullable=True)  # Additional notes
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    category_id: Mapped[int] = mapped_column(Integer, ForeignKey("categories.id"), nullable=False)
+    amount: Mapped[Decimal] = mapped_column(DECIMAL(12, 2), nullable=False)
+    description: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    trans_date: Mapped[date] = mapped_column(Date, nullable=False, index=True)
+    type: Mapped[str] = mapped_column(String(10), nullable=False)  # "income" or "expense"
+    attachment_url: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)  # URL to receipt/proof image
+    attachment_filename: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)  # Original filename
+    attachment_size: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # File size in bytes
+    notes: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # Additional notes
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     # Relationships
-    user = relationship("User", back_populates="transactions")
-    category = relationship("Category", back_populates="transactions")
+    user: Mapped["User"] = relationship(back_populates="transactions")
+    category: Mapped["Category"] = relationship(back_populates="transactions")
     
     def __repr__(self):
         return f"<Transaction(id={self.id}, amount={self.amount}, type={self.type}, user_id={self.user_id})>"
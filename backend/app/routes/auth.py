@@ -1,24 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from dataclasses import asdict
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 from ..core.database import get_db
-from ..core.response import success_response, error_response
+from ..core.response import json_success_response, error_response, not_modified_response
 from ..core.rate_limiting import check_login_rate_limit, check_register_rate_limit
 from ..core.validation import validate_request_data, InputValidator
 from ..core.security import create_tokens_for_user, verify_access_token, password_security, jwt_manager
-from ..core.auth_deps import get_current_user, get_current_admin_user, get_client_info
+from ..core.auth_deps import get_current_user_orm, get_current_admin_user, get_client_info, Principal
 from ..core.logging import get_logger, log_authentication_event, log_business_event
 from ..schemas.user import (
     UserCreate, UserLogin, UserProfile, UserLoginResponse, 
     TokenRefresh, PasswordResetRequest, UserRoleUpdate
 )
 from ..crud.user import (
-    create_user, get_user_by_email, get_user_by_username, update_user_login_info,
+    create_user, get_user_by_email, update_user_login_info,
     get_users, get_users_count, update_user_role
 )
 from ..models.user import User
-from ..schemas.openapi import *
 
 router = APIRouter(tags=["Authentication"])
 logger = get_logger("auth")
@@ -152,31 +152,19 @@ def register_user(
     # Additional validation
     validate_request_data(user_data.dict(), "user_register")
     
-    # Check if user already exists
-    existing_user = get_user_by_email(db, email=user_data.email)
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail={
-                "success": False,
-                "message": "User with this email already exists"
-            }
-        )
-    
-    existing_username = get_user_by_username(db, username=user_data.username)
-    if existing_username:
+    try:
+        # Create user; uniqueness is enforced by the INSERT itself
+        user = create_user(db, user_data)
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={
                 "success": False,
-                "message": "Username already taken"
+                "message": str(e)
             }
         )
     
     try:
-        # Create user
-        user = create_user(db, user_data)
-        
         # Log successful registration
         log_authentication_event(
             event_type="user_registration",
@@ -195,7 +183,7 @@ def register_user(
         )
         
         # Return user profile (no sensitive data)
-        user_profile = UserProfile.from_orm(user)
+        user_profile = UserProfile.model_validate(user)
         
         logger.info(
             "User registered successfully",
@@ -204,9 +192,10 @@ def register_user(
             username=user.username
         )
         
-        return success_response(
+        return json_success_response(
             message="User registered successfully. Please verify your email.",
-            data=user_profile.dict()
+            data=user_profile.model_dump(),
+            status_code=status.HTTP_201_CREATED
         )
         
     except Exception as e:
@@ -371,6 +360,9 @@ def login(
     # Get client information for security logging
     client_info = get_client_info(request)
     
+    # Single timezone-aware timestamp for lock checks and login bookkeeping
+    now = datetime.now(timezone.utc)
+    
     try:
         # Get user by email
         user = get_user_by_email(db, email=login_data.email)
@@ -394,7 +386,7 @@ def login(
             )
         
         # Check if account is locked
-        if user.locked_until and user.locked_until > datetime.utcnow():
+        if user.locked_until and user.locked_until > now:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail={
@@ -429,7 +421,7 @@ def login(
             
             # Lock account if too many failed attempts (5 attempts)
             if user.failed_login_attempts >= 5:
-                user.locked_until = datetime.utcnow() + timedelta(minutes=30)
+                user.locked_until = now + timedelta(minutes=30)
                 user.failed_login_attempts = 0  # Reset counter
                 
                 log_authentication_event(
@@ -453,7 +445,7 @@ def login(
         # Successful login - reset failed attempts and update login info
         user.failed_login_attempts = 0
         user.locked_until = None
-        user.last_login = datetime.utcnow()
+        user.last_login = now
         db.commit()
         
         # Log successful login
@@ -479,18 +471,20 @@ def login(
             "email": user.email,
             "role": user.role,
             "username": user.username,
-            "full_name": user.full_name
+            "full_name": user.full_name,
+            "is_active": user.is_active,
+            "is_verified": user.is_verified
         }
         
         tokens = create_tokens_for_user(user_data)
         
         # Prepare response with user profile
-        user_profile = UserProfile.from_orm(user)
+        user_profile = UserProfile.model_validate(user)
         
         response_data = {
             **tokens,
             "expires_in": 1800,  # 30 minutes in seconds
-            "user": user_profile.dict()
+            "user": user_profile.model_dump()
         }
         
         logger.info(
@@ -500,7 +494,7 @@ def login(
             username=user.username
         )
         
-        return success_response(
+        return json_success_response(
             message="Login successful",
             data=response_data
         )
@@ -564,7 +558,7 @@ def refresh_token(
         # Verify refresh token and create new access token
         new_tokens = jwt_manager.refresh_access_token(refresh_data.refresh_token)
         
-        return success_response(
+        return json_success_response(
             message="Token refreshed successfully",
             data={
                 **new_tokens,
@@ -593,6 +587,9 @@ def refresh_token(
     **Authentication Required:** Yes (Bearer token)
     
     **Returns:** Complete user profile including role and permissions
+    
+    **Caching:** Responses carry a weak `ETag`; send it back in
+    `If-None-Match` to receive `304 Not Modified` while the profile is unchanged
     """,
     responses={
         200: {
@@ -617,20 +614,37 @@ def refresh_token(
                 }
             }
         },
+        304: {
+            "description": "Profile unchanged since the ETag sent in If-None-Match"
+        },
         401: {
             "description": "Unauthorized - Invalid or missing token"
         }
     }
 )
 def get_current_user_profile(
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user_orm)
 ):
     """Get current user profile"""
+    # Weak validator: any profile change bumps updated_at
+    updated_at = current_user.updated_at or current_user.created_at
+    version = int(updated_at.timestamp()) if updated_at else 0
+    etag = f'W/"{current_user.id}-{version}"'
+    
+    not_modified = not_modified_response(
+        request, response, etag, cache_control="private, max-age=10"
+    )
+    if not_modified is not None:
+        return not_modified
+    
     user_profile = UserProfile.from_orm(current_user)
     
-    return success_response(
+    return json_success_response(
         message="User profile retrieved successfully",
-        data=user_profile.dict()
+        data=user_profile.model_dump(),
+        headers=response.headers
     )
 
 
@@ -669,7 +683,7 @@ def get_all_users(
     is_active: Optional[bool] = None,
     search: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Get all users with filtering (admin only)"""
     
@@ -700,10 +714,10 @@ def get_all_users(
     
     pages = (total + per_page - 1) // per_page
     
-    # Convert to profile format
-    users_data = [UserProfile.from_orm(user).dict() for user in users]
+    # Rows are already in profile shape
+    users_data = [asdict(user) for user in users]
     
-    return success_response(
+    return json_success_response(
         message="Users retrieved successfully",
         data={
             "users": users_data,
@@ -748,7 +762,7 @@ def update_user_role_endpoint(
     user_id: int,
     role_update: UserRoleUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: Principal = Depends(get_current_admin_user)
 ):
     """Update user role (admin only)"""
     try:
@@ -762,11 +776,11 @@ def update_user_role_endpoint(
                 }
             )
         
-        user_profile = UserProfile.from_orm(user)
+        user_profile = UserProfile.model_validate(user)
         
-        return success_response(
+        return json_success_response(
             message=f"User role updated to {role_update.role}",
-            data=user_profile.dict()
+            data=user_profile.model_dump()
         )
         
     except ValueError as e:
@@ -1,18 +1,9 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from fastapi.responses import RedirectResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from ..core.database import get_db
-from ..core.response import success_response
-from ..core.deps import get_current_active_user
-from ..schemas.category import Category, CategoryCreate, CategoryUpdate
-from ..schemas.user import User
-from ..services.category import CategoryService
-
-from fastapi import APIRouter, Depends, Query, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from ..core.database import get_db
-from ..core.response import success_response
+from ..core.database import get_async_db
+from ..core.response import json_success_response, not_modified_response, weak_etag
 from ..core.deps import get_current_active_user
 from ..schemas.category import Category, CategoryCreate, CategoryUpdate
 from ..schemas.user import User
@@ -28,13 +19,15 @@ router = APIRouter(tags=["Categories"])
     Retrieve all categories for the authenticated user.
     
     **Features:**
-    - Pagination support with skip and limit parameters
+    - Cursor (keyset) pagination with after_id and limit parameters
     - Returns categories with icons and colors
     - Filtered by user ownership
+    - ETag / If-None-Match support (304 Not Modified when the page is unchanged)
     
     **Query Parameters:**
-    - `skip`: Number of records to skip (for pagination)
-    - `limit`: Maximum number of records to return
+    - `after_id`: Return categories after this id (use `next_cursor` from the previous page)
+    - `limit`: Maximum number of records to return (max 500)
+    - `skip`: Deprecated; redirects (301) to the equivalent `after_id` cursor
     
     **Authentication Required:** Yes (Bearer token)
     """,
@@ -46,44 +39,78 @@ router = APIRouter(tags=["Categories"])
                     "example": {
                         "success": True,
                         "message": "Categories retrieved successfully",
-                        "data": [
-                            {
-                                "id": 1,
-                                "name": "Food",
-                                "type": "expense",
-                                "icon": "🍔",
-                                "color": "#EF4444",
-                                "user_id": 1
-                            },
-                            {
-                                "id": 2,
-                                "name": "Salary",
-                                "type": "income",
-                                "icon": "💰",
-                                "color": "#10B981",
-                                "user_id": 1
-                            }
-                        ]
+                        "data": {
+                            "items": [
+                                {
+                                    "id": 1,
+                                    "name": "Food",
+                                    "type": "expense",
+                                    "icon": "🍔",
+                                    "color": "#EF4444",
+                                    "user_id": 1
+                                },
+                                {
+                                    "id": 2,
+                                    "name": "Salary",
+                                    "type": "income",
+                                    "icon": "💰",
+                                    "color": "#10B981",
+                                    "user_id": 1
+                                }
+                            ],
+                            "next_cursor": None
+                        }
                     }
                 }
             }
         },
+        301: {
+            "description": "Legacy skip parameter redirected to the after_id cursor form"
+        },
+        304: {
+            "description": "Page unchanged since the ETag sent in If-None-Match"
+        },
         401: {
             "description": "Unauthorized - Invalid or missing token"
         }
     }
 )
-def get_categories(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+async def get_categories(
+    request: Request,
+    response: Response,
+    after_id: Optional[int] = Query(None, ge=0, description="Cursor: return categories with id greater than this"),
+    limit: int = Query(100, ge=1, le=500),
+    skip: Optional[int] = Query(None, ge=0, deprecated=True, description="Deprecated offset; redirects to after_id"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get all categories"""
-    categories = CategoryService.get_categories(db, skip=skip, limit=limit)
-    return success_response(
+    if skip:
+        # Legacy offset pagination: redirect to the equivalent cursor
+        cursor = await CategoryService.get_cursor_for_offset(db, current_user.id, skip)
+        if cursor is not None:
+            url = request.url.remove_query_params("skip").include_query_params(after_id=cursor)
+            return RedirectResponse(str(url), status_code=status.HTTP_301_MOVED_PERMANENTLY)
+        
+        return json_success_response(
+            message="Categories retrieved successfully",
+            data={"items": [], "next_cursor": None}
+        )
+    
+    page = await CategoryService.get_categories(db, current_user.id, after_id=after_id, limit=limit)
+    
+    etag = weak_etag(
+        current_user.id, after_id, page["next_cursor"],
+        *(f"{item['id']}:{item['updated_at']}" for item in page["items"])
+    )
+    not_modified = not_modified_response(request, response, etag)
+    if not_modified is not None:
+        return not_modified
+    
+    return json_success_response(
         message="Categories retrieved successfully",
-        data=categories
+        data=page,
+        headers=response.headers
     )
 
 
@@ -97,6 +124,9 @@ def get_categories(
     **Path Parameters:**
     - `category_id`: The unique identifier of the category
     
+    Send the returned `ETag` back in `If-None-Match` to receive `304 Not Modified`
+    while the category is unchanged.
+    
     **Authentication Required:** Yes (Bearer token)
     """,
     responses={
@@ -130,21 +160,35 @@ def get_categories(
                 }
             }
         },
+        304: {
+            "description": "Category unchanged since the ETag sent in If-None-Match"
+        },
         401: {
             "description": "Unauthorized - Invalid or missing token"
         }
     }
 )
-def get_category(
+async def get_category(
     category_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get a specific category"""
-    category = CategoryService.get_category(db, category_id)
-    return success_response(
+    category = await CategoryService.get_category(db, category_id, current_user.id)
+    
+    etag = weak_etag(category.id, category.updated_at)
+    not_modified = not_modified_response(
+        request, response, etag, cache_control="private, max-age=30"
+    )
+    if not_modified is not None:
+        return not_modified
+    
+    return json_success_response(
         message="Category retrieved successfully",
-        data=category
+        data=Category.model_validate(category).model_dump(),
+        headers=response.headers
     )
 
 
@@ -218,16 +262,17 @@ def get_category(
         }
     }
 )
-def create_category(
+async def create_category(
     category: CategoryCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Create a new category"""
-    db_category = CategoryService.create_category(db, category)
-    return success_response(
+    db_category = await CategoryService.create_category(db, category, current_user.id)
+    return json_success_response(
         message="Category created successfully",
-        data=db_category
+        data=Category.model_validate(db_category).model_dump(),
+        status_code=status.HTTP_201_CREATED
     )
 
 
@@ -301,17 +346,17 @@ def create_category(
         }
     }
 )
-def update_category(
+async def update_category(
     category_id: int,
     category: CategoryUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Update a category"""
-    db_category = CategoryService.update_category(db, category_id, category)
-    return success_response(
+    db_category = await CategoryService.update_category(db, category_id, current_user.id, category)
+    return json_success_response(
         message="Category updated successfully",
-        data=db_category
+        data=Category.model_validate(db_category).model_dump()
     )
 
 
@@ -374,13 +419,13 @@ def update_category(
         }
     }
 )
-def delete_category(
+async def delete_category(
     category_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Delete a category"""
-    CategoryService.delete_category(db, category_id)
-    return success_response(
+    await CategoryService.delete_category(db, category_id, current_user.id)
+    return json_success_response(
         message="Category deleted successfully"
     )
@@ -2,14 +2,16 @@
 Health check and monitoring endpoints for the expense tracker API.
 """
 
+import asyncio
 import psutil
 import time
 from datetime import datetime, timedelta
 from typing import Dict, Any, List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import text
-from ..core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import BigInteger, cast, column, func, select, table, text
+from ..core.database import AsyncSessionLocal, get_async_db
 from ..core.logging import get_logger
 from ..models.user import User
 from ..models.transaction import Transaction
@@ -18,67 +20,193 @@ from ..models.category import Category
 router = APIRouter()
 logger = get_logger("health")
 
+# Connectivity probe, built once and reused (its compiled form is cached by the engine)
+_PING = text("SELECT 1")
+
+# Pre-encoded probe bodies; only the timestamp is substituted per request
+_HEALTHZ_TEMPLATE = b'{"status":"healthy","timestamp":"%s","version":"1.0.0"}'
+_LIVE_TEMPLATE = b'{"status":"alive","timestamp":"%s"}'
+
+# Response timestamps have one-second resolution, so format them once per second
+_ts_sec = -1
+_ts_str = ""
+_ts_bytes = b""
+
+# Prometheus exposition body; %d for counters/byte sizes, %g for percentages
+_METRICS_TEMPLATE = (
+    b"# HELP expense_tracker_users_total Total number of registered users\n"
+    b"# TYPE expense_tracker_users_total counter\n"
+    b"expense_tracker_users_total %d\n"
+    b"\n"
+    b"# HELP expense_tracker_users_active Number of active users\n"
+    b"# TYPE expense_tracker_users_active gauge\n"
+    b"expense_tracker_users_active %d\n"
+    b"\n"
+    b"# HELP expense_tracker_transactions_total Total number of transactions\n"
+    b"# TYPE expense_tracker_transactions_total counter\n"
+    b"expense_tracker_transactions_total %d\n"
+    b"\n"
+    b"# HELP expense_tracker_categories_total Total number of categories\n"
+    b"# TYPE expense_tracker_categories_total counter\n"
+    b"expense_tracker_categories_total %d\n"
+    b"\n"
+    b"# HELP expense_tracker_transactions_24h Transactions created in last 24 hours\n"
+    b"# TYPE expense_tracker_transactions_24h gauge\n"
+    b"expense_tracker_transactions_24h %d\n"
+    b"\n"
+    b"# HELP expense_tracker_active_users_24h Users active in last 24 hours\n"
+    b"# TYPE expense_tracker_active_users_24h gauge\n"
+    b"expense_tracker_active_users_24h %d\n"
+    b"\n"
+    b"# HELP expense_tracker_system_memory_percent Memory usage percentage\n"
+    b"# TYPE expense_tracker_system_memory_percent gauge\n"
+    b"expense_tracker_system_memory_percent %g\n"
+    b"\n"
+    b"# HELP expense_tracker_system_disk_percent Disk usage percentage\n"
+    b"# TYPE expense_tracker_system_disk_percent gauge\n"
+    b"expense_tracker_system_disk_percent %g\n"
+    b"\n"
+    b"# HELP expense_tracker_system_cpu_percent CPU usage percentage\n"
+    b"# TYPE expense_tracker_system_cpu_percent gauge\n"
+    b"expense_tracker_system_cpu_percent %g\n"
+    b"\n"
+    b"# HELP expense_tracker_system_memory_available_bytes Available memory in bytes\n"
+    b"# TYPE expense_tracker_system_memory_available_bytes gauge\n"
+    b"expense_tracker_system_memory_available_bytes %d\n"
+    b"\n"
+    b"# HELP expense_tracker_system_disk_free_bytes Free disk space in bytes\n"
+    b"# TYPE expense_tracker_system_disk_free_bytes gauge\n"
+    b"expense_tracker_system_disk_free_bytes %d\n"
+)
+METRICS_MEDIA_TYPE = "text/plain; version=0.0.4"  # Starlette appends "; charset=utf-8"
+
+# Rendered /metrics body, reused until it expires (time.monotonic seconds)
+METRICS_CACHE_TTL_SECONDS = 10
+_METRICS_CACHE = {"body": b"", "expires": 0.0}
+
+# System resource readings, refreshed by a background task so handlers never
+# make psutil syscalls. psutil.cpu_percent(interval=None) reports usage since
+# its previous call, so the sampling interval is also the CPU averaging window.
+SYSTEM_SAMPLE_INTERVAL_SECONDS = 2
+_SYSTEM_STATS = {"cpu_percent": 0.0, "memory": None, "disk": None}
+_system_sampler_task = None
+
+# Prime the non-blocking CPU counter so the first sample is meaningful
+psutil.cpu_percent(interval=None)
+
+
+def _read_system_stats():
+    """Read CPU, memory and disk usage into _SYSTEM_STATS (blocking syscalls)"""
+    _SYSTEM_STATS["memory"] = psutil.virtual_memory()
+    _SYSTEM_STATS["disk"] = psutil.disk_usage('/')
+    _SYSTEM_STATS["cpu_percent"] = psutil.cpu_percent(interval=None)
+
+
+async def _sample_system_forever():
+    """Refresh _SYSTEM_STATS every SYSTEM_SAMPLE_INTERVAL_SECONDS off the event loop"""
+    while True:
+        await asyncio.sleep(SYSTEM_SAMPLE_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(_read_system_stats)
+        except Exception as e:
+            logger.error("System stats sampling failed", error=str(e), exc_info=e)
+
+
+def start_system_sampler():
+    """Start the background system sampler (call once from app startup)"""
+    global _system_sampler_task
+    if _system_sampler_task is None or _system_sampler_task.done():
+        _read_system_stats()
+        _system_sampler_task = asyncio.create_task(_sample_system_forever())
+    return _system_sampler_task
+
+
+def _now_iso() -> str:
+    """Current UTC time as an ISO-8601 string, re-formatted at most once per second"""
+    global _ts_sec, _ts_str, _ts_bytes
+    now = int(time.time())
+    if now != _ts_sec:
+        _ts_str = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now))
+        _ts_bytes = _ts_str.encode()
+        _ts_sec = now
+    return _ts_str
+
+
+def _now_iso_bytes() -> bytes:
+    """_now_iso() pre-encoded for the byte-template probes"""
+    _now_iso()
+    return _ts_bytes
+
+
+def _get_system_stats():
+    """Return the last sampled (cpu_percent, virtual_memory, disk_usage)"""
+    if _SYSTEM_STATS["memory"] is None:
+        # Sampler not started (e.g. app used without its startup hooks)
+        _read_system_stats()
+    
+    return _SYSTEM_STATS["cpu_percent"], _SYSTEM_STATS["memory"], _SYSTEM_STATS["disk"]
+
 
 @router.get(
     "/healthz",
     summary="Health check endpoint",
     description="Basic health check endpoint for load balancers and monitoring systems",
     tags=["Health Check"],
-    response_model=dict
+    response_class=Response
 )
 async def health_check():
     """Basic health check endpoint"""
-    return {
-        "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat() + "Z",
-        "version": "1.0.0"
-    }
+    return Response(content=_HEALTHZ_TEMPLATE % _now_iso_bytes(), media_type="application/json")
 
 
-@router.get(
-    "/health",
-    summary="Detailed health check",
-    description="Detailed health check with system and database status",
-    tags=["Health Check"],
-    response_model=dict
-)
-async def detailed_health_check(db: Session = Depends(get_db)):
-    """Detailed health check with dependencies"""
-    start_time = time.time()
-    
-    health_data = {
-        "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat() + "Z",
-        "version": "1.0.0",
-        "checks": {}
-    }
-    
-    # Database health check
+def _count(model, *criteria):
+    """Exact COUNT(*) of a model's table as a scalar subquery"""
+    return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
+
+
+def _estimated_count(model):
+    """Planner row estimate from pg_class.reltuples as a scalar subquery (PostgreSQL only)"""
+    return select(
+        func.greatest(cast(column("reltuples"), BigInteger), 0)
+    ).select_from(table("pg_class")).where(
+        column("relname") == model.__tablename__
+    ).scalar_subquery()
+
+
+def _table_total(db: AsyncSession, model, exact: bool):
+    """Row total for a model, estimated unless exact is requested or the database is not PostgreSQL"""
+    if exact or db.bind.dialect.name != "postgresql":
+        return _count(model)
+    return _estimated_count(model)
+
+
+async def _db_check(db: AsyncSession):
+    """Database connectivity check"""
     try:
         db_start = time.time()
-        result = db.execute(text("SELECT 1")).scalar()
+        result = (await db.execute(_PING)).scalar()
         db_duration = (time.time() - db_start) * 1000
         
-        health_data["checks"]["database"] = {
+        return "database", {
             "status": "healthy" if result == 1 else "unhealthy",
             "response_time_ms": round(db_duration, 2)
         }
     except Exception as e:
         logger.error("Database health check failed", error=str(e), exc_info=e)
-        health_data["checks"]["database"] = {
+        return "database", {
             "status": "unhealthy",
             "error": str(e)
         }
-        health_data["status"] = "degraded"
-    
-    # System resources check
+
+
+async def _sys_check():
+    """System resources check from the background sampler's readings"""
     try:
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
+        cpu_percent, memory, disk = _get_system_stats()
         
-        health_data["checks"]["system"] = {
+        check = {
             "status": "healthy",
-            "cpu_percent": psutil.cpu_percent(interval=0.1),
+            "cpu_percent": cpu_percent,
             "memory_percent": memory.percent,
             "disk_percent": disk.percent,
             "memory_available_mb": round(memory.available / 1024 / 1024, 2),
@@ -87,29 +215,38 @@ async def detailed_health_check(db: Session = Depends(get_db)):
         
         # Mark as degraded if resources are high
         if memory.percent > 90 or disk.percent > 90:
-            health_data["checks"]["system"]["status"] = "degraded"
-            health_data["status"] = "degraded"
-            
+            check["status"] = "degraded"
+        
+        return "system", check
     except Exception as e:
         logger.error("System health check failed", error=str(e), exc_info=e)
-        health_data["checks"]["system"] = {
+        return "system", {
             "status": "unhealthy",
             "error": str(e)
         }
-        health_data["status"] = "degraded"
-    
-    # Application-specific checks
+
+
+async def _app_check(exact: bool):
+    """Application-specific checks
+
+    Uses its own session so it can run concurrently with _db_check, since a
+    session cannot execute two statements at once.
+    """
     try:
         app_start = time.time()
         
         # Check if we can query basic models
-        user_count = db.query(User).count()
-        transaction_count = db.query(Transaction).count()
-        category_count = db.query(Category).count()
+        # Table totals in a single SELECT
+        async with AsyncSessionLocal() as db:
+            user_count, transaction_count, category_count = (await db.execute(select(
+                _table_total(db, User, exact),
+                _table_total(db, Transaction, exact),
+                _table_total(db, Category, exact),
+            ))).one()
         
         app_duration = (time.time() - app_start) * 1000
         
-        health_data["checks"]["application"] = {
+        return "application", {
             "status": "healthy",
             "response_time_ms": round(app_duration, 2),
             "stats": {
@@ -118,14 +255,47 @@ async def detailed_health_check(db: Session = Depends(get_db)):
                 "total_categories": category_count
             }
         }
-        
     except Exception as e:
         logger.error("Application health check failed", error=str(e), exc_info=e)
-        health_data["checks"]["application"] = {
+        return "application", {
             "status": "unhealthy",
             "error": str(e)
         }
-        health_data["status"] = "degraded"
+
+
+@router.get(
+    "/health",
+    summary="Detailed health check",
+    description="Detailed health check with system and database status",
+    tags=["Health Check"],
+    response_model=dict
+)
+async def detailed_health_check(
+    exact: bool = Query(False, description="Use exact COUNT(*) instead of planner row estimates"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Detailed health check with dependencies"""
+    start_time = time.time()
+    
+    health_data = {
+        "status": "healthy",
+        "timestamp": _now_iso(),
+        "version": "1.0.0",
+        "checks": {}
+    }
+    
+    # Database, system and application checks run concurrently
+    results = await asyncio.gather(_db_check(db), _sys_check(), _app_check(exact), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            logger.error("Health check raised", error=str(result), exc_info=result)
+            health_data["status"] = "degraded"
+            continue
+        
+        name, check = result
+        health_data["checks"][name] = check
+        if check["status"] != "healthy":
+            health_data["status"] = "degraded"
     
     # Overall response time
     total_duration = (time.time() - start_time) * 1000
@@ -146,86 +316,70 @@ async def detailed_health_check(db: Session = Depends(get_db)):
     return health_data
 
 
+async def _get_metrics_counts(db: AsyncSession, since: datetime, exact: bool = False):
+    """Fetch every /metrics count in a single query"""
+    stmt = select(
+        _table_total(db, User, exact).label("users_total"),
+        _count(User, User.is_active == True).label("users_active"),
+        _count(User, User.last_login >= since).label("users_active_24h"),
+        _table_total(db, Transaction, exact).label("transactions_total"),
+        _count(Transaction, Transaction.created_at >= since).label("transactions_24h"),
+        _table_total(db, Category, exact).label("categories_total"),
+    )
+    return (await db.execute(stmt)).one()
+
+
 @router.get(
     "/metrics",
     summary="Application metrics",
     description="Application metrics in Prometheus format (optional)",
     tags=["Metrics"],
-    response_model=str
+    response_class=PlainTextResponse
 )
-async def get_metrics(db: Session = Depends(get_db)):
+async def get_metrics(
+    exact: bool = Query(False, description="Use exact COUNT(*) instead of planner row estimates"),
+    db: AsyncSession = Depends(get_async_db)
+):
     """Get application metrics in Prometheus format"""
+    now = time.monotonic()
+    if not exact and now < _METRICS_CACHE["expires"]:
+        return PlainTextResponse(_METRICS_CACHE["body"], media_type=METRICS_MEDIA_TYPE)
+    
     try:
-        # Get database statistics
-        user_count = db.query(User).count()
-        active_users = db.query(User).filter(User.is_active == True).count()
-        transaction_count = db.query(Transaction).count()
-        category_count = db.query(Category).count()
-        
-        # Get recent activity (last 24 hours)
+        # Get database statistics and recent activity (last 24 hours) in one round trip
         yesterday = datetime.utcnow() - timedelta(days=1)
-        recent_transactions = db.query(Transaction).filter(
-            Transaction.created_at >= yesterday
-        ).count()
+        stats = await _get_metrics_counts(db, yesterday, exact)
         
-        recent_users = db.query(User).filter(
-            User.last_login >= yesterday
-        ).count() if db.query(User).filter(User.last_login.isnot(None)).count() > 0 else 0
+        user_count = stats.users_total
+        active_users = stats.users_active
+        transaction_count = stats.transactions_total
+        category_count = stats.categories_total
+        recent_transactions = stats.transactions_24h
+        recent_users = stats.users_active_24h
         
         # System metrics
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
-        cpu_percent = psutil.cpu_percent(interval=0.1)
+        cpu_percent, memory, disk = _get_system_stats()
         
-        # Format as Prometheus metrics
-        metrics = f"""# HELP expense_tracker_users_total Total number of registered users
-# TYPE expense_tracker_users_total counter
-expense_tracker_users_total {user_count}
-
-# HELP expense_tracker_users_active Number of active users
-# TYPE expense_tracker_users_active gauge
-expense_tracker_users_active {active_users}
-
-# HELP expense_tracker_transactions_total Total number of transactions
-# TYPE expense_tracker_transactions_total counter
-expense_tracker_transactions_total {transaction_count}
-
-# HELP expense_tracker_categories_total Total number of categories
-# TYPE expense_tracker_categories_total counter
-expense_tracker_categories_total {category_count}
-
-# HELP expense_tracker_transactions_24h Transactions created in last 24 hours
-# TYPE expense_tracker_transactions_24h gauge
-expense_tracker_transactions_24h {recent_transactions}
-
-# HELP expense_tracker_active_users_24h Users active in last 24 hours
-# TYPE expense_tracker_active_users_24h gauge
-expense_tracker_active_users_24h {recent_users}
-
-# HELP expense_tracker_system_memory_percent Memory usage percentage
-# TYPE expense_tracker_system_memory_percent gauge
-expense_tracker_system_memory_percent {memory.percent}
-
-# HELP expense_tracker_system_disk_percent Disk usage percentage
-# TYPE expense_tracker_system_disk_percent gauge
-expense_tracker_system_disk_percent {disk.percent}
-
-# HELP expense_tracker_system_cpu_percent CPU usage percentage
-# TYPE expense_tracker_system_cpu_percent gauge
-expense_tracker_system_cpu_percent {cpu_percent}
-
-# HELP expense_tracker_system_memory_available_bytes Available memory in bytes
-# TYPE expense_tracker_system_memory_available_bytes gauge
-expense_tracker_system_memory_available_bytes {memory.available}
-
-# HELP expense_tracker_system_disk_free_bytes Free disk space in bytes
-# TYPE expense_tracker_system_disk_free_bytes gauge
-expense_tracker_system_disk_free_bytes {disk.free}
-"""
+        body = _METRICS_TEMPLATE % (
+            user_count,
+            active_users,
+            transaction_count,
+            category_count,
+            recent_transactions,
+            recent_users,
+            memory.percent,
+            disk.percent,
+            cpu_percent,
+            memory.available,
+            disk.free,
+        )
+        if not exact:
+            _METRICS_CACHE["body"] = body
+            _METRICS_CACHE["expires"] = now + METRICS_CACHE_TTL_SECONDS
         
         logger.info("Metrics retrieved", user_count=user_count, transaction_count=transaction_count)
         
-        return metrics
+        return PlainTextResponse(body, media_type=METRICS_MEDIA_TYPE)
         
     except Exception as e:
         logger.error("Failed to retrieve metrics", error=str(e), exc_info=e)
@@ -239,15 +393,15 @@ expense_tracker_system_disk_free_bytes {disk.free}
     tags=["Health Check"],
     response_model=dict
 )
-async def readiness_probe(db: Session = Depends(get_db)):
+async def readiness_probe(db: AsyncSession = Depends(get_async_db)):
     """Readiness probe - checks if app is ready to serve traffic"""
     try:
         # Check database connectivity
-        db.execute(text("SELECT 1")).scalar()
+        (await db.execute(_PING)).scalar()
         
         return {
             "status": "ready",
-            "timestamp": datetime.utcnow().isoformat() + "Z"
+            "timestamp": _now_iso()
         }
         
     except Exception as e:
@@ -257,7 +411,7 @@ async def readiness_probe(db: Session = Depends(get_db)):
             detail={
                 "status": "not_ready",
                 "error": str(e),
-                "timestamp": datetime.utcnow().isoformat() + "Z"
+                "timestamp": _now_iso()
             }
         )
 
@@ -267,11 +421,8 @@ async def readiness_probe(db: Session = Depends(get_db)):
     summary="Liveness probe",
     description="Liveness probe for Kubernetes deployments",
     tags=["Health Check"],
-    response_model=dict
+    response_class=Response
 )
 async def liveness_probe():
     """Liveness probe - checks if app is alive"""
-    return {
-        "status": "alive",
-        "timestamp": datetime.utcnow().isoformat() + "Z"
-    }
+    return Response(content=_LIVE_TEMPLATE % _now_iso_bytes(), media_type="application/json")
@@ -1,24 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List, Optional
-import firebase_admin
-from firebase_admin import credentials, messaging
-from pydantic import BaseModel
-from datetime import datetime, timedelta
+from firebase_admin import messaging
+from pydantic import BaseModel, Field
+from datetime import timedelta
 import os
 
-from app.core.deps import get_db, get_current_user
+from app.core.database import get_db
+from app.core.deps import get_current_user
 from app.models.user import User
 from app.schemas.user import UserProfile
+from app.core.logging import get_logger
+from app.services.notification import (
+    FCM_MAX_BATCH_SIZE,
+    TRANSACTION_REMINDER,
+    build_budget_alert,
+    build_monthly_summary,
+    build_weekly_summary,
+    content_dedup_key,
+    fcm_token_store,
+    notification_dedup,
+    notification_dispatcher,
+)
 
 router = APIRouter()
-
-# Initialize Firebase Admin SDK
-if not firebase_admin._apps:
-    # Initialize with default credentials (for development)
-    # In production, use service account key file
-    cred = credentials.ApplicationDefault()
-    firebase_admin.initialize_app(cred)
+logger = get_logger("notifications")
 
 class FCMTokenRequest(BaseModel):
     fcm_token: str
@@ -31,6 +38,12 @@ class NotificationRequest(BaseModel):
     body: str
     data: Optional[dict] = None
 
+class BatchNotificationRequest(BaseModel):
+    user_ids: List[str] = Field(..., min_length=1, max_length=FCM_MAX_BATCH_SIZE)
+    title: str
+    body: str
+    data: Optional[dict] = None
+
 class BudgetAlertRequest(BaseModel):
     user_id: str
     category_name: str
@@ -48,9 +61,6 @@ class MonthlySummaryRequest(BaseModel):
     monthly_expense: float
     month: str
 
-# Store FCM tokens (in production, use a proper database)
-fcm_tokens = {}
-
 @router.post("/register-token")
 async def register_fcm_token(
     request: FCMTokenRequest,
@@ -60,11 +70,7 @@ async def register_fcm_token(
     """Register FCM token for push notifications"""
     try:
         # Store the token associated with the user
-        fcm_tokens[str(current_user.id)] = {
-            'token': request.fcm_token,
-            'platform': request.platform,
-            'updated_at': datetime.utcnow()
-        }
+        await fcm_token_store.set(str(current_user.id), request.fcm_token, request.platform)
         
         return {"message": "FCM token registered successfully"}
     except Exception as e:
@@ -73,7 +79,6 @@ async def register_fcm_token(
 @router.post("/send-notification")
 async def send_notification(
     request: NotificationRequest,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -81,8 +86,7 @@ async def send_notification(
     try:
         if request.user_id:
             # Send to specific user
-            background_tasks.add_task(
-                send_notification_to_user,
+            await send_notification_to_user(
                 request.user_id,
                 request.title,
                 request.body,
@@ -90,8 +94,7 @@ async def send_notification(
             )
         elif request.topic:
             # Send to topic subscribers
-            background_tasks.add_task(
-                send_notification_to_topic,
+            send_notification_to_topic(
                 request.topic,
                 request.title,
                 request.body,
@@ -101,184 +104,209 @@ async def send_notification(
             raise HTTPException(status_code=400, detail="Either user_id or topic must be provided")
         
         return {"message": "Notification queued for sending"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error sending notification: {str(e)}")
 
+@router.post("/send-batch")
+async def send_batch_notification(
+    request: BatchNotificationRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """Send the same push notification to several users (admins only)"""
+    # Reaches arbitrary users and reports which of them have a device
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    
+    try:
+        user_ids = list(dict.fromkeys(request.user_ids))
+        registrations = await fcm_token_store.get_many(user_ids)
+        if not registrations:
+            raise HTTPException(status_code=400, detail="No FCM tokens registered for the given users")
+        
+        # Same per-user duplicate suppression as single sends, so a retried
+        # batch does not notify everyone twice
+        content_key = content_dedup_key(request.title, request.body, request.data or {})
+        keys = [f"{user_id}:{content_key}" for user_id in registrations]
+        claimed = await notification_dedup.claim_many(keys)
+        claimed_keys = [key for key, fresh in zip(keys, claimed) if fresh]
+        
+        items = [
+            (user_id, _user_message(registration['token'], request.title, request.body, request.data or {}))
+            for (user_id, registration), fresh in zip(registrations.items(), claimed)
+            if fresh
+        ]
+        try:
+            notification_dispatcher.enqueue_many(items)
+        except asyncio.QueueFull:
+            logger.warning("Notification queue full", batch_size=len(items))
+            await notification_dedup.release_many(claimed_keys)
+            raise HTTPException(status_code=503, detail="Notification queue is full, retry later")
+        
+        return {
+            "message": "Notifications queued for sending",
+            "queued": len(items),
+            "duplicates_skipped": len(keys) - len(items),
+            "missing_user_ids": [user_id for user_id in user_ids if user_id not in registrations]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error sending batch notification: {str(e)}")
+
 @router.post("/send-budget-alert")
 async def send_budget_alert(
     request: BudgetAlertRequest,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user)
 ):
     """Send budget alert notification"""
     try:
-        percentage = (request.spent_amount / request.budget_limit) * 100
-        
-        title = "🚨 Budget Alert!"
-        body = f"You've spent ${request.spent_amount:.2f} ({percentage:.1f}%) of your ${request.budget_limit:.2f} budget for {request.category_name}"
+        content = build_budget_alert(request.category_name, request.spent_amount, request.budget_limit)
         
-        data = {
-            'type': 'budget_alert',
-            'category_name': request.category_name,
-            'spent_amount': str(request.spent_amount),
-            'budget_limit': str(request.budget_limit),
-            'percentage': str(percentage)
-        }
-        
-        background_tasks.add_task(
-            send_notification_to_user,
+        await send_notification_to_user(
             request.user_id,
-            title,
-            body,
-            data
+            content.title,
+            content.body,
+            dict(content.data),
+            # Spending rounded so a burst of imports crawling past the limit
+            # alerts once; a different limit is a different alert
+            dedup_key=(
+                f"budget_alert:{request.category_name}:"
+                f"{round(request.spent_amount)}:{request.budget_limit}"
+            )
         )
         
         return {"message": "Budget alert notification queued"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error sending budget alert: {str(e)}")
 
 @router.post("/send-transaction-reminder")
 async def send_transaction_reminder(
     request: dict,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user)
 ):
     """Send transaction reminder notification"""
     try:
-        title = "💰 Don't Forget to Track Your Expenses!"
-        body = "Take a moment to record today's transactions and keep your budget on track."
-        
-        data = {
-            'type': 'transaction_reminder',
-            'payload': 'add_transaction'
-        }
-        
-        background_tasks.add_task(
-            send_notification_to_user,
+        await send_notification_to_user(
             request['user_id'],
-            title,
-            body,
-            data
+            TRANSACTION_REMINDER.title,
+            TRANSACTION_REMINDER.body,
+            dict(TRANSACTION_REMINDER.data),
+            dedup_key="transaction_reminder"
         )
         
         return {"message": "Transaction reminder notification queued"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error sending transaction reminder: {str(e)}")
 
 @router.post("/send-weekly-summary")
 async def send_weekly_summary(
     request: WeeklySummaryRequest,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user)
 ):
     """Send weekly summary notification"""
     try:
-        balance = request.weekly_income - request.weekly_expense
-        status = "💚" if balance >= 0 else "🔴"
-        
-        title = f"{status} Weekly Summary"
-        body = f"Income: ${request.weekly_income:.2f}, Expenses: ${request.weekly_expense:.2f}, Balance: ${balance:.2f}"
-        
-        data = {
-            'type': 'weekly_summary',
-            'weekly_income': str(request.weekly_income),
-            'weekly_expense': str(request.weekly_expense),
-            'balance': str(balance),
-            'payload': 'reports'
-        }
+        content = build_weekly_summary(request.weekly_income, request.weekly_expense)
         
-        background_tasks.add_task(
-            send_notification_to_user,
+        await send_notification_to_user(
             request.user_id,
-            title,
-            body,
-            data
+            content.title,
+            content.body,
+            dict(content.data)
         )
         
         return {"message": "Weekly summary notification queued"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error sending weekly summary: {str(e)}")
 
 @router.post("/send-monthly-summary")
 async def send_monthly_summary(
     request: MonthlySummaryRequest,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user)
 ):
     """Send monthly summary notification"""
     try:
-        balance = request.monthly_income - request.monthly_expense
-        status = "💚" if balance >= 0 else "🔴"
-        
-        title = f"{status} Monthly Summary - {request.month}"
-        body = f"Income: ${request.monthly_income:.2f}, Expenses: ${request.monthly_expense:.2f}, Balance: ${balance:.2f}"
+        content = build_monthly_summary(request.monthly_income, request.monthly_expense, request.month)
         
-        data = {
-            'type': 'monthly_summary',
-            'monthly_income': str(request.monthly_income),
-            'monthly_expense': str(request.monthly_expense),
-            'balance': str(balance),
-            'month': request.month,
-            'payload': 'reports'
-        }
-        
-        background_tasks.add_task(
-            send_notification_to_user,
+        await send_notification_to_user(
             request.user_id,
-            title,
-            body,
-            data
+            content.title,
+            content.body,
+            dict(content.data)
         )
         
         return {"message": "Monthly summary notification queued"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error sending monthly summary: {str(e)}")
 
-# Background task functions
-async def send_notification_to_user(user_id: str, title: str, body: str, data: dict):
-    """Send push notification to specific user"""
+# Queue messages for the batching dispatcher
+def _enqueue(message: messaging.Message, user_id: Optional[str] = None):
     try:
-        if user_id not in fcm_tokens:
-            print(f"No FCM token found for user {user_id}")
-            return
-        
-        token = fcm_tokens[user_id]['token']
-        
-        message = messaging.Message(
-            notification=messaging.Notification(
-                title=title,
-                body=body,
-            ),
-            data=data,
-            token=token,
-        )
-        
-        response = messaging.send(message)
-        print(f'Successfully sent message to user {user_id}: {response}')
-        
-    except Exception as e:
-        print(f'Error sending message to user {user_id}: {e}')
-        # Remove invalid token
-        if user_id in fcm_tokens:
-            del fcm_tokens[user_id]
+        notification_dispatcher.enqueue(message, user_id=user_id)
+    except asyncio.QueueFull:
+        logger.warning("Notification queue full", user_id=user_id)
+        raise HTTPException(status_code=503, detail="Notification queue is full, retry later")
+
+def _user_message(token: str, title: str, body: str, data: dict) -> messaging.Message:
+    return messaging.Message(
+        notification=messaging.Notification(
+            title=title,
+            body=body,
+        ),
+        data=data,
+        token=token,
+    )
 
-async def send_notification_to_topic(topic: str, title: str, body: str, data: dict):
-    """Send push notification to topic subscribers"""
+async def send_notification_to_user(
+    user_id: str,
+    title: str,
+    body: str,
+    data: dict,
+    dedup_key: Optional[str] = None
+):
+    """
+    Queue a push notification to a specific user
+    
+    Repeats of the same ``dedup_key`` (default: the message content) for the
+    user within NOTIFICATION_DEDUP_TTL_SECONDS are dropped.
+    """
+    registration = await fcm_token_store.get(user_id)
+    if registration is None:
+        logger.info("No FCM token found for user", user_id=user_id)
+        return
+    
+    key = f"{user_id}:{dedup_key or content_dedup_key(title, body, data)}"
+    if not await notification_dedup.claim(key):
+        logger.info("Duplicate notification skipped", user_id=user_id, dedup_key=key)
+        return
+    
     try:
-        message = messaging.Message(
-            notification=messaging.Notification(
-                title=title,
-                body=body,
-            ),
-            data=data,
-            topic=topic,
-        )
-        
-        response = messaging.send(message)
-        print(f'Successfully sent message to topic {topic}: {response}')
-        
-    except Exception as e:
-        print(f'Error sending message to topic {topic}: {e}')
+        _enqueue(_user_message(registration['token'], title, body, data), user_id=user_id)
+    except HTTPException:
+        # Let the client's retry through instead of swallowing it as a duplicate
+        await notification_dedup.release(key)
+        raise
+
+def send_notification_to_topic(topic: str, title: str, body: str, data: dict):
+    """Queue a push notification to topic subscribers"""
+    message = messaging.Message(
+        notification=messaging.Notification(
+            title=title,
+            body=body,
+        ),
+        data=data,
+        topic=topic,
+    )
+    _enqueue(message)
 
 @router.get("/tokens")
 async def get_registered_tokens(
@@ -286,9 +314,10 @@ async def get_registered_tokens(
 ):
     """Get all registered FCM tokens (admin only)"""
     # Add admin check here if needed
+    tokens = await fcm_token_store.all()
     return {
-        "tokens": fcm_tokens,
-        "total_tokens": len(fcm_tokens)
+        "tokens": tokens,
+        "total_tokens": len(tokens)
     }
 
 @router.delete("/tokens/{user_id}")
@@ -298,8 +327,7 @@ async def remove_fcm_token(
 ):
     """Remove FCM token for user"""
     try:
-        if user_id in fcm_tokens:
-            del fcm_tokens[user_id]
+        if await fcm_token_store.delete(user_id):
             return {"message": f"FCM token removed for user {user_id}"}
         else:
             raise HTTPException(status_code=404, detail="FCM token not found for user")
@@ -2,26 +2,77 @@
 Reporting and Analytics API endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import RedirectResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Optional, Literal
+from typing import Optional, Literal, Tuple
+from pydantic import ValidationError
 from datetime import datetime, date
-import calendar
-import io
+import asyncio
 
-from app.core.deps import get_db, get_current_user
-from app.core.response import success_response, error_response
+from app.core.database import get_db
+from app.core.deps import get_current_user
+from app.core.response import json_success_response, error_response, not_modified_response, weak_etag
 from app.models.user import User
-from app.services.reporting import ReportingService
+from app.schemas.report import YearMonth, ExportJobCreate
+from app.services.reporting import MONTH_SLUGS, ReportingService
 from app.services.export import report_export_service
+from app.services.export_cache import export_cache
+from app.services.export_jobs import (
+    CONTENT_TYPES, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, export_job_queue
+)
 
 router = APIRouter()
 
+_YEAR_MONTH_ERRORS = {
+    "year": "Invalid year. Must be 2000 or later",
+    "month": "Invalid month. Must be between 01 and 12"
+}
+
+
+def parse_year_month(
+    month: str = Query(..., description="Month in YYYY-MM format")
+) -> Tuple[int, int]:
+    """Parse the ``month`` query parameter into ``(year, month)``"""
+    try:
+        year_month = YearMonth.model_validate(month)
+    except ValidationError as e:
+        loc = e.errors()[0]["loc"]
+        message = _YEAR_MONTH_ERRORS.get(loc[0] if loc else None, "Invalid month format. Use YYYY-MM")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(message)
+        )
+    return year_month.year, year_month.month
+
+
+def _report_not_modified(
+    request: Request,
+    response: Response,
+    user_id: int,
+    version: Optional[str]
+) -> Optional[Response]:
+    """Conditional GET keyed on the report cache version; None when the report must be built"""
+    if version is None:
+        return None
+    return not_modified_response(request, response, weak_etag(user_id, version))
+
+
+async def _store_export(cache_key: str, content: bytes, media_type: str, filename: str) -> Response:
+    """Upload a rendered export to the export cache and return it"""
+    await export_cache.store(cache_key, content, media_type)
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
 
 @router.get("/summary")
 async def get_monthly_summary(
-    month: str = Query(..., description="Month in YYYY-MM format", regex=r"^\d{4}-\d{2}$"),
+    request: Request,
+    response: Response,
+    year_month: Tuple[int, int] = Depends(parse_year_month),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -33,15 +84,14 @@ async def get_monthly_summary(
     """
     
     try:
-        # Parse month parameter
-        year, month_num = map(int, month.split('-'))
+        year, month_num = year_month
         
-        # Validate month
-        if month_num < 1 or month_num > 12:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=error_response("Invalid month. Must be between 01 and 12")
-            )
+        not_modified = _report_not_modified(
+            request, response, current_user.id,
+            await asyncio.to_thread(ReportingService.get_monthly_summary.version, current_user.id, year, month_num)
+        )
+        if not_modified is not None:
+            return not_modified
         
         # Create reporting service
         reporting_service = ReportingService(db)
@@ -51,16 +101,12 @@ async def get_monthly_summary(
             current_user.id, year, month_num
         )
         
-        return success_response(
+        return json_success_response(
             message="Monthly summary retrieved successfully",
-            data=summary_data
+            data=summary_data,
+            headers=response.headers
         )
         
-    except ValueError:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=error_response("Invalid month format. Use YYYY-MM")
-        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -70,6 +116,8 @@ async def get_monthly_summary(
 
 @router.get("/yearly")
 async def get_yearly_comparison(
+    request: Request,
+    response: Response,
     year: int = Query(..., description="Year for comparison"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -90,15 +138,23 @@ async def get_yearly_comparison(
                 detail=error_response(f"Invalid year. Must be between 2000 and {current_year + 1}")
             )
         
+        not_modified = _report_not_modified(
+            request, response, current_user.id,
+            await asyncio.to_thread(ReportingService.get_yearly_comparison.version, current_user.id, year)
+        )
+        if not_modified is not None:
+            return not_modified
+        
         # Create reporting service
         reporting_service = ReportingService(db)
         
         # Get yearly comparison
         yearly_data = reporting_service.get_yearly_comparison(current_user.id, year)
         
-        return success_response(
+        return json_success_response(
             message="Yearly comparison retrieved successfully",
-            data=yearly_data
+            data=yearly_data,
+            headers=response.headers
         )
         
     except HTTPException:
@@ -112,6 +168,8 @@ async def get_yearly_comparison(
 
 @router.get("/categories")
 async def get_category_analysis(
+    request: Request,
+    response: Response,
     start_date: date = Query(..., description="Start date for analysis"),
     end_date: date = Query(..., description="End date for analysis"),
     db: Session = Depends(get_db),
@@ -140,6 +198,13 @@ async def get_category_analysis(
                 detail=error_response("Date range too large. Maximum 2 years allowed")
             )
         
+        not_modified = _report_not_modified(
+            request, response, current_user.id,
+            await asyncio.to_thread(ReportingService.get_category_analysis.version, current_user.id, start_date, end_date)
+        )
+        if not_modified is not None:
+            return not_modified
+        
         # Create reporting service
         reporting_service = ReportingService(db)
         
@@ -148,9 +213,10 @@ async def get_category_analysis(
             current_user.id, start_date, end_date
         )
         
-        return success_response(
+        return json_success_response(
             message="Category analysis retrieved successfully",
-            data=analysis_data
+            data=analysis_data,
+            headers=response.headers
         )
         
     except HTTPException:
@@ -164,6 +230,8 @@ async def get_category_analysis(
 
 @router.get("/trends")
 async def get_spending_trends(
+    request: Request,
+    response: Response,
     months: int = Query(6, description="Number of months to analyze", ge=1, le=24),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -176,15 +244,23 @@ async def get_spending_trends(
     """
     
     try:
+        not_modified = _report_not_modified(
+            request, response, current_user.id,
+            await asyncio.to_thread(ReportingService.get_spending_trends.version, current_user.id, months)
+        )
+        if not_modified is not None:
+            return not_modified
+        
         # Create reporting service
         reporting_service = ReportingService(db)
         
         # Get spending trends
         trends_data = reporting_service.get_spending_trends(current_user.id, months)
         
-        return success_response(
+        return json_success_response(
             message="Spending trends retrieved successfully",
-            data=trends_data
+            data=trends_data,
+            headers=response.headers
         )
         
     except Exception as e:
@@ -196,6 +272,8 @@ async def get_spending_trends(
 
 @router.get("/insights")
 async def get_financial_insights(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -206,15 +284,23 @@ async def get_financial_insights(
     """
     
     try:
+        not_modified = _report_not_modified(
+            request, response, current_user.id,
+            await asyncio.to_thread(ReportingService.get_financial_insights.version, current_user.id)
+        )
+        if not_modified is not None:
+            return not_modified
+        
         # Create reporting service
         reporting_service = ReportingService(db)
         
         # Get financial insights
         insights_data = reporting_service.get_financial_insights(current_user.id)
         
-        return success_response(
+        return json_success_response(
             message="Financial insights retrieved successfully",
-            data=insights_data
+            data=insights_data,
+            headers=response.headers
         )
         
     except Exception as e:
@@ -226,7 +312,7 @@ async def get_financial_insights(
 
 @router.get("/export/monthly")
 async def export_monthly_report(
-    month: str = Query(..., description="Month in YYYY-MM format", regex=r"^\d{4}-\d{2}$"),
+    year_month: Tuple[int, int] = Depends(parse_year_month),
     format: Literal["csv", "pdf"] = Query("csv", description="Export format"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -240,15 +326,21 @@ async def export_monthly_report(
     """
     
     try:
-        # Parse month parameter
-        year, month_num = map(int, month.split('-'))
+        year, month_num = year_month
         
-        # Validate month
-        if month_num < 1 or month_num > 12:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=error_response("Invalid month. Must be between 01 and 12")
-            )
+        # Generate filename
+        filename = f"monthly_report_{year}_{month_num:02d}_{MONTH_SLUGS[month_num]}"
+        
+        # Closed months are rendered once and then served from object storage
+        cache_key = None
+        now = datetime.now()
+        if (year, month_num) < (now.year, now.month):
+            period = f"{year}-{month_num:02d}"
+            cache_key = await asyncio.to_thread(export_cache.object_key, current_user.id, period, format, [period])
+        if cache_key:
+            url = await export_cache.get_url(cache_key, f"{filename}.{format}")
+            if url:
+                return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
         
         # Get report data
         reporting_service = ReportingService(db)
@@ -256,35 +348,31 @@ async def export_monthly_report(
             current_user.id, year, month_num
         )
         
-        # Generate filename
-        month_name = calendar.month_name[month_num]
-        filename = f"monthly_report_{year}_{month_num:02d}_{month_name.lower()}"
-        
         if format == "csv":
             # Export to CSV
-            csv_output = report_export_service.export_monthly_summary_csv(report_data)
+            csv_lines = report_export_service.export_monthly_summary_csv(report_data)
+            if cache_key:
+                return await _store_export(cache_key, "".join(csv_lines).encode(), "text/csv", f"{filename}.csv")
             
             return StreamingResponse(
-                io.StringIO(csv_output.getvalue()),
+                csv_lines,
                 media_type="text/csv",
                 headers={"Content-Disposition": f"attachment; filename={filename}.csv"}
             )
         
         elif format == "pdf":
             # Export to PDF
-            pdf_output = report_export_service.export_monthly_summary_pdf(report_data)
+            # reportlab layout is CPU-bound, so it runs off the event loop
+            pdf_output = await asyncio.to_thread(report_export_service.export_monthly_summary_pdf, report_data)
+            if cache_key:
+                return await _store_export(cache_key, pdf_output.getvalue(), "application/pdf", f"{filename}.pdf")
             
-            return StreamingResponse(
-                io.BytesIO(pdf_output.getvalue()),
+            return Response(
+                content=pdf_output.getvalue(),
                 media_type="application/pdf",
                 headers={"Content-Disposition": f"attachment; filename={filename}.pdf"}
             )
         
-    except ValueError:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=error_response("Invalid month format. Use YYYY-MM")
-        )
     except ImportError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -321,29 +409,44 @@ async def export_yearly_report(
                 detail=error_response(f"Invalid year. Must be between 2000 and {current_year + 1}")
             )
         
+        # Generate filename
+        filename = f"yearly_report_{year}"
+        
+        # Past years are rendered once and then served from object storage
+        cache_key = None
+        if year < current_year:
+            months = [f"{year}-{month:02d}" for month in range(1, 13)]
+            cache_key = await asyncio.to_thread(export_cache.object_key, current_user.id, str(year), format, months)
+        if cache_key:
+            url = await export_cache.get_url(cache_key, f"{filename}.{format}")
+            if url:
+                return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+        
         # Get report data
         reporting_service = ReportingService(db)
         report_data = reporting_service.get_yearly_comparison(current_user.id, year)
         
-        # Generate filename
-        filename = f"yearly_report_{year}"
-        
         if format == "csv":
             # Export to CSV
-            csv_output = report_export_service.export_yearly_comparison_csv(report_data)
+            csv_lines = report_export_service.export_yearly_comparison_csv(report_data)
+            if cache_key:
+                return await _store_export(cache_key, "".join(csv_lines).encode(), "text/csv", f"{filename}.csv")
             
             return StreamingResponse(
-                io.StringIO(csv_output.getvalue()),
+                csv_lines,
                 media_type="text/csv",
                 headers={"Content-Disposition": f"attachment; filename={filename}.csv"}
             )
         
         elif format == "pdf":
             # Export to PDF
-            pdf_output = report_export_service.export_yearly_comparison_pdf(report_data)
+            # reportlab layout is CPU-bound, so it runs off the event loop
+            pdf_output = await asyncio.to_thread(report_export_service.export_yearly_comparison_pdf, report_data)
+            if cache_key:
+                return await _store_export(cache_key, pdf_output.getvalue(), "application/pdf", f"{filename}.pdf")
             
-            return StreamingResponse(
-                io.BytesIO(pdf_output.getvalue()),
+            return Response(
+                content=pdf_output.getvalue(),
                 media_type="application/pdf",
                 headers={"Content-Disposition": f"attachment; filename={filename}.pdf"}
             )
@@ -403,10 +506,10 @@ async def export_category_analysis(
         
         if format == "csv":
             # Export to CSV
-            csv_output = report_export_service.export_category_analysis_csv(report_data)
+            csv_lines = report_export_service.export_category_analysis_csv(report_data)
             
             return StreamingResponse(
-                io.StringIO(csv_output.getvalue()),
+                csv_lines,
                 media_type="text/csv",
                 headers={"Content-Disposition": f"attachment; filename={filename}.csv"}
             )
@@ -429,3 +532,101 @@ async def export_category_analysis(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=error_response(f"Failed to export category analysis: {str(e)}")
         )
+
+
+def _export_job_data(job: dict, request: Request) -> dict:
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "filename": job["filename"],
+        "status_url": str(request.url_for("get_export_job", job_id=job["id"]))
+    }
+
+
+@router.post("/export/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def create_export_job(
+    request: Request,
+    export_in: ExportJobCreate,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Queue a report export to be rendered in the background
+    
+    - **report**: monthly, yearly or categories
+    - **format**: Export format (csv or pdf)
+    - **month** / **year** / **start_date**, **end_date**: Period for the chosen report
+    - **Returns**: Job id and a status URL to poll for the file
+    
+    Jobs are queued in the worker process that accepted them. If that
+    process restarts before the job finishes, the job is lost and its
+    status turns to failed once it is 10 minutes old.
+    """
+    
+    try:
+        job = await export_job_queue.submit(current_user.id, export_in)
+    except asyncio.QueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=error_response("Export queue is full, please try again later")
+        )
+    
+    data = _export_job_data(job, request)
+    return json_success_response(
+        message="Export job queued",
+        data=data,
+        status_code=status.HTTP_202_ACCEPTED,
+        headers={"Location": data["status_url"]}
+    )
+
+
+@router.get("/export/jobs/{job_id}")
+async def get_export_job(
+    request: Request,
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Poll a background export
+    
+    - **Returns**: 202 while rendering, a redirect to the file in object storage
+      or the file itself once done, 500 if the job failed or was lost
+    """
+    
+    job = await export_job_queue.get(job_id)
+    if job is None or job["user_id"] != str(current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=error_response("Export job not found")
+        )
+    
+    if job["status"] in (JOB_QUEUED, JOB_RUNNING):
+        return json_success_response(
+            message="Export job is still running",
+            data=_export_job_data(job, request),
+            status_code=status.HTTP_202_ACCEPTED,
+            headers={"Retry-After": "1"}
+        )
+    
+    if job["status"] == JOB_FAILED:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=error_response(f"Failed to export report: {job.get('error', '')}")
+        )
+    
+    if job.get("s3_key"):
+        url = await export_cache.get_url(job["s3_key"], job["filename"])
+        if url:
+            return RedirectResponse(url, status_code=status.HTTP_303_SEE_OTHER)
+    else:
+        content = await export_job_queue.get_result(job_id)
+        if content is not None:
+            return Response(
+                content=content,
+                media_type=CONTENT_TYPES[job["format"]],
+                headers={"Content-Disposition": f"attachment; filename={job['filename']}"}
+            )
+    
+    raise HTTPException(
+        status_code=status.HTTP_410_GONE,
+        detail=error_response("Export file has expired, please request it again")
+    )
@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from typing import Optional
+from fastapi import APIRouter, Body, Depends, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from datetime import date
-from ..core.database import get_db
-from ..core.response import success_response
+from ..core.database import get_async_db
+from ..core.response import json_success_response, not_modified_response, weak_etag
 from ..core.deps import get_current_active_user
-from ..schemas.transaction import Transaction, TransactionCreate, TransactionUpdate, TransactionFilter
+from ..schemas.transaction import (
+    MAX_BULK_TRANSACTIONS, Transaction, TransactionCreate, TransactionUpdate, TransactionFilter
+)
 from ..schemas.user import User
-from ..schemas.openapi import *
 from ..services.transaction import TransactionService
 
 router = APIRouter()
@@ -21,7 +23,9 @@ router = APIRouter()
     Retrieve transactions for the authenticated user with optional filtering.
     
     **Query Parameters:**
-    - `skip`: Number of records to skip (pagination offset)
+    - `cursor`: Return transactions after this position (use `next_cursor` from the previous page)
+    - `stream`: Stream every matching transaction as NDJSON, one per line (`skip` and `limit` are ignored)
+    - `skip`: Number of records to skip (offset pagination; ignored with `cursor`)
     - `limit`: Maximum number of records to return (pagination limit)
     - `start_date`: Filter transactions from this date (YYYY-MM-DD)
     - `end_date`: Filter transactions until this date (YYYY-MM-DD)
@@ -59,8 +63,7 @@ router = APIRouter()
                                 }
                             ],
                             "total": 1,
-                            "skip": 0,
-                            "limit": 100
+                            "next_cursor": None
                         }
                     }
                 }
@@ -74,14 +77,16 @@ router = APIRouter()
         }
     }
 )
-def get_transactions(
+async def get_transactions(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Keyset cursor: next_cursor from the previous page"),
+    stream: bool = Query(False, description="Stream all matching transactions as NDJSON"),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     category_id: Optional[int] = Query(None),
     category_type: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get user's transactions with optional filters"""
@@ -92,17 +97,30 @@ def get_transactions(
         category_type=category_type
     )
     
-    transactions = TransactionService.get_transactions(
-        db, current_user.id, skip, limit, filters
+    if stream:
+        return StreamingResponse(
+            TransactionService.stream_transactions(db, current_user.id, filters, cursor=cursor),
+            media_type="application/x-ndjson"
+        )
+    
+    page = await TransactionService.get_transactions(
+        db, current_user.id, skip, limit, filters, cursor=cursor
     )
     
-    return success_response(
+    return json_success_response(
         message="Transactions retrieved successfully",
-        data=transactions,
+        data={
+            "transactions": [
+                Transaction.model_validate(transaction).model_dump(mode="json")
+                for transaction in page["transactions"]
+            ],
+            "total": page["total"],
+            "next_cursor": page["next_cursor"]
+        },
         meta={
             "skip": skip,
             "limit": limit,
-            "filters": filters.dict(exclude_none=True)
+            "filters": filters.to_dict()
         }
     )
 
@@ -171,17 +189,26 @@ def get_transactions(
         }
     }
 )
-def get_transaction_summary(
+async def get_transaction_summary(
+    request: Request,
+    response: Response,
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get transaction summary (income, expense, balance)"""
-    summary = TransactionService.get_summary(db, current_user.id, start_date, end_date)
-    return success_response(
+    version = await TransactionService.get_summary_version(current_user.id, start_date, end_date)
+    if version is not None:
+        not_modified = not_modified_response(request, response, weak_etag(current_user.id, version))
+        if not_modified is not None:
+            return not_modified
+    
+    summary = await TransactionService.get_summary(db, current_user.id, start_date, end_date)
+    return json_success_response(
         message="Transaction summary retrieved successfully",
-        data=summary
+        data=summary.model_dump(mode="json"),
+        headers=response.headers
     )
 
 
@@ -247,16 +274,25 @@ def get_transaction_summary(
         }
     }
 )
-def get_transaction(
+async def get_transaction(
+    request: Request,
+    response: Response,
     transaction_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get a specific transaction"""
-    transaction = TransactionService.get_transaction(db, transaction_id, current_user.id)
-    return success_response(
+    version = await TransactionService.get_transaction_version(transaction_id, current_user.id)
+    if version is not None:
+        not_modified = not_modified_response(request, response, weak_etag(current_user.id, version))
+        if not_modified is not None:
+            return not_modified
+    
+    transaction = await TransactionService.get_transaction_data(db, transaction_id, current_user.id)
+    return json_success_response(
         message="Transaction retrieved successfully",
-        data=transaction
+        data=transaction,
+        headers=response.headers
     )
 
 
@@ -351,16 +387,72 @@ def get_transaction(
         }
     }
 )
-def create_transaction(
+async def create_transaction(
     transaction: TransactionCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Create a new transaction"""
-    db_transaction = TransactionService.create_transaction(db, transaction, current_user.id)
-    return success_response(
+    db_transaction = await TransactionService.create_transaction(db, transaction, current_user.id)
+    return json_success_response(
         message="Transaction created successfully",
-        data=db_transaction
+        data=Transaction.model_validate(db_transaction).model_dump(mode="json"),
+        status_code=status.HTTP_201_CREATED
+    )
+
+
+@router.post(
+    "/bulk",
+    response_model=dict,
+    status_code=201,
+    summary="Create transactions in bulk",
+    description=f"""
+    Create up to {MAX_BULK_TRANSACTIONS} transactions in one request, e.g. when a client syncs
+    transactions recorded offline.
+    
+    **Request Body:**
+    - A list of transactions, each as for `POST /transactions/`
+    
+    **Authentication Required:** Yes (Bearer token)
+    
+    **Returns:** The ids of the created transactions, in request order. The batch
+    is inserted in a single statement: either every transaction is created or none is.
+    """,
+    responses={
+        201: {
+            "description": "Transactions created successfully",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "success": True,
+                        "message": "2 transactions created successfully",
+                        "data": {
+                            "ids": [16, 17],
+                            "count": 2
+                        }
+                    }
+                }
+            }
+        },
+        401: {
+            "description": "Unauthorized - Invalid or missing token"
+        },
+        422: {
+            "description": "Validation error, or an empty or oversized batch"
+        }
+    }
+)
+async def create_transactions_bulk(
+    transactions: List[TransactionCreate] = Body(..., min_length=1, max_length=MAX_BULK_TRANSACTIONS),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Create a batch of transactions"""
+    ids = await TransactionService.create_transactions(db, transactions, current_user.id)
+    return json_success_response(
+        message=f"{len(ids)} transactions created successfully",
+        data={"ids": ids, "count": len(ids)},
+        status_code=status.HTTP_201_CREATED
     )
 
 
@@ -437,19 +529,19 @@ def create_transaction(
         }
     }
 )
-def update_transaction(
+async def update_transaction(
     transaction_id: int,
     transaction: TransactionUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Update a transaction"""
-    db_transaction = TransactionService.update_transaction(
+    db_transaction = await TransactionService.update_transaction(
         db, transaction_id, transaction, current_user.id
     )
-    return success_response(
+    return json_success_response(
         message="Transaction updated successfully",
-        data=db_transaction
+        data=Transaction.model_validate(db_transaction).model_dump(mode="json")
     )
 
 
@@ -500,13 +592,13 @@ def update_transaction(
         }
     }
 )
-def delete_transaction(
+async def delete_transaction(
     transaction_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Delete a transaction"""
-    TransactionService.delete_transaction(db, transaction_id, current_user.id)
-    return success_response(
+    await TransactionService.delete_transaction(db, transaction_id, current_user.id)
+    return json_success_response(
         message="Transaction deleted successfully"
     )
@@ -2,27 +2,154 @@
 File upload endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, status, UploadFile, File
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Literal, Optional, Tuple
+import asyncio
 import os
-from pathlib import Path
+import re
+import stat
+from collections import OrderedDict
+from urllib.parse import quote
 
-from app.core.deps import get_db, get_current_user
-from app.core.file_storage import file_upload_service
+from app.core.database import get_db
+from app.core.deps import get_current_user
+from app.core.file_storage import file_upload_service, thumbnail_name
 from app.crud.transaction import transaction_crud
+from app.services.report_cache import report_cache
 from app.models.user import User
-from app.core.response import success_response, error_response
+from app.core.response import json_success_response, error_response, not_modified_response
 from app.core.config import get_settings
 
 settings = get_settings()
 router = APIRouter()
 
+# Resolved once; served paths are checked against it by prefix
+_UPLOAD_ROOT = os.path.realpath(settings.upload_dir) + os.sep
+_LOCAL_STORAGE = settings.storage_type == "local"
+_THUMBNAIL_URL_PREFIX = f"{settings.base_url}/storage/thumbnails/"
+
+# Folders under the upload directory that serve_uploaded_file may read
+UploadSubfolder = Literal["transactions", "thumbnails"]
+
+# Stored names are never reused for other content, so once processed a file
+# can be kept indefinitely; private because they are served per user
+_STORED_FILE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+# Until then a receipt may still be re-encoded in place, so clients revalidate
+# it against its ETag on every use
+_UNPROCESSED_FILE_CACHE_CONTROL = "private, no-cache"
+
+# Media types of the files serve_uploaded_file hands out, by lowercase extension
+MEDIA_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+}
+
+# Thumbnails already seen on disk, oldest first. A thumbnail only goes away
+# with its receipt, which also clears the attachment, so only hits are kept
+# (misses turn into hits once the background job has run)
+_KNOWN_THUMBNAILS: "OrderedDict[str, None]" = OrderedDict()
+_KNOWN_THUMBNAILS_MAX = 4096
+
+# Files stored before per-user folders carry the user in their name instead
+_LEGACY_OWNER = re.compile(r"(?:thumb_)?user_(\d+)_")
+
+
+def _stored_name(attachment_url: str) -> str:
+    """A receipt's path under transactions/, from its URL"""
+    return attachment_url.rpartition("/transactions/")[2]
+
+
+def _file_owner(filename: str) -> Optional[int]:
+    """Id of the user a stored file belongs to, read from its path"""
+    folder, sep, _ = filename.partition("/")
+    if sep:
+        return int(folder) if folder.isdigit() else None
+    match = _LEGACY_OWNER.match(filename)
+    return int(match.group(1)) if match else None
+
+
+def _thumbnail_exists(thumbnail_filename: str) -> bool:
+    if thumbnail_filename in _KNOWN_THUMBNAILS:
+        _KNOWN_THUMBNAILS.move_to_end(thumbnail_filename)
+        return True
+    
+    if not os.path.isfile(os.path.join(_UPLOAD_ROOT, "thumbnails", thumbnail_filename)):
+        return False
+    
+    _KNOWN_THUMBNAILS[thumbnail_filename] = None
+    if len(_KNOWN_THUMBNAILS) > _KNOWN_THUMBNAILS_MAX:
+        _KNOWN_THUMBNAILS.popitem(last=False)
+    return True
+
+
+def _cache_control(subfolder: str, filename: str) -> str:
+    # Thumbnails are written once, complete, and are the last output of a
+    # receipt's processing job; a receipt without one may still change
+    if subfolder == "thumbnails" or _thumbnail_exists(thumbnail_name(filename)):
+        return _STORED_FILE_CACHE_CONTROL
+    return _UNPROCESSED_FILE_CACHE_CONTROL
+
+
+def _byte_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    First and last byte of a single ``bytes=`` range (None to send the whole file)
+    
+    Multiple ranges are answered with the whole file, which RFC 9110 allows.
+    """
+    unit, _, spec = (range_header or "").partition("=")
+    first, dash, last = spec.strip().partition("-")
+    if unit.strip().lower() != "bytes" or not dash or "," in spec:
+        return None
+    
+    try:
+        if first:
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+    
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail=error_response("Requested range not satisfiable"),
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+
+def _read_range(path: str, start: int, length: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(length)
+
+
+def _accel_redirect_path(request: Request, path: str) -> Optional[str]:
+    """
+    Internal nginx location for the resolved ``path``, when nginx offered to send it
+    
+    nginx advertises ``X-Sendfile-Type: X-Accel-Redirect`` and maps local
+    paths to an internal location with ``X-Accel-Mapping: <dir>=<location>``.
+    Requests that reach the API directly get no offer and are served here.
+    """
+    if request.headers.get("x-sendfile-type") != "X-Accel-Redirect":
+        return None
+    
+    root, _, location = request.headers.get("x-accel-mapping", "").partition("=")
+    if not root or not location or not path.startswith(root):
+        return None
+    return location + quote(path[len(root):])
+
 
 @router.post("/transactions/{transaction_id}/upload")
 async def upload_transaction_receipt(
     transaction_id: int,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -32,7 +159,8 @@ async def upload_transaction_receipt(
     
     - **transaction_id**: ID of the transaction
     - **file**: Image file (PNG, JPG, JPEG, GIF, WEBP)
-    - **Returns**: Upload details with file URL and thumbnail URL
+    - **Returns**: Upload details with the file URL; the thumbnail is made
+      after the response and listed by the attachment info once ready
     """
     
     # Get transaction and verify ownership
@@ -51,10 +179,9 @@ async def upload_transaction_receipt(
         )
     
     try:
-        # Upload file
-        upload_result = await file_upload_service.upload_transaction_receipt(
-            file, current_user.id, transaction_id
-        )
+        # Store the file as uploaded, under the owner; image processing runs
+        # after the response
+        upload_result = await file_upload_service.store_original(file, transaction.user_id)
         
         # Update transaction with attachment info
         transaction_data = {
@@ -63,18 +190,29 @@ async def upload_transaction_receipt(
             "attachment_size": upload_result["file_size"]
         }
         
-        updated_transaction = transaction_crud.update(
-            db, 
-            db_obj=transaction, 
-            obj_in=transaction_data
+        updated_transaction = transaction_crud.update_if_owned(
+            db, transaction_id, current_user.id, current_user.role == "admin", transaction_data
         )
+        if updated_transaction is None:
+            # Deleted or reassigned while the file was being stored; the file may
+            # also be an existing copy another transaction links to
+            if not transaction_crud.attachment_in_use(db, transaction.user_id, upload_result["file_url"]):
+                await file_upload_service.delete_transaction_receipt(upload_result["filename"], current_user.id)
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=error_response("Transaction not found")
+            )
+        await asyncio.to_thread(report_cache.invalidate, updated_transaction.user_id, [updated_transaction.trans_date])
+        
+        if upload_result["file_path"]:
+            background_tasks.add_task(file_upload_service.make_thumbnail, upload_result["file_path"])
         
-        return success_response(
+        return json_success_response(
             message="File uploaded successfully",
             data={
                 "transaction_id": transaction_id,
                 "file_url": upload_result["file_url"],
-                "thumbnail_url": upload_result.get("thumbnail_url"),
+                "thumbnail_url": None,
                 "filename": upload_result["filename"],
                 "original_filename": upload_result["original_filename"],
                 "file_size": upload_result["file_size"],
@@ -127,20 +265,22 @@ async def delete_transaction_receipt(
         )
     
     try:
-        # Extract filename from URL or use stored filename
-        filename = None
-        if transaction.attachment_filename:
-            filename = transaction.attachment_filename
-        elif transaction.attachment_url:
-            # Extract filename from URL
-            url_path = transaction.attachment_url.split('/')[-1]
-            filename = url_path
+        # The stored name comes from the URL; attachment_filename is the name
+        # the file was uploaded under
+        filename = _stored_name(transaction.attachment_url)
         
         if filename:
-            # Delete file from storage
-            deleted = await file_upload_service.delete_transaction_receipt(
-                filename, current_user.id
-            )
+            # Identical receipts share one stored file, so it is only deleted
+            # once no other transaction links to it
+            if transaction_crud.attachment_in_use(
+                db, transaction.user_id, transaction.attachment_url, exclude_id=transaction_id
+            ):
+                deleted = True
+            else:
+                deleted = await file_upload_service.delete_transaction_receipt(
+                    filename, current_user.id
+                )
+                _KNOWN_THUMBNAILS.pop(thumbnail_name(filename), None)
             
             if deleted:
                 # Update transaction to remove attachment info
@@ -150,13 +290,13 @@ async def delete_transaction_receipt(
                     "attachment_size": None
                 }
                 
-                transaction_crud.update(
-                    db, 
-                    db_obj=transaction, 
-                    obj_in=transaction_data
+                updated_transaction = transaction_crud.update_if_owned(
+                    db, transaction_id, current_user.id, current_user.role == "admin", transaction_data
                 )
+                if updated_transaction is not None:
+                    await asyncio.to_thread(report_cache.invalidate, updated_transaction.user_id, [updated_transaction.trans_date])
                 
-                return success_response(
+                return json_success_response(
                     message="File deleted successfully",
                     data={"transaction_id": transaction_id}
                 )
@@ -172,9 +312,10 @@ async def delete_transaction_receipt(
         )
 
 
-@router.get("/storage/{subfolder}/{filename}")
+@router.get("/storage/{subfolder}/{filename:path}")
 async def serve_uploaded_file(
-    subfolder: str,
+    request: Request,
+    subfolder: UploadSubfolder,
     filename: str,
     current_user: User = Depends(get_current_user)
 ):
@@ -182,62 +323,95 @@ async def serve_uploaded_file(
     Serve uploaded files (for local storage only)
     
     - **subfolder**: Subfolder name (transactions, thumbnails)
-    - **filename**: Filename to serve
-    - **Returns**: File content
+    - **filename**: Path of the file in the subfolder (``<user_id>/<name>``)
+    - **Returns**: File content, to its owner or an admin
     """
     
     # Only works with local storage
-    if settings.storage_type != "local":
+    if not _LOCAL_STORAGE:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=error_response("File serving not available for this storage type")
         )
     
-    # Validate subfolder
-    allowed_subfolders = ["transactions", "thumbnails"]
-    if subfolder not in allowed_subfolders:
+    # Ownership is part of the path, so it is checked before touching the disk
+    # and without a database lookup
+    if ".." in filename.split("/"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=error_response("Invalid subfolder")
+            detail=error_response("Invalid filename")
         )
-    
-    # Construct file path
-    file_path = Path(settings.upload_dir) / subfolder / filename
-    
-    # Check if file exists
-    if not file_path.exists() or not file_path.is_file():
+    if _file_owner(filename) != current_user.id and current_user.role != "admin":
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=error_response("File not found")
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=error_response("Not authorized to view this file")
         )
     
     # Security check: ensure file is within upload directory
-    try:
-        file_path.resolve().relative_to(Path(settings.upload_dir).resolve())
-    except ValueError:
+    real_path = os.path.realpath(os.path.join(_UPLOAD_ROOT, subfolder, filename))
+    if not real_path.startswith(_UPLOAD_ROOT):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=error_response("Access denied")
         )
     
-    # For additional security, you might want to check if the user has access to this file
-    # This would require storing file ownership in the database
-    
-    # Determine media type
-    media_type = "application/octet-stream"
-    if filename.lower().endswith(('.jpg', '.jpeg')):
-        media_type = "image/jpeg"
-    elif filename.lower().endswith('.png'):
-        media_type = "image/png"
-    elif filename.lower().endswith('.gif'):
-        media_type = "image/gif"
-    elif filename.lower().endswith('.webp'):
-        media_type = "image/webp"
-    
-    return FileResponse(
-        path=file_path,
+    # One stat, reused by FileResponse for Content-Length and validators
+    try:
+        file_stat = os.stat(real_path)
+    except OSError:
+        file_stat = None
+    if file_stat is None or not stat.S_ISREG(file_stat.st_mode):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=error_response("File not found")
+        )
+    
+    media_type = MEDIA_TYPES.get(os.path.splitext(filename)[1].lower(), "application/octet-stream")
+    
+    # Same format as nginx's ETag, so the tag does not change with who sends
+    # the file; the name alone is not enough as images are re-encoded in place
+    etag = f'"{int(file_stat.st_mtime):x}-{file_stat.st_size:x}"'
+    
+    response = FileResponse(
+        path=real_path,
         media_type=media_type,
-        filename=filename
+        filename=os.path.basename(filename),
+        stat_result=file_stat,
+        # Images do not compress, and a compressed range would not match
+        # its Content-Range
+        headers={"Accept-Ranges": "bytes", "Content-Encoding": "identity"}
+    )
+    cache_control = _cache_control(subfolder, filename)
+    not_modified = not_modified_response(request, response, etag, cache_control)
+    if not_modified is not None:
+        return not_modified
+    
+    # Behind nginx the file is sent by nginx itself (sendfile), not copied
+    # through the worker
+    accel_path = _accel_redirect_path(request, real_path)
+    if accel_path:
+        return Response(
+            media_type=media_type,
+            headers={
+                "X-Accel-Redirect": accel_path,
+                "Content-Disposition": response.headers["content-disposition"],
+                "Cache-Control": cache_control
+            }
+        )
+    
+    if_range = request.headers.get("if-range")
+    byte_range = None if if_range and if_range != etag else _byte_range(request.headers.get("range"), file_stat.st_size)
+    if byte_range is None:
+        return response
+    
+    start, end = byte_range
+    content = await asyncio.to_thread(_read_range, real_path, start, end - start + 1)
+    response.headers["Content-Range"] = f"bytes {start}-{end}/{file_stat.st_size}"
+    del response.headers["content-length"]
+    return Response(
+        content=content,
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        headers=response.headers
     )
 
 
@@ -278,18 +452,14 @@ async def get_transaction_attachment_info(
         "attachment_size": transaction.attachment_size,
     }
     
-    # Generate thumbnail URL for local storage
-    if (transaction.attachment_url and 
-        settings.storage_type == "local" and 
-        transaction.attachment_filename):
+    # Thumbnails are made after upload, so only list one that exists by now
+    if transaction.attachment_url and _LOCAL_STORAGE:
         
-        thumbnail_filename = f"thumb_{transaction.attachment_filename}"
-        thumbnail_path = Path(settings.upload_dir) / "thumbnails" / thumbnail_filename
-        
-        if thumbnail_path.exists():
-            attachment_data["thumbnail_url"] = f"{settings.base_url}/storage/thumbnails/{thumbnail_filename}"
+        thumbnail_filename = thumbnail_name(_stored_name(transaction.attachment_url))
+        if _thumbnail_exists(thumbnail_filename):
+            attachment_data["thumbnail_url"] = _THUMBNAIL_URL_PREFIX + thumbnail_filename
     
-    return success_response(
+    return json_success_response(
         message="Attachment info retrieved",
         data=attachment_data
     )
@@ -297,6 +467,7 @@ async def get_transaction_attachment_info(
 
 @router.post("/upload/test")
 async def test_upload(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user)
 ):
@@ -324,9 +495,9 @@ async def test_upload(
             }
         
         # Test upload (but don't save to transaction)
-        upload_result = await file_upload_service.upload_transaction_receipt(
-            file, current_user.id, 999999  # Use dummy transaction ID
-        )
+        upload_result = await file_upload_service.store_original(file, current_user.id)
+        if upload_result["file_path"]:
+            background_tasks.add_task(file_upload_service.make_thumbnail, upload_result["file_path"])
         
         return {
             "test": "upload",
@@ -1,9 +1,11 @@
 from .user import User, UserCreate, UserUpdate, UserLogin, Token, TokenData
 from .category import Category, CategoryCreate, CategoryUpdate
 from .transaction import Transaction, TransactionCreate, TransactionUpdate, TransactionFilter, TransactionSummary
+from .report import YearMonth, ExportJobCreate
 
 __all__ = [
     "User", "UserCreate", "UserUpdate", "UserLogin", "Token", "TokenData",
     "Category", "CategoryCreate", "CategoryUpdate",
-    "Transaction", "TransactionCreate", "TransactionUpdate", "TransactionFilter", "TransactionSummary"
+    "Transaction", "TransactionCreate", "TransactionUpdate", "TransactionFilter", "TransactionSummary",
+    "YearMonth", "ExportJobCreate"
 ]
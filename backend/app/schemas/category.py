@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
 from datetime import datetime
 from ..models.category import CategoryType
@@ -20,7 +20,10 @@ class CategoryUpdate(BaseModel):
 
 class Category(CategoryBase):
     id: int
+    icon: Optional[str] = None
+    color: Optional[str] = None
+    user_id: int
     created_at: datetime
+    updated_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,54 @@
+from datetime import date
+from typing import Any, Literal, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+# Longest date range accepted for category analysis exports
+MAX_CATEGORY_EXPORT_DAYS = 730
+
+
+class YearMonth(BaseModel):
+    """A calendar month, parsed from ``YYYY-MM``"""
+    year: int = Field(..., ge=2000)
+    month: int = Field(..., ge=1, le=12)
+
+    @model_validator(mode="before")
+    @classmethod
+    def parse_year_month(cls, value: Any) -> Any:
+        if isinstance(value, str):
+            # Fixed-width split instead of a regex: no matching engine, no backtracking
+            year, _, month = value.partition("-")
+            if len(year) != 4 or len(month) != 2 or not (year.isdecimal() and month.isdecimal()):
+                raise ValueError("Invalid month format. Use YYYY-MM")
+            return {"year": year, "month": month}
+        return value
+
+
+class ExportJobCreate(BaseModel):
+    """A report export to render in the background"""
+    report: Literal["monthly", "yearly", "categories"]
+    format: Literal["csv", "pdf"] = "csv"
+    month: Optional[YearMonth] = Field(None, description="Month for monthly exports (YYYY-MM)")
+    year: Optional[int] = Field(None, description="Year for yearly exports")
+    start_date: Optional[date] = Field(None, description="Start date for category exports")
+    end_date: Optional[date] = Field(None, description="End date for category exports")
+
+    @model_validator(mode="after")
+    def check_period(self) -> "ExportJobCreate":
+        if self.report == "monthly":
+            if self.month is None:
+                raise ValueError("month is required for monthly exports")
+        elif self.report == "yearly":
+            current_year = date.today().year
+            if self.year is None or not 2000 <= self.year <= current_year + 1:
+                raise ValueError(f"Invalid year. Must be between 2000 and {current_year + 1}")
+        else:
+            if self.format == "pdf":
+                raise ValueError("PDF export for category analysis not yet implemented")
+            if self.start_date is None or self.end_date is None:
+                raise ValueError("start_date and end_date are required for category exports")
+            if self.start_date > self.end_date:
+                raise ValueError("Start date must be before end date")
+            if (self.end_date - self.start_date).days > MAX_CATEGORY_EXPORT_DAYS:
+                raise ValueError("Date range too large. Maximum 2 years allowed")
+        return self
@@ -1,24 +1,22 @@
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
+from dataclasses import asdict, dataclass
 from datetime import datetime, date
 from decimal import Decimal
 from .category import Category
 
+# Largest batch accepted by POST /transactions/bulk
+MAX_BULK_TRANSACTIONS = 500
+
 
 class TransactionBase(BaseModel):
     category_id: int
-    amount: Decimal
+    amount: Decimal = Field(..., gt=0)
     description: Optional[str] = None
     trans_date: date
     notes: Optional[str] = None
     type: Optional[str] = None
 
-    @validator('amount')
-    def amount_must_be_positive(cls, v):
-        if v <= 0:
-            raise ValueError('Amount must be positive')
-        return v
-
 
 class TransactionCreate(TransactionBase):
     pass
@@ -26,7 +24,7 @@ class TransactionCreate(TransactionBase):
 
 class TransactionUpdate(BaseModel):
     category_id: Optional[int] = None
-    amount: Optional[Decimal] = None
+    amount: Optional[Decimal] = Field(None, gt=0)
     description: Optional[str] = None
     trans_date: Optional[date] = None
     notes: Optional[str] = None
@@ -35,12 +33,6 @@ class TransactionUpdate(BaseModel):
     attachment_filename: Optional[str] = None
     attachment_size: Optional[int] = None
 
-    @validator('amount')
-    def amount_must_be_positive(cls, v):
-        if v is not None and v <= 0:
-            raise ValueError('Amount must be positive')
-        return v
-
 
 class Transaction(TransactionBase):
     id: int
@@ -52,21 +44,29 @@ class Transaction(TransactionBase):
     attachment_size: Optional[int] = None
     category: Optional[Category] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
-class TransactionFilter(BaseModel):
+@dataclass(slots=True)
+class TransactionFilter:
+    """
+    List filters, built from query parameters FastAPI has already validated
+    """
     start_date: Optional[date] = None
     end_date: Optional[date] = None
     category_id: Optional[int] = None
     category_type: Optional[str] = None
+    
+    def to_dict(self) -> dict:
+        """The filters that are set, for echoing back in response meta"""
+        return {key: value for key, value in asdict(self).items() if value is not None}
 
 
 class TransactionSummary(BaseModel):
     total_income: Decimal
     total_expense: Decimal
     balance: Decimal
+    transaction_count: int = 0
     period_start: Optional[date] = None
     period_end: Optional[date] = None
 
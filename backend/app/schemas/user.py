@@ -1,5 +1,6 @@
-from pydantic import BaseModel, EmailStr, validator, Field
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
+from typing import Literal, Optional, List
+from dataclasses import dataclass
 from datetime import datetime
 from app.core.validation import InputValidator
 
@@ -13,20 +14,16 @@ class UserBase(BaseModel):
 class UserCreate(UserBase):
     password: str = Field(..., min_length=8, max_length=128, description="Password (8-128 characters)")
     
-    @validator('email')
-    def validate_email_format(cls, v):
-        if not InputValidator.validate_email_format(v):
-            raise ValueError('Invalid email format')
-        return v
-    
-    @validator('password')
+    @field_validator('password')
+    @classmethod
     def validate_password_strength(cls, v):
         is_valid, errors = InputValidator.validate_password_strength(v)
         if not is_valid:
             raise ValueError(f"Password validation failed: {'; '.join(errors)}")
         return v
     
-    @validator('username')
+    @field_validator('username')
+    @classmethod
     def validate_username(cls, v):
         if not v.replace('_', '').replace('-', '').isalnum():
             raise ValueError('Username can only contain letters, numbers, hyphens, and underscores')
@@ -40,13 +37,8 @@ class UserUpdate(BaseModel):
     phone: Optional[str] = Field(None, max_length=20)
     avatar_url: Optional[str] = Field(None, max_length=255)
     
-    @validator('email')
-    def validate_email_format(cls, v):
-        if v and not InputValidator.validate_email_format(v):
-            raise ValueError('Invalid email format')
-        return v
-    
-    @validator('username')
+    @field_validator('username')
+    @classmethod
     def validate_username(cls, v):
         if v and not v.replace('_', '').replace('-', '').isalnum():
             raise ValueError('Username can only contain letters, numbers, hyphens, and underscores')
@@ -57,7 +49,8 @@ class UserPasswordChange(BaseModel):
     current_password: str = Field(..., description="Current password")
     new_password: str = Field(..., min_length=8, max_length=128, description="New password (8-128 characters)")
     
-    @validator('new_password')
+    @field_validator('new_password')
+    @classmethod
     def validate_password_strength(cls, v):
         is_valid, errors = InputValidator.validate_password_strength(v)
         if not is_valid:
@@ -66,14 +59,7 @@ class UserPasswordChange(BaseModel):
 
 
 class UserRoleUpdate(BaseModel):
-    role: str = Field(..., description="User role")
-    
-    @validator('role')
-    def validate_role(cls, v):
-        allowed_roles = ['user', 'admin']
-        if v not in allowed_roles:
-            raise ValueError(f'Role must be one of: {", ".join(allowed_roles)}')
-        return v
+    role: Literal['user', 'admin'] = Field(..., description="User role")
 
 
 class User(UserBase):
@@ -87,8 +73,7 @@ class User(UserBase):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class UserProfile(BaseModel):
@@ -104,19 +89,34 @@ class UserProfile(BaseModel):
     last_login: Optional[datetime]
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+@dataclass(slots=True)
+class UserRow:
+    """
+    Lightweight user listing row built directly from a column SELECT.
+    Field order matches USER_ROW_FIELDS and the UserProfile response shape.
+    """
+    id: int
+    username: str
+    email: str
+    full_name: Optional[str]
+    role: str
+    is_active: bool
+    is_verified: bool
+    phone: Optional[str]
+    avatar_url: Optional[str]
+    last_login: Optional[datetime]
+    created_at: datetime
+
+
+USER_ROW_FIELDS = tuple(UserRow.__dataclass_fields__)
 
 
 class UserLogin(BaseModel):
     email: EmailStr = Field(..., description="Email address")
     password: str = Field(..., description="Password")
-    
-    @validator('email')
-    def validate_email_format(cls, v):
-        if not InputValidator.validate_email_format(v):
-            raise ValueError('Invalid email format')
-        return v
 
 
 class UserLoginResponse(BaseModel):
@@ -153,19 +153,14 @@ class UserListResponse(BaseModel):
 
 class PasswordResetRequest(BaseModel):
     email: EmailStr = Field(..., description="Email address for password reset")
-    
-    @validator('email')
-    def validate_email_format(cls, v):
-        if not InputValidator.validate_email_format(v):
-            raise ValueError('Invalid email format')
-        return v
 
 
 class PasswordReset(BaseModel):
     token: str = Field(..., description="Password reset token")
     new_password: str = Field(..., min_length=8, max_length=128, description="New password")
     
-    @validator('new_password')
+    @field_validator('new_password')
+    @classmethod
     def validate_password_strength(cls, v):
         is_valid, errors = InputValidator.validate_password_strength(v)
         if not is_valid:
@@ -1,19 +1,34 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
+import asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 from fastapi import HTTPException, status
 from ..crud import category as crud_category
-from ..schemas.category import CategoryCreate, CategoryUpdate
+from ..schemas.category import Category as CategorySchema, CategoryCreate, CategoryUpdate
 from ..models.category import Category
+from .report_cache import report_cache
 
 
 class CategoryService:
     @staticmethod
-    def get_categories(db: Session, skip: int = 0, limit: int = 100) -> List[Category]:
-        return crud_category.get_categories(db, skip=skip, limit=limit)
+    async def get_categories(
+        db: AsyncSession,
+        user_id: int,
+        after_id: Optional[int] = None,
+        limit: int = 100
+    ) -> dict:
+        categories = await crud_category.get_categories(db, user_id, after_id=after_id, limit=limit)
+        return {
+            "items": [CategorySchema.model_validate(category).model_dump() for category in categories],
+            "next_cursor": categories[-1].id if len(categories) == limit else None
+        }
     
     @staticmethod
-    def get_category(db: Session, category_id: int) -> Category:
-        category = crud_category.get_category(db, category_id)
+    async def get_cursor_for_offset(db: AsyncSession, user_id: int, skip: int) -> Optional[int]:
+        return await crud_category.get_category_cursor_for_offset(db, user_id, skip)
+    
+    @staticmethod
+    async def get_category(db: AsyncSession, category_id: int, user_id: int) -> Category:
+        category = await crud_category.get_category(db, category_id, user_id)
         if not category:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -22,24 +37,27 @@ class CategoryService:
         return category
     
     @staticmethod
-    def create_category(db: Session, category_data: CategoryCreate) -> Category:
-        return crud_category.create_category(db, category_data)
+    async def create_category(db: AsyncSession, category_data: CategoryCreate, user_id: int) -> Category:
+        return await crud_category.create_category(db, category_data, user_id)
     
     @staticmethod
-    def update_category(db: Session, category_id: int, category_data: CategoryUpdate) -> Category:
-        category = crud_category.update_category(db, category_id, category_data)
+    async def update_category(db: AsyncSession, category_id: int, user_id: int, category_data: CategoryUpdate) -> Category:
+        category = await crud_category.update_category(db, category_id, user_id, category_data)
         if not category:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Category not found"
             )
+        # Reports embed category names, icons and colors for every month
+        await asyncio.to_thread(report_cache.invalidate_user, user_id)
         return category
     
     @staticmethod
-    def delete_category(db: Session, category_id: int) -> bool:
-        if not crud_category.delete_category(db, category_id):
+    async def delete_category(db: AsyncSession, category_id: int, user_id: int) -> bool:
+        if not await crud_category.delete_category(db, category_id, user_id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Category not found"
             )
+        await asyncio.to_thread(report_cache.invalidate_user, user_id)
         return True
@@ -4,9 +4,10 @@ Report Export Service for PDF and CSV generation
 
 import csv
 import io
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Union
 from datetime import datetime, date
 import calendar
+from itertools import islice
 from decimal import Decimal
 
 try:
@@ -24,150 +25,202 @@ except ImportError:
     REPORTLAB_AVAILABLE = False
 
 
+def _header_table_style(background: str, text_color: str, header_size: int, body_size: Optional[int] = None) -> "TableStyle":
+    commands = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(background)),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor(text_color)),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), header_size),
+    ]
+    if body_size is not None:
+        commands.append(('FONTSIZE', (0, 1), (-1, -1), body_size))
+    commands += [
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]
+    return TableStyle(commands)
+
+
+# Styles are immutable once built, so resolve them once per process instead
+# of on every export
+if REPORTLAB_AVAILABLE:
+    _STYLES = getSampleStyleSheet()
+    _TITLE_STYLE = ParagraphStyle(
+        'CustomTitle',
+        parent=_STYLES['Heading1'],
+        fontSize=24,
+        textColor=colors.HexColor('#2E7D32'),
+        spaceAfter=30,
+        alignment=1  # Center
+    )
+    _HEADING2_STYLE = _STYLES['Heading2']
+    _HEADING3_STYLE = _STYLES['Heading3']
+    _SUMMARY_TABLE_STYLE = _header_table_style('#E8F5E8', '#2E7D32', 12)
+    _DETAIL_TABLE_STYLE = _header_table_style('#E3F2FD', '#1565C0', 10, 9)
+    _INSIGHTS_TABLE_STYLE = _header_table_style('#FFF3E0', '#F57C00', 10, 9)
+
+
+# Rows per chunk of a streamed CSV export
+CSV_CHUNK_ROWS = 500
+
+
+class _Echo:
+    """File-like object whose write() hands the formatted line straight back"""
+    
+    def write(self, value: str) -> str:
+        return value
+
+
+def _stream_csv(rows: Iterable[Union[list, str]]) -> Iterator[str]:
+    """
+    Format rows as CSV without buffering the whole document
+    
+    A row may also be a line the caller already formatted, for rows whose
+    cells can never need quoting.
+    """
+    # writerow is looked up once rather than per row
+    writerow = csv.writer(_Echo()).writerow
+    lines = (row if isinstance(row, str) else writerow(row) for row in rows)
+    # StreamingResponse pulls each chunk of a sync iterator through the
+    # threadpool, so lines are sent in batches rather than one hop per line
+    while chunk := "".join(islice(lines, CSV_CHUNK_ROWS)):
+        yield chunk
+
+
 class ReportExportService:
     """Service for exporting reports to PDF and CSV formats"""
     
     def __init__(self):
-        self.styles = getSampleStyleSheet() if REPORTLAB_AVAILABLE else None
+        self.styles = _STYLES if REPORTLAB_AVAILABLE else None
     
-    def export_monthly_summary_csv(self, report_data: Dict[str, Any]) -> io.StringIO:
-        """Export monthly summary to CSV format"""
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
+    def export_monthly_summary_csv(self, report_data: Dict[str, Any]) -> Iterator[str]:
+        """Export monthly summary to CSV format, streamed in chunks of lines"""
+        return _stream_csv(self._monthly_summary_rows(report_data))
+    
+    def _monthly_summary_rows(self, report_data: Dict[str, Any]) -> Iterator[Union[list, str]]:
         # Write header information
         period = report_data['period']
         summary = report_data['summary']
         
-        writer.writerow(['Monthly Financial Report'])
-        writer.writerow(['Period', f"{period['month_name']} {period['year']}"])
-        writer.writerow(['Start Date', period['start_date']])
-        writer.writerow(['End Date', period['end_date']])
-        writer.writerow([])
+        yield ['Monthly Financial Report']
+        yield ['Period', f"{period['month_name']} {period['year']}"]
+        yield ['Start Date', period['start_date']]
+        yield ['End Date', period['end_date']]
+        yield []
         
         # Write summary
-        writer.writerow(['Summary'])
-        writer.writerow(['Total Income', f"${summary['total_income']:.2f}"])
-        writer.writerow(['Total Expense', f"${summary['total_expense']:.2f}"])
-        writer.writerow(['Balance', f"${summary['balance']:.2f}"])
-        writer.writerow(['Transaction Count', summary['transaction_count']])
-        writer.writerow(['Avg Daily Income', f"${summary['avg_daily_income']:.2f}"])
-        writer.writerow(['Avg Daily Expense', f"${summary['avg_daily_expense']:.2f}"])
-        writer.writerow([])
+        yield ['Summary']
+        yield ['Total Income', f"${summary['total_income']:.2f}"]
+        yield ['Total Expense', f"${summary['total_expense']:.2f}"]
+        yield ['Balance', f"${summary['balance']:.2f}"]
+        yield ['Transaction Count', summary['transaction_count']]
+        yield ['Avg Daily Income', f"${summary['avg_daily_income']:.2f}"]
+        yield ['Avg Daily Expense', f"${summary['avg_daily_expense']:.2f}"]
+        yield []
         
         # Write category breakdown
-        writer.writerow(['Category Breakdown'])
-        writer.writerow(['Category', 'Income', 'Expense', 'Total', 'Transaction Count', 'Percentage'])
+        yield ['Category Breakdown']
+        yield ['Category', 'Income', 'Expense', 'Total', 'Transaction Count', 'Percentage']
         
         total_amount = summary['total_income'] + summary['total_expense']
         for category in report_data['category_breakdown']:
             percentage = (category['total'] / total_amount * 100) if total_amount > 0 else 0
-            writer.writerow([
+            yield [
                 category['category_name'],
                 f"${category['income']:.2f}",
                 f"${category['expense']:.2f}",
                 f"${category['total']:.2f}",
                 category['count'],
                 f"{percentage:.1f}%"
-            ])
+            ]
         
-        writer.writerow([])
+        yield []
         
         # Write daily summary
-        writer.writerow(['Daily Summary'])
-        writer.writerow(['Date', 'Income', 'Expense', 'Balance'])
+        yield ['Daily Summary']
+        yield ['Date', 'Income', 'Expense', 'Balance']
         
+        # ISO dates and fixed-point amounts never need quoting, so these lines
+        # skip the csv module
         for day in report_data['daily_summary']:
-            writer.writerow([
-                day['date'],
-                f"${day['income']:.2f}",
-                f"${day['expense']:.2f}",
-                f"${day['balance']:.2f}"
-            ])
-        
-        output.seek(0)
-        return output
+            yield f"{day['date']},${day['income']:.2f},${day['expense']:.2f},${day['balance']:.2f}\r\n"
     
-    def export_yearly_comparison_csv(self, report_data: Dict[str, Any]) -> io.StringIO:
-        """Export yearly comparison to CSV format"""
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
+    def export_yearly_comparison_csv(self, report_data: Dict[str, Any]) -> Iterator[str]:
+        """Export yearly comparison to CSV format, streamed in chunks of lines"""
+        return _stream_csv(self._yearly_comparison_rows(report_data))
+    
+    def _yearly_comparison_rows(self, report_data: Dict[str, Any]) -> Iterator[list]:
         # Write header information
         summary = report_data['summary']
         
-        writer.writerow(['Yearly Financial Report'])
-        writer.writerow(['Year', report_data['year']])
-        writer.writerow([])
+        yield ['Yearly Financial Report']
+        yield ['Year', report_data['year']]
+        yield []
         
         # Write summary
-        writer.writerow(['Annual Summary'])
-        writer.writerow(['Yearly Income', f"${summary['yearly_income']:.2f}"])
-        writer.writerow(['Yearly Expense', f"${summary['yearly_expense']:.2f}"])
-        writer.writerow(['Yearly Balance', f"${summary['yearly_balance']:.2f}"])
-        writer.writerow(['Avg Monthly Income', f"${summary['avg_monthly_income']:.2f}"])
-        writer.writerow(['Avg Monthly Expense', f"${summary['avg_monthly_expense']:.2f}"])
-        writer.writerow(['Total Transactions', summary['total_transactions']])
-        writer.writerow([])
+        yield ['Annual Summary']
+        yield ['Yearly Income', f"${summary['yearly_income']:.2f}"]
+        yield ['Yearly Expense', f"${summary['yearly_expense']:.2f}"]
+        yield ['Yearly Balance', f"${summary['yearly_balance']:.2f}"]
+        yield ['Avg Monthly Income', f"${summary['avg_monthly_income']:.2f}"]
+        yield ['Avg Monthly Expense', f"${summary['avg_monthly_expense']:.2f}"]
+        yield ['Total Transactions', summary['total_transactions']]
+        yield []
         
         # Write monthly data
-        writer.writerow(['Monthly Breakdown'])
-        writer.writerow(['Month', 'Income', 'Expense', 'Balance', 'Transaction Count'])
+        yield ['Monthly Breakdown']
+        yield ['Month', 'Income', 'Expense', 'Balance', 'Transaction Count']
         
         for month_data in report_data['monthly_data']:
-            writer.writerow([
+            yield [
                 month_data['month_name'],
                 f"${month_data['income']:.2f}",
                 f"${month_data['expense']:.2f}",
                 f"${month_data['balance']:.2f}",
                 month_data['transaction_count']
-            ])
+            ]
         
-        writer.writerow([])
+        yield []
         
         # Write insights
         insights = report_data['insights']
-        writer.writerow(['Key Insights'])
-        writer.writerow(['Best Month (Balance)', insights['best_month']['month'], f"${insights['best_month']['balance']:.2f}"])
-        writer.writerow(['Worst Month (Balance)', insights['worst_month']['month'], f"${insights['worst_month']['balance']:.2f}"])
-        writer.writerow(['Highest Income Month', insights['highest_income_month']['month'], f"${insights['highest_income_month']['income']:.2f}"])
-        writer.writerow(['Highest Expense Month', insights['highest_expense_month']['month'], f"${insights['highest_expense_month']['expense']:.2f}"])
-        
-        output.seek(0)
-        return output
+        yield ['Key Insights']
+        yield ['Best Month (Balance)', insights['best_month']['month'], f"${insights['best_month']['balance']:.2f}"]
+        yield ['Worst Month (Balance)', insights['worst_month']['month'], f"${insights['worst_month']['balance']:.2f}"]
+        yield ['Highest Income Month', insights['highest_income_month']['month'], f"${insights['highest_income_month']['income']:.2f}"]
+        yield ['Highest Expense Month', insights['highest_expense_month']['month'], f"${insights['highest_expense_month']['expense']:.2f}"]
     
-    def export_category_analysis_csv(self, report_data: Dict[str, Any]) -> io.StringIO:
-        """Export category analysis to CSV format"""
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
+    def export_category_analysis_csv(self, report_data: Dict[str, Any]) -> Iterator[str]:
+        """Export category analysis to CSV format, streamed in chunks of lines"""
+        return _stream_csv(self._category_analysis_rows(report_data))
+    
+    def _category_analysis_rows(self, report_data: Dict[str, Any]) -> Iterator[list]:
         # Write header information
         period = report_data['period']
         summary = report_data['summary']
         
-        writer.writerow(['Category Analysis Report'])
-        writer.writerow(['Period', f"{period['start_date']} to {period['end_date']}"])
-        writer.writerow(['Days', period['days']])
-        writer.writerow([])
+        yield ['Category Analysis Report']
+        yield ['Period', f"{period['start_date']} to {period['end_date']}"]
+        yield ['Days', period['days']]
+        yield []
         
         # Write summary
-        writer.writerow(['Summary'])
-        writer.writerow(['Total Income', f"${summary['total_income']:.2f}"])
-        writer.writerow(['Total Expense', f"${summary['total_expense']:.2f}"])
-        writer.writerow(['Balance', f"${summary['balance']:.2f}"])
-        writer.writerow(['Income Categories', summary['income_categories_count']])
-        writer.writerow(['Expense Categories', summary['expense_categories_count']])
-        writer.writerow([])
+        yield ['Summary']
+        yield ['Total Income', f"${summary['total_income']:.2f}"]
+        yield ['Total Expense', f"${summary['total_expense']:.2f}"]
+        yield ['Balance', f"${summary['balance']:.2f}"]
+        yield ['Income Categories', summary['income_categories_count']]
+        yield ['Expense Categories', summary['expense_categories_count']]
+        yield []
         
         # Write income categories
-        writer.writerow(['Income Categories'])
-        writer.writerow(['Category', 'Total Amount', 'Percentage', 'Transaction Count', 'Avg Amount', 'Max Amount', 'Min Amount'])
+        yield ['Income Categories']
+        yield ['Category', 'Total Amount', 'Percentage', 'Transaction Count', 'Avg Amount', 'Max Amount', 'Min Amount']
         
         for category in report_data['income_categories']:
-            writer.writerow([
+            yield [
                 category['name'],
                 f"${category['total_amount']:.2f}",
                 f"{category['percentage']:.1f}%",
@@ -175,16 +228,16 @@ class ReportExportService:
                 f"${category['avg_amount']:.2f}",
                 f"${category['max_amount']:.2f}",
                 f"${category['min_amount']:.2f}"
-            ])
+            ]
         
-        writer.writerow([])
+        yield []
         
         # Write expense categories
-        writer.writerow(['Expense Categories'])
-        writer.writerow(['Category', 'Total Amount', 'Percentage', 'Transaction Count', 'Avg Amount', 'Max Amount', 'Min Amount'])
+        yield ['Expense Categories']
+        yield ['Category', 'Total Amount', 'Percentage', 'Transaction Count', 'Avg Amount', 'Max Amount', 'Min Amount']
         
         for category in report_data['expense_categories']:
-            writer.writerow([
+            yield [
                 category['name'],
                 f"${category['total_amount']:.2f}",
                 f"{category['percentage']:.1f}%",
@@ -192,10 +245,7 @@ class ReportExportService:
                 f"${category['avg_amount']:.2f}",
                 f"${category['max_amount']:.2f}",
                 f"${category['min_amount']:.2f}"
-            ])
-        
-        output.seek(0)
-        return output
+            ]
     
     def export_monthly_summary_pdf(self, report_data: Dict[str, Any]) -> io.BytesIO:
         """Export monthly summary to PDF format"""
@@ -207,21 +257,11 @@ class ReportExportService:
         doc = SimpleDocTemplate(buffer, pagesize=A4)
         story = []
         
-        # Title
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#2E7D32'),
-            spaceAfter=30,
-            alignment=1  # Center
-        )
-        
         period = report_data['period']
         summary = report_data['summary']
         
-        story.append(Paragraph(f"Monthly Financial Report", title_style))
-        story.append(Paragraph(f"{period['month_name']} {period['year']}", self.styles['Heading2']))
+        story.append(Paragraph(f"Monthly Financial Report", _TITLE_STYLE))
+        story.append(Paragraph(f"{period['month_name']} {period['year']}", _HEADING2_STYLE))
         story.append(Spacer(1, 20))
         
         # Summary table
@@ -236,24 +276,15 @@ class ReportExportService:
         ]
         
         summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#E8F5E8')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#2E7D32')),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(Paragraph("Financial Summary", self.styles['Heading3']))
+        summary_table.setStyle(_SUMMARY_TABLE_STYLE)
+        
+        story.append(Paragraph("Financial Summary", _HEADING3_STYLE))
         story.append(summary_table)
         story.append(Spacer(1, 30))
         
         # Category breakdown
         if report_data['category_breakdown']:
-            story.append(Paragraph("Category Breakdown", self.styles['Heading3']))
+            story.append(Paragraph("Category Breakdown", _HEADING3_STYLE))
             
             category_data = [['Category', 'Income', 'Expense', 'Total', 'Count']]
             for category in report_data['category_breakdown'][:10]:  # Top 10
@@ -266,17 +297,7 @@ class ReportExportService:
                 ])
             
             category_table = Table(category_data, colWidths=[2*inch, 1.2*inch, 1.2*inch, 1.2*inch, 0.8*inch])
-            category_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#E3F2FD')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#1565C0')),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('FONTSIZE', (0, 1), (-1, -1), 9),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
+            category_table.setStyle(_DETAIL_TABLE_STYLE)
             
             story.append(category_table)
         
@@ -295,20 +316,10 @@ class ReportExportService:
         doc = SimpleDocTemplate(buffer, pagesize=A4)
         story = []
         
-        # Title
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#2E7D32'),
-            spaceAfter=30,
-            alignment=1  # Center
-        )
-        
         summary = report_data['summary']
         
-        story.append(Paragraph(f"Yearly Financial Report", title_style))
-        story.append(Paragraph(f"Year {report_data['year']}", self.styles['Heading2']))
+        story.append(Paragraph(f"Yearly Financial Report", _TITLE_STYLE))
+        story.append(Paragraph(f"Year {report_data['year']}", _HEADING2_STYLE))
         story.append(Spacer(1, 20))
         
         # Annual summary table
@@ -323,23 +334,14 @@ class ReportExportService:
         ]
         
         annual_table = Table(annual_data, colWidths=[3*inch, 2*inch])
-        annual_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#E8F5E8')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#2E7D32')),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(Paragraph("Annual Summary", self.styles['Heading3']))
+        annual_table.setStyle(_SUMMARY_TABLE_STYLE)
+        
+        story.append(Paragraph("Annual Summary", _HEADING3_STYLE))
         story.append(annual_table)
         story.append(Spacer(1, 30))
         
         # Monthly breakdown
-        story.append(Paragraph("Monthly Breakdown", self.styles['Heading3']))
+        story.append(Paragraph("Monthly Breakdown", _HEADING3_STYLE))
         
         monthly_data = [['Month', 'Income', 'Expense', 'Balance', 'Transactions']]
         for month in report_data['monthly_data']:
@@ -352,24 +354,14 @@ class ReportExportService:
             ])
         
         monthly_table = Table(monthly_data, colWidths=[1.5*inch, 1.2*inch, 1.2*inch, 1.2*inch, 1*inch])
-        monthly_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#E3F2FD')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#1565C0')),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        monthly_table.setStyle(_DETAIL_TABLE_STYLE)
         
         story.append(monthly_table)
         story.append(Spacer(1, 20))
         
         # Insights
         insights = report_data['insights']
-        story.append(Paragraph("Key Insights", self.styles['Heading3']))
+        story.append(Paragraph("Key Insights", _HEADING3_STYLE))
         
         insights_data = [
             ['Insight', 'Details'],
@@ -380,17 +372,7 @@ class ReportExportService:
         ]
         
         insights_table = Table(insights_data, colWidths=[2.5*inch, 3*inch])
-        insights_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#FFF3E0')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#F57C00')),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        insights_table.setStyle(_INSIGHTS_TABLE_STYLE)
         
         story.append(insights_table)
         
@@ -0,0 +1,109 @@
+"""
+Rendered report exports kept as immutable objects in S3
+
+Exports of closed periods are uploaded once and later requests are redirected
+to a presigned URL. Object keys embed the report cache's version tag for the
+months covered, so a back-dated transaction or a category edit produces a new
+key instead of serving a stale file. Background export jobs for open periods
+are uploaded under ``reports/<user>/jobs/``. Configure a bucket lifecycle rule
+on the ``reports/`` prefix to expire superseded objects.
+"""
+
+import asyncio
+from typing import Iterable, Optional
+
+import boto3
+from botocore.exceptions import BotoCoreError, ClientError
+
+from ..core.config import get_settings
+from ..core.logging import get_logger
+from .report_cache import report_cache
+
+logger = get_logger("export_cache")
+
+PRESIGNED_URL_EXPIRES_SECONDS = 300
+
+
+class ExportCache:
+    """Upload rendered exports to S3 and hand out presigned download URLs"""
+
+    def __init__(self, s3_client=None, bucket_name: str = ""):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+
+    @property
+    def enabled(self) -> bool:
+        # Version tags must survive restarts and be shared by all workers,
+        # otherwise a reset counter could match an outdated object
+        return self.s3_client is not None and report_cache.backend.shared
+
+    def object_key(self, user_id: int, period: str, fmt: str, months: Iterable[str]) -> Optional[str]:
+        """S3 key for an export, or None when caching is unavailable"""
+        if not self.enabled:
+            return None
+        tag = report_cache.version_tag(user_id, months)
+        if tag is None:
+            return None
+        return f"reports/{user_id}/{period}-{tag}.{fmt}"
+
+    def job_key(self, user_id: int, job_id: str, fmt: str) -> Optional[str]:
+        """S3 key for a one-off export job result, or None without a bucket"""
+        if self.s3_client is None:
+            return None
+        return f"reports/{user_id}/jobs/{job_id}.{fmt}"
+
+    async def get_url(self, key: str, filename: str) -> Optional[str]:
+        """Presigned URL for an existing object, None if it has not been stored yet"""
+        try:
+            await asyncio.to_thread(self.s3_client.head_object, Bucket=self.bucket_name, Key=key)
+            return await asyncio.to_thread(
+                self.s3_client.generate_presigned_url,
+                "get_object",
+                Params={
+                    "Bucket": self.bucket_name,
+                    "Key": key,
+                    "ResponseContentDisposition": f"attachment; filename={filename}"
+                },
+                ExpiresIn=PRESIGNED_URL_EXPIRES_SECONDS
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey"):
+                logger.warning("Export cache lookup failed", key=key, error=str(e))
+            return None
+        except BotoCoreError as e:
+            # Unreachable endpoint, missing credentials: render instead
+            logger.warning("Export cache lookup failed", key=key, error=str(e))
+            return None
+
+    async def store(self, key: str, body: bytes, content_type: str) -> bool:
+        """Upload an export; returns False (after logging) if the upload failed"""
+        try:
+            await asyncio.to_thread(
+                self.s3_client.put_object,
+                Bucket=self.bucket_name,
+                Key=key,
+                Body=body,
+                ContentType=content_type
+            )
+        except Exception as e:
+            logger.warning("Failed to store export", key=key, error=str(e))
+            return False
+        return True
+
+
+def _create_export_cache() -> ExportCache:
+    settings = get_settings()
+    if settings.storage_type != "s3" or not settings.s3_bucket_name:
+        return ExportCache()
+
+    s3_client = boto3.client(
+        "s3",
+        region_name=settings.s3_region,
+        aws_access_key_id=settings.s3_access_key_id or None,
+        aws_secret_access_key=settings.s3_secret_access_key or None,
+        endpoint_url=settings.s3_endpoint_url or None
+    )
+    return ExportCache(s3_client, settings.s3_bucket_name)
+
+
+export_cache = _create_export_cache()
@@ -0,0 +1,261 @@
+"""
+Background report exports
+
+``POST /reports/export/jobs`` records a job and returns at once; a small pool
+of consumer tasks renders it off the event loop and uploads the result to S3
+(or keeps it in the job store when no bucket is configured). Job records live
+in Redis when it is configured, so any worker can answer status polls.
+"""
+
+import asyncio
+import time
+import uuid
+from datetime import date, datetime, timezone
+from typing import Dict, Optional, Set, Tuple
+
+import redis.asyncio as redis
+
+from ..core.config import get_settings
+from ..core.database import SessionLocal
+from ..core.logging import get_logger
+from ..schemas.report import ExportJobCreate
+from .export import report_export_service
+from .export_cache import export_cache
+from .reporting import MONTH_SLUGS, ReportingService
+
+logger = get_logger("export_jobs")
+
+# Finished jobs (and results kept outside S3) can be fetched for this long
+EXPORT_JOB_TTL_SECONDS = 3600
+EXPORT_QUEUE_MAXSIZE = 1000
+# Jobs live in the queue of the process that accepted them, so one still
+# unfinished this long after it was queued is taken to be lost with that
+# process (restarted or killed) and reported as failed
+EXPORT_JOB_DEADLINE_SECONDS = 600
+# Renders run in threads; keep a handful per process so exports cannot
+# crowd out request handling
+EXPORT_WORKERS = 2
+
+CONTENT_TYPES = {"csv": "text/csv", "pdf": "application/pdf"}
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class InMemoryExportJobStore:
+    """Per-process job store for development (not shared across workers)"""
+
+    def __init__(self, ttl_seconds: int = EXPORT_JOB_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._jobs: Dict[str, Tuple[float, Dict[str, str]]] = {}
+        self._results: Dict[str, Tuple[float, bytes]] = {}
+
+    def _prune(self):
+        now = time.time()
+        for entries in (self._jobs, self._results):
+            for job_id in [job_id for job_id, (expires, _) in entries.items() if now >= expires]:
+                del entries[job_id]
+
+    async def create(self, job_id: str, record: Dict[str, str]):
+        self._prune()
+        self._jobs[job_id] = (time.time() + self.ttl_seconds, record)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, str]]:
+        entry = self._jobs.get(job_id)
+        if entry is None or time.time() >= entry[0]:
+            return None
+        return entry[1]
+
+    async def update(self, job_id: str, **fields: str):
+        record = await self.get(job_id)
+        if record is not None:
+            record.update(fields)
+            self._jobs[job_id] = (time.time() + self.ttl_seconds, record)
+
+    async def set_result(self, job_id: str, body: bytes):
+        self._results[job_id] = (time.time() + self.ttl_seconds, body)
+
+    async def get_result(self, job_id: str) -> Optional[bytes]:
+        entry = self._results.get(job_id)
+        if entry is None or time.time() >= entry[0]:
+            return None
+        return entry[1]
+
+
+class RedisExportJobStore:
+    """Job store shared by all workers: one Redis hash per job, results as plain keys"""
+
+    KEY_PREFIX = "export:job:"
+    RESULT_PREFIX = "export:result:"
+
+    def __init__(self, redis_url: str, ttl_seconds: int = EXPORT_JOB_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.redis_client = redis.from_url(redis_url, decode_responses=True)
+        # Rendered files are binary, so they go through a client that does not decode
+        self.result_client = redis.from_url(redis_url)
+
+    async def create(self, job_id: str, record: Dict[str, str]):
+        await self.update(job_id, **record)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, str]]:
+        return await self.redis_client.hgetall(f"{self.KEY_PREFIX}{job_id}") or None
+
+    async def update(self, job_id: str, **fields: str):
+        key = f"{self.KEY_PREFIX}{job_id}"
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=fields)
+            pipe.expire(key, self.ttl_seconds)
+            await pipe.execute()
+
+    async def set_result(self, job_id: str, body: bytes):
+        await self.result_client.set(f"{self.RESULT_PREFIX}{job_id}", body, ex=self.ttl_seconds)
+
+    async def get_result(self, job_id: str) -> Optional[bytes]:
+        return await self.result_client.get(f"{self.RESULT_PREFIX}{job_id}")
+
+
+def _create_job_store():
+    redis_url = get_settings().redis_url
+    if redis_url:
+        return RedisExportJobStore(redis_url)
+    return InMemoryExportJobStore()
+
+
+def export_filename(export: ExportJobCreate) -> str:
+    """Download filename, matching the synchronous export endpoints"""
+    if export.report == "monthly":
+        name = f"monthly_report_{export.month.year}_{export.month.month:02d}_{MONTH_SLUGS[export.month.month]}"
+    elif export.report == "yearly":
+        name = f"yearly_report_{export.year}"
+    else:
+        name = f"category_analysis_{export.start_date}_{export.end_date}"
+    return f"{name}.{export.format}"
+
+
+def _closed_period_key(user_id: int, export: ExportJobCreate) -> Optional[str]:
+    """Versioned export cache key shared with the synchronous endpoints for closed periods"""
+    today = date.today()
+    if export.report == "monthly" and (export.month.year, export.month.month) < (today.year, today.month):
+        period = f"{export.month.year}-{export.month.month:02d}"
+        return export_cache.object_key(user_id, period, export.format, [period])
+    if export.report == "yearly" and export.year < today.year:
+        months = [f"{export.year}-{month:02d}" for month in range(1, 13)]
+        return export_cache.object_key(user_id, str(export.year), export.format, months)
+    return None
+
+
+def _render(user_id: int, export: ExportJobCreate) -> bytes:
+    """Query and render an export; runs in a worker thread with its own session"""
+    db = SessionLocal()
+    try:
+        reporting_service = ReportingService(db)
+        if export.report == "monthly":
+            report_data = reporting_service.get_monthly_summary(user_id, export.month.year, export.month.month)
+            if export.format == "pdf":
+                return report_export_service.export_monthly_summary_pdf(report_data).getvalue()
+            csv_lines = report_export_service.export_monthly_summary_csv(report_data)
+        elif export.report == "yearly":
+            report_data = reporting_service.get_yearly_comparison(user_id, export.year)
+            if export.format == "pdf":
+                return report_export_service.export_yearly_comparison_pdf(report_data).getvalue()
+            csv_lines = report_export_service.export_yearly_comparison_csv(report_data)
+        else:
+            report_data = reporting_service.get_category_analysis(user_id, export.start_date, export.end_date)
+            csv_lines = report_export_service.export_category_analysis_csv(report_data)
+        return "".join(csv_lines).encode()
+    finally:
+        db.close()
+
+
+class ExportJobQueue:
+    """Renders queued exports on a pool of consumer tasks, off the event loop"""
+
+    def __init__(self, store, workers: int = EXPORT_WORKERS, max_queue_size: int = EXPORT_QUEUE_MAXSIZE):
+        self.store = store
+        self.workers = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._tasks: Set[asyncio.Task] = set()
+
+    def start(self):
+        """Start the consumer tasks (call once from app startup)"""
+        self._tasks = {task for task in self._tasks if not task.done()}
+        while len(self._tasks) < self.workers:
+            self._tasks.add(asyncio.create_task(self._run()))
+
+    async def submit(self, user_id: int, export: ExportJobCreate) -> Dict[str, str]:
+        """
+        Record a job and queue it for rendering
+
+        Raises asyncio.QueueFull when the backlog is at EXPORT_QUEUE_MAXSIZE.
+        """
+        if self.queue.full():
+            raise asyncio.QueueFull
+
+        job_id = uuid.uuid4().hex
+        record = {
+            "id": job_id,
+            "user_id": str(user_id),
+            "status": JOB_QUEUED,
+            "format": export.format,
+            "filename": export_filename(export),
+            "params": export.model_dump_json(),
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        await self.store.create(job_id, record)
+        self.queue.put_nowait(job_id)
+        return record
+
+    async def get(self, job_id: str) -> Optional[Dict[str, str]]:
+        """A job's record; a job past EXPORT_JOB_DEADLINE_SECONDS is marked failed"""
+        record = await self.store.get(job_id)
+        if record is not None and record["status"] in (JOB_QUEUED, JOB_RUNNING):
+            age = datetime.now(timezone.utc) - datetime.fromisoformat(record["created_at"])
+            if age.total_seconds() > EXPORT_JOB_DEADLINE_SECONDS:
+                error = "Export job did not finish in time, please request it again"
+                await self.store.update(job_id, status=JOB_FAILED, error=error)
+                record.update(status=JOB_FAILED, error=error)
+        return record
+
+    async def get_result(self, job_id: str) -> Optional[bytes]:
+        return await self.store.get_result(job_id)
+
+    async def _run(self):
+        while True:
+            job_id = await self.queue.get()
+            try:
+                await self._process(job_id)
+            except Exception as e:
+                logger.error("Export job failed", job_id=job_id, error=str(e), exc_info=e)
+                await self.store.update(job_id, status=JOB_FAILED, error=str(e))
+
+    async def _process(self, job_id: str):
+        record = await self.store.get(job_id)
+        # Already given up on by a status poll
+        if record is None or record["status"] != JOB_QUEUED:
+            return
+
+        user_id = int(record["user_id"])
+        export = ExportJobCreate.model_validate_json(record["params"])
+        await self.store.update(job_id, status=JOB_RUNNING)
+
+        # A closed period may already have been rendered by an earlier export
+        key = await asyncio.to_thread(_closed_period_key, user_id, export)
+        if key and await export_cache.get_url(key, record["filename"]):
+            await self.store.update(job_id, status=JOB_DONE, s3_key=key)
+            return
+
+        body = await asyncio.to_thread(_render, user_id, export)
+
+        key = key or export_cache.job_key(user_id, job_id, export.format)
+        if key and await export_cache.store(key, body, CONTENT_TYPES[export.format]):
+            await self.store.update(job_id, status=JOB_DONE, s3_key=key)
+        else:
+            await self.store.set_result(job_id, body)
+            await self.store.update(job_id, status=JOB_DONE)
+
+        logger.info("Export job finished", job_id=job_id, user_id=user_id, report=export.report, size=len(body))
+
+
+export_job_queue = ExportJobQueue(_create_job_store())
@@ -0,0 +1,415 @@
+"""
+Push notification dispatch through Firebase Cloud Messaging
+"""
+
+import asyncio
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import firebase_admin
+import orjson
+import redis.asyncio as redis
+from firebase_admin import credentials, exceptions, messaging
+
+from ..core.config import get_settings
+from ..core.logging import get_logger
+
+logger = get_logger("notifications")
+
+
+def _get_firebase_app() -> firebase_admin.App:
+    """Initialize the Firebase Admin SDK once and return its default app"""
+    if firebase_admin._apps:
+        return firebase_admin.get_app()
+    # Initialize with default credentials (for development)
+    # In production, use service account key file
+    return firebase_admin.initialize_app(credentials.ApplicationDefault())
+
+
+# Resolved once so send paths skip the SDK's per-call default-app lookup. The
+# app's credential caches its OAuth access token and refreshes it near expiry.
+firebase_app = _get_firebase_app()
+
+# FCM accepts at most 500 messages per send_each_async call
+FCM_MAX_BATCH_SIZE = 500
+# How long the dispatcher waits for more messages before sending a partial batch
+BATCH_WINDOW_SECONDS = 0.05
+# Pending messages beyond this are rejected rather than buffered without bound
+NOTIFICATION_QUEUE_MAXSIZE = 10000
+# Batches in flight at once; the next batch is collected while earlier ones send
+MAX_CONCURRENT_SENDS = 64
+
+# Errors that mean the registration token itself is no longer usable
+INVALID_TOKEN_ERRORS = (
+    messaging.UnregisteredError,
+    messaging.SenderIdMismatchError,
+    exceptions.InvalidArgumentError,
+)
+
+# Registered tokens expire unless the app re-registers them
+FCM_TOKEN_TTL_SECONDS = 60 * 86400
+
+
+class InMemoryFCMTokenStore:
+    """Per-process token store for development (not shared across workers)"""
+
+    def __init__(self, ttl_seconds: int = FCM_TOKEN_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._tokens: Dict[str, Tuple[float, Dict[str, str]]] = {}
+
+    async def set(self, user_id: str, token: str, platform: str):
+        self._tokens[user_id] = (time.time() + self.ttl_seconds, _token_record(token, platform))
+
+    async def get(self, user_id: str) -> Optional[Dict[str, str]]:
+        entry = self._tokens.get(user_id)
+        if entry is None:
+            return None
+        if time.time() >= entry[0]:
+            self._tokens.pop(user_id, None)
+            return None
+        return entry[1]
+
+    async def get_many(self, user_ids: List[str]) -> Dict[str, Dict[str, str]]:
+        """Registered tokens for ``user_ids``; users without one are omitted"""
+        records = {}
+        for user_id in user_ids:
+            record = await self.get(user_id)
+            if record is not None:
+                records[user_id] = record
+        return records
+
+    async def delete(self, user_id: str, token: Optional[str] = None) -> bool:
+        """Remove a user's token; with ``token``, only if it is still the registered one"""
+        record = await self.get(user_id)
+        if record is None or (token is not None and record["token"] != token):
+            return False
+        del self._tokens[user_id]
+        return True
+
+    async def all(self) -> Dict[str, Dict[str, str]]:
+        now = time.time()
+        return {user_id: record for user_id, (expires, record) in self._tokens.items() if now < expires}
+
+
+class RedisFCMTokenStore:
+    """Token store shared by all workers: one Redis hash per user with a TTL"""
+
+    KEY_PREFIX = "fcm:"
+
+    def __init__(self, redis_url: str, ttl_seconds: int = FCM_TOKEN_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.redis_client = redis.from_url(redis_url, decode_responses=True)
+
+    def _key(self, user_id: str) -> str:
+        return f"{self.KEY_PREFIX}{user_id}"
+
+    async def set(self, user_id: str, token: str, platform: str):
+        key = self._key(user_id)
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping=_token_record(token, platform))
+            pipe.expire(key, self.ttl_seconds)
+            await pipe.execute()
+
+    async def get(self, user_id: str) -> Optional[Dict[str, str]]:
+        return await self.redis_client.hgetall(self._key(user_id)) or None
+
+    async def get_many(self, user_ids: List[str]) -> Dict[str, Dict[str, str]]:
+        """Registered tokens for ``user_ids`` in one round trip; users without one are omitted"""
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.hgetall(self._key(user_id))
+            results = await pipe.execute()
+        return {user_id: record for user_id, record in zip(user_ids, results) if record}
+
+    async def delete(self, user_id: str, token: Optional[str] = None) -> bool:
+        """Remove a user's token; with ``token``, only if it is still the registered one"""
+        key = self._key(user_id)
+        if token is not None and await self.redis_client.hget(key, "token") != token:
+            return False
+        return bool(await self.redis_client.delete(key))
+
+    async def all(self) -> Dict[str, Dict[str, str]]:
+        tokens = {}
+        async for key in self.redis_client.scan_iter(match=f"{self.KEY_PREFIX}*", count=500):
+            record = await self.redis_client.hgetall(key)
+            if record:
+                tokens[key[len(self.KEY_PREFIX):]] = record
+        return tokens
+
+
+def _token_record(token: str, platform: str) -> Dict[str, str]:
+    return {
+        "token": token,
+        "platform": platform,
+        "updated_at": datetime.now(timezone.utc).isoformat()
+    }
+
+
+def _create_token_store():
+    redis_url = get_settings().redis_url
+    if redis_url:
+        return RedisFCMTokenStore(redis_url)
+    return InMemoryFCMTokenStore()
+
+
+fcm_token_store = _create_token_store()
+
+
+# Identical notifications to the same user within this window are sent once
+NOTIFICATION_DEDUP_TTL_SECONDS = 5
+
+
+class InMemoryNotificationDedup:
+    """Per-process duplicate suppression for development (not shared across workers)"""
+
+    def __init__(self, ttl_seconds: int = NOTIFICATION_DEDUP_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._claims: Dict[str, float] = {}
+
+    async def claim(self, key: str) -> bool:
+        """True if ``key`` was not claimed within the window, False for a duplicate"""
+        now = time.time()
+        if len(self._claims) > 1024:
+            self._claims = {k: expires for k, expires in self._claims.items() if now < expires}
+        if now < self._claims.get(key, 0):
+            return False
+        self._claims[key] = now + self.ttl_seconds
+        return True
+
+    async def claim_many(self, keys: List[str]) -> List[bool]:
+        """``claim`` for each key, in order"""
+        return [await self.claim(key) for key in keys]
+
+    async def release(self, key: str):
+        self._claims.pop(key, None)
+
+    async def release_many(self, keys: List[str]):
+        for key in keys:
+            self._claims.pop(key, None)
+
+
+class RedisNotificationDedup:
+    """Duplicate suppression shared by all workers: SET NX with a short expiry"""
+
+    KEY_PREFIX = "notif:dedup:"
+
+    def __init__(self, redis_url: str, ttl_seconds: int = NOTIFICATION_DEDUP_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.redis_client = redis.from_url(redis_url, decode_responses=True)
+
+    async def claim(self, key: str) -> bool:
+        """True if ``key`` was not claimed within the window, False for a duplicate"""
+        return bool(await self.redis_client.set(f"{self.KEY_PREFIX}{key}", "1", nx=True, ex=self.ttl_seconds))
+
+    async def claim_many(self, keys: List[str]) -> List[bool]:
+        """``claim`` for each key, in order, in one round trip"""
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.set(f"{self.KEY_PREFIX}{key}", "1", nx=True, ex=self.ttl_seconds)
+            return [bool(claimed) for claimed in await pipe.execute()]
+
+    async def release(self, key: str):
+        await self.redis_client.delete(f"{self.KEY_PREFIX}{key}")
+
+    async def release_many(self, keys: List[str]):
+        if keys:
+            await self.redis_client.delete(*(f"{self.KEY_PREFIX}{key}" for key in keys))
+
+
+def _create_dedup():
+    redis_url = get_settings().redis_url
+    if redis_url:
+        return RedisNotificationDedup(redis_url)
+    return InMemoryNotificationDedup()
+
+
+notification_dedup = _create_dedup()
+
+
+def content_dedup_key(title: str, body: str, data: Dict[str, str]) -> str:
+    """Dedup key for free-form notifications: a digest of everything the user would see"""
+    payload = orjson.dumps([title, body, data], option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(payload, digest_size=8).hexdigest()
+
+
+class NotificationContent(NamedTuple):
+    """Title, body and data payload of a push notification"""
+    title: str
+    body: str
+    data: Tuple[Tuple[str, str], ...]
+
+
+# Message text is cached per distinct amount, so fan-out sends of the same
+# values format them once. ``data`` is a tuple of pairs because the cached
+# value is shared; pass ``dict(content.data)`` to messaging.Message.
+NOTIFICATION_CONTENT_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=NOTIFICATION_CONTENT_CACHE_SIZE)
+def build_budget_alert(category_name: str, spent_amount: float, budget_limit: float) -> NotificationContent:
+    percentage = (spent_amount / budget_limit) * 100
+    return NotificationContent(
+        title="🚨 Budget Alert!",
+        body=f"You've spent ${spent_amount:.2f} ({percentage:.1f}%) of your ${budget_limit:.2f} budget for {category_name}",
+        data=(
+            ('type', 'budget_alert'),
+            ('category_name', category_name),
+            ('spent_amount', str(spent_amount)),
+            ('budget_limit', str(budget_limit)),
+            ('percentage', str(percentage))
+        )
+    )
+
+
+@lru_cache(maxsize=NOTIFICATION_CONTENT_CACHE_SIZE)
+def build_weekly_summary(weekly_income: float, weekly_expense: float) -> NotificationContent:
+    balance = weekly_income - weekly_expense
+    status = "💚" if balance >= 0 else "🔴"
+    return NotificationContent(
+        title=f"{status} Weekly Summary",
+        body=f"Income: ${weekly_income:.2f}, Expenses: ${weekly_expense:.2f}, Balance: ${balance:.2f}",
+        data=(
+            ('type', 'weekly_summary'),
+            ('weekly_income', str(weekly_income)),
+            ('weekly_expense', str(weekly_expense)),
+            ('balance', str(balance)),
+            ('payload', 'reports')
+        )
+    )
+
+
+@lru_cache(maxsize=NOTIFICATION_CONTENT_CACHE_SIZE)
+def build_monthly_summary(monthly_income: float, monthly_expense: float, month: str) -> NotificationContent:
+    balance = monthly_income - monthly_expense
+    status = "💚" if balance >= 0 else "🔴"
+    return NotificationContent(
+        title=f"{status} Monthly Summary - {month}",
+        body=f"Income: ${monthly_income:.2f}, Expenses: ${monthly_expense:.2f}, Balance: ${balance:.2f}",
+        data=(
+            ('type', 'monthly_summary'),
+            ('monthly_income', str(monthly_income)),
+            ('monthly_expense', str(monthly_expense)),
+            ('balance', str(balance)),
+            ('month', month),
+            ('payload', 'reports')
+        )
+    )
+
+
+TRANSACTION_REMINDER = NotificationContent(
+    title="💰 Don't Forget to Track Your Expenses!",
+    body="Take a moment to record today's transactions and keep your budget on track.",
+    data=(
+        ('type', 'transaction_reminder'),
+        ('payload', 'add_transaction')
+    )
+)
+
+
+class NotificationDispatcher:
+    """Coalesces queued FCM messages and sends them with messaging.send_each_async"""
+
+    def __init__(
+        self,
+        batch_size: int = FCM_MAX_BATCH_SIZE,
+        batch_window: float = BATCH_WINDOW_SECONDS,
+        max_queue_size: int = NOTIFICATION_QUEUE_MAXSIZE,
+        max_concurrent_sends: int = MAX_CONCURRENT_SENDS
+    ):
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._send_slots = asyncio.Semaphore(max_concurrent_sends)
+        self._sending: Set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> asyncio.Task:
+        """Start the consumer task (call once from app startup)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    def enqueue(self, message: messaging.Message, user_id: Optional[str] = None):
+        """
+        Queue a message; user_id identifies the token to prune if FCM rejects it
+        
+        Raises asyncio.QueueFull when the backlog is at NOTIFICATION_QUEUE_MAXSIZE.
+        """
+        self.queue.put_nowait((user_id, message))
+
+    def enqueue_many(self, items: List[Tuple[Optional[str], messaging.Message]]):
+        """Queue ``(user_id, message)`` pairs, all or none; raises asyncio.QueueFull if they do not fit"""
+        if self.queue.maxsize and self.queue.maxsize - self.queue.qsize() < len(items):
+            raise asyncio.QueueFull
+        for item in items:
+            self.queue.put_nowait(item)
+
+    async def _next_batch(self) -> List[Tuple[Optional[str], messaging.Message]]:
+        """Wait for one message, then collect more until the batch is full or the window closes"""
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_window
+
+        while len(batch) < self.batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            await self._send_slots.acquire()
+            task = asyncio.create_task(self._send_batch(batch))
+            # Hold a reference so the task is not garbage collected mid-send
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+    
+    async def _send_batch(self, batch: List[Tuple[Optional[str], messaging.Message]]):
+        try:
+            await self._send(batch)
+        except Exception as e:
+            logger.error("Failed to send notification batch", size=len(batch), error=str(e), exc_info=e)
+        finally:
+            self._send_slots.release()
+
+    async def _send(self, batch: List[Tuple[Optional[str], messaging.Message]]):
+        # One awaited call multiplexes the whole batch over a shared HTTP/2 connection
+        response = await messaging.send_each_async([message for _, message in batch], app=firebase_app)
+
+        for (user_id, message), result in zip(batch, response.responses):
+            if result.success:
+                continue
+
+            logger.warning(
+                "Notification send failed",
+                user_id=user_id,
+                topic=message.topic,
+                error=str(result.exception)
+            )
+            # Remove invalid token (unless it was re-registered meanwhile)
+            if user_id is not None and isinstance(result.exception, INVALID_TOKEN_ERRORS):
+                await fcm_token_store.delete(user_id, token=message.token)
+
+        logger.info(
+            "Notification batch sent",
+            size=len(batch),
+            success_count=response.success_count,
+            failure_count=response.failure_count
+        )
+
+
+notification_dispatcher = NotificationDispatcher()
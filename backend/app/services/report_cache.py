@@ -0,0 +1,230 @@
+"""
+Report cache with per-month invalidation
+
+Every user has a version counter per calendar month ("YYYY-MM") plus one
+user-wide counter. A cached report stores the versions of the months it was
+built from; it is served only while all of them are unchanged. Transaction
+writes bump just the months they touch, so reports for untouched (typically
+closed) months keep hitting the cache.
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import uuid
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import redis
+
+from ..core.config import get_settings
+from ..core.logging import get_logger
+
+logger = get_logger("report_cache")
+
+REPORT_CACHE_TTL_SECONDS = 86400
+IN_MEMORY_MAX_ENTRIES = 1024
+# Version bumped by changes that affect every month (e.g. a category rename)
+ALL_MONTHS = "*"
+# Version bumped by every transaction write, for reports over open-ended ranges
+ANY_MONTH = "+"
+# Longer ranges depend on ANY_MONTH rather than on one version per month
+MAX_SCOPED_MONTHS = 36
+
+_MISS = object()
+
+
+def month_key(value: date) -> str:
+    return f"{value.year}-{value.month:02d}"
+
+
+def months_between(start_date: date, end_date: date) -> List[str]:
+    """Month keys covering start_date..end_date inclusive"""
+    months = []
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        months.append(f"{year}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def range_months(start_date: Optional[date], end_date: Optional[date]) -> List[str]:
+    """Scopes for a report over an optional date range"""
+    if start_date is None or end_date is None:
+        return [ANY_MONTH]
+    months = months_between(start_date, end_date)
+    return months if len(months) <= MAX_SCOPED_MONTHS else [ANY_MONTH]
+
+
+class InMemoryReportCacheBackend:
+    """Per-process backend for development (not shared across workers)"""
+
+    shared = False
+
+    def __init__(self, max_entries: int = IN_MEMORY_MAX_ENTRIES):
+        self.max_entries = max_entries
+        # Counters restart from zero with the process; the epoch keeps version
+        # tags from one run from matching those of another
+        self.epoch = uuid.uuid4().hex
+        self._versions: Dict[int, Dict[str, int]] = {}
+        self._entries: "OrderedDict[Tuple[int, str], str]" = OrderedDict()
+
+    def get_versions(self, user_id: int, scopes: Sequence[str]) -> List[int]:
+        versions = self._versions.get(user_id, {})
+        return [versions.get(scope, 0) for scope in scopes]
+
+    def bump(self, user_id: int, scopes: Iterable[str]):
+        versions = self._versions.setdefault(user_id, {})
+        for scope in scopes:
+            versions[scope] = versions.get(scope, 0) + 1
+
+    def get(self, user_id: int, key: str) -> Optional[str]:
+        value = self._entries.get((user_id, key))
+        if value is not None:
+            self._entries.move_to_end((user_id, key))
+        return value
+
+    def set(self, user_id: int, key: str, value: str):
+        self._entries[(user_id, key)] = value
+        self._entries.move_to_end((user_id, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class RedisReportCacheBackend:
+    """Backend shared by all workers: a version hash per user plus one key per report"""
+
+    shared = True
+    epoch = ""
+
+    def __init__(self, redis_url: str, ttl_seconds: int = REPORT_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.redis_client = redis.from_url(redis_url, decode_responses=True)
+
+    def get_versions(self, user_id: int, scopes: Sequence[str]) -> List[int]:
+        return [int(version or 0) for version in self.redis_client.hmget(f"report:v:{user_id}", scopes)]
+
+    def bump(self, user_id: int, scopes: Iterable[str]):
+        pipe = self.redis_client.pipeline(transaction=False)
+        for scope in scopes:
+            pipe.hincrby(f"report:v:{user_id}", scope, 1)
+        pipe.execute()
+
+    def get(self, user_id: int, key: str) -> Optional[str]:
+        return self.redis_client.get(f"report:{user_id}:{key}")
+
+    def set(self, user_id: int, key: str, value: str):
+        self.redis_client.set(f"report:{user_id}:{key}", value, ex=self.ttl_seconds)
+
+
+class ReportCache:
+    """Serve report dicts from the backend while their months are unchanged"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def get_or_compute(self, user_id: int, key: str, months: Iterable[str], compute: Callable[[], Any]) -> Any:
+        versions, data = self._lookup(user_id, key, months)
+        if data is _MISS:
+            data = compute()
+            if versions is not None:
+                self._store(user_id, key, versions, data)
+        return data
+
+    async def get_or_compute_async(
+        self, user_id: int, key: str, months: Iterable[str], compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """get_or_compute for coroutine ``compute``; backend calls run in a thread"""
+        versions, data = await asyncio.to_thread(self._lookup, user_id, key, list(months))
+        if data is _MISS:
+            data = await compute()
+            if versions is not None:
+                await asyncio.to_thread(self._store, user_id, key, versions, data)
+        return data
+
+    def _lookup(self, user_id: int, key: str, months: Iterable[str]) -> Tuple[Optional[List[int]], Any]:
+        """Current versions and the cached data, _MISS if stale (versions None if unavailable)"""
+        try:
+            # Versions are read before computing, so a write racing with the
+            # computation leaves the stored entry already stale
+            versions = self.backend.get_versions(user_id, [ALL_MONTHS, *months])
+            cached = self.backend.get(user_id, key)
+        except Exception as e:
+            logger.warning("Report cache unavailable", error=str(e))
+            return None, _MISS
+
+        if cached is not None:
+            entry = json.loads(cached)
+            if entry["versions"] == versions:
+                return versions, entry["data"]
+        return versions, _MISS
+
+    def _store(self, user_id: int, key: str, versions: List[int], data: Any):
+        try:
+            self.backend.set(user_id, key, json.dumps({"versions": versions, "data": data}, default=str))
+        except Exception as e:
+            logger.warning("Failed to store report in cache", error=str(e))
+
+    def version_tag(self, user_id: int, months: Iterable[str]) -> Optional[str]:
+        """Short digest of the current versions of ``months``; None if unavailable"""
+        try:
+            versions = self.backend.get_versions(user_id, [ALL_MONTHS, *months])
+        except Exception as e:
+            logger.warning("Report cache unavailable", error=str(e))
+            return None
+        return hashlib.blake2b(json.dumps([self.backend.epoch, versions]).encode(), digest_size=6).hexdigest()
+
+    def invalidate(self, user_id: int, dates: Iterable[date]):
+        """Mark the months containing ``dates`` (and open-ended ranges) as changed"""
+        self._bump(user_id, {ANY_MONTH, *(month_key(value) for value in dates if value is not None)})
+
+    def invalidate_user(self, user_id: int):
+        """Mark every month as changed"""
+        self._bump(user_id, [ALL_MONTHS])
+
+    def _bump(self, user_id: int, scopes: Iterable[str]):
+        try:
+            self.backend.bump(user_id, scopes)
+        except Exception as e:
+            logger.error("Failed to invalidate report cache", user_id=user_id, error=str(e))
+
+
+def cached_report(name: str, scope: Callable[..., Tuple[Sequence[Any], Iterable[str]]]):
+    """
+    Cache a ``ReportingService`` method taking ``(self, user_id, *args)``
+
+    ``scope(*args)`` returns the extra key parts and the month keys the
+    report is built from. The wrapped method also gets a ``version(user_id,
+    *args)`` attribute identifying the current report contents (None when
+    unknown), for use as an HTTP validator without computing the report.
+    """
+    def decorator(method):
+        def report_key(args) -> str:
+            key_parts, _ = scope(*args)
+            return ":".join([name, *map(str, key_parts)])
+
+        @functools.wraps(method)
+        def wrapper(self, user_id: int, *args):
+            _, months = scope(*args)
+            return report_cache.get_or_compute(user_id, report_key(args), months, lambda: method(self, user_id, *args))
+
+        def version(user_id: int, *args) -> Optional[str]:
+            _, months = scope(*args)
+            tag = report_cache.version_tag(user_id, months)
+            return None if tag is None else f"{report_key(args)}:{tag}"
+
+        wrapper.version = version
+        return wrapper
+    return decorator
+
+
+def _create_backend():
+    redis_url = get_settings().redis_url
+    if redis_url:
+        return RedisReportCacheBackend(redis_url)
+    return InMemoryReportCacheBackend()
+
+
+report_cache = ReportCache(_create_backend())
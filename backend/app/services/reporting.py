@@ -13,6 +13,34 @@ from collections import defaultdict
 from app.models.transaction import Transaction
 from app.models.category import Category
 from app.models.user import User
+from app.services.report_cache import cached_report, month_key, months_between
+
+# calendar.month_name re-formats the name through strftime on every lookup;
+# resolve the names once at import
+MONTH_NAMES = tuple(calendar.month_name)
+MONTH_SLUGS = tuple(name.lower() for name in MONTH_NAMES)
+
+
+def _month_bounds(year: int, month: int):
+    start_date = date(year, month, 1)
+    end_date = date(year, month, calendar.monthrange(year, month)[1])
+    return start_date, end_date
+
+
+def _trends_period(months: int):
+    end_date = date.today()
+    start_date = end_date.replace(day=1) - timedelta(days=months * 30)  # Approximate
+    return start_date, end_date
+
+
+def _previous_month(year: int, month: int):
+    return (year, month - 1) if month > 1 else (year - 1, 12)
+
+
+def _insights_scope(now: datetime):
+    prev_year, prev_month = _previous_month(now.year, now.month)
+    current = month_key(now)
+    return (current,), [current, f"{prev_year}-{prev_month:02d}"]
 
 
 class ReportingService:
@@ -21,36 +49,51 @@ class ReportingService:
     def __init__(self, db: Session):
         self.db = db
     
+    @cached_report("monthly", lambda year, month: ((year, month), [f"{year}-{month:02d}"]))
     def get_monthly_summary(self, user_id: int, year: int, month: int) -> Dict[str, Any]:
         """Get monthly financial summary for a user"""
         
         # Get start and end dates for the month
-        start_date = date(year, month, 1)
-        if month == 12:
-            end_date = date(year + 1, 1, 1) - timedelta(days=1)
-        else:
-            end_date = date(year, month + 1, 1) - timedelta(days=1)
+        start_date, end_date = _month_bounds(year, month)
         
-        # Query transactions for the month
-        transactions = self.db.query(
-            Transaction,
-            Category.type.label('category_type'),
+        month_filter = and_(
+            Transaction.user_id == user_id,
+            Transaction.trans_date >= start_date,
+            Transaction.trans_date <= end_date
+        )
+        
+        # Aggregate in the database rather than looping over every transaction
+        category_totals = self.db.query(
             Category.name.label('category_name'),
+            Category.type.label('category_type'),
             Category.icon.label('category_icon'),
-            Category.color.label('category_color')
+            Category.color.label('category_color'),
+            func.sum(Transaction.amount).label('total_amount'),
+            func.count(Transaction.id).label('transaction_count')
+        ).join(
+            Transaction, Category.id == Transaction.category_id
+        ).filter(
+            month_filter
+        ).group_by(
+            Category.id, Category.name, Category.type, Category.icon, Category.color
+        ).all()
+        
+        daily_totals = self.db.query(
+            Transaction.trans_date,
+            Category.type.label('category_type'),
+            func.sum(Transaction.amount).label('total_amount')
         ).join(
             Category, Transaction.category_id == Category.id
         ).filter(
-            and_(
-                Transaction.user_id == user_id,
-                Transaction.trans_date >= start_date,
-                Transaction.trans_date <= end_date
-            )
+            month_filter
+        ).group_by(
+            Transaction.trans_date, Category.type
         ).all()
         
         # Calculate totals
         total_income = Decimal('0')
         total_expense = Decimal('0')
+        transaction_count = 0
         category_breakdown = defaultdict(lambda: {
             'income': Decimal('0'),
             'expense': Decimal('0'),
@@ -65,22 +108,25 @@ class ReportingService:
             'balance': Decimal('0')
         })
         
-        for transaction, category_type, category_name, category_icon, category_color in transactions:
-            amount = transaction.amount
-            transaction_date = transaction.trans_date.strftime('%Y-%m-%d')
+        # Categories sharing a name are reported together
+        for result in category_totals:
+            amount = result.total_amount or Decimal('0')
             
-            if category_type == 'income':
+            if result.category_type == 'income':
                 total_income += amount
-                category_breakdown[category_name]['income'] += amount
-                daily_summary[transaction_date]['income'] += amount
+                category_breakdown[result.category_name]['income'] += amount
             else:
                 total_expense += amount
-                category_breakdown[category_name]['expense'] += amount
-                daily_summary[transaction_date]['expense'] += amount
+                category_breakdown[result.category_name]['expense'] += amount
             
-            category_breakdown[category_name]['count'] += 1
-            category_breakdown[category_name]['icon'] = category_icon or ''
-            category_breakdown[category_name]['color'] = category_color or ''
+            transaction_count += result.transaction_count
+            category_breakdown[result.category_name]['count'] += result.transaction_count
+            category_breakdown[result.category_name]['icon'] = result.category_icon or ''
+            category_breakdown[result.category_name]['color'] = result.category_color or ''
+        
+        for result in daily_totals:
+            day_data = daily_summary[result.trans_date.strftime('%Y-%m-%d')]
+            day_data['income' if result.category_type == 'income' else 'expense'] += result.total_amount or Decimal('0')
         
         # Calculate daily balances
         for day_data in daily_summary.values():
@@ -121,7 +167,7 @@ class ReportingService:
             'period': {
                 'year': year,
                 'month': month,
-                'month_name': calendar.month_name[month],
+                'month_name': MONTH_NAMES[month],
                 'start_date': start_date.isoformat(),
                 'end_date': end_date.isoformat(),
                 'days_in_month': (end_date - start_date).days + 1
@@ -130,7 +176,7 @@ class ReportingService:
                 'total_income': float(total_income),
                 'total_expense': float(total_expense),
                 'balance': float(balance),
-                'transaction_count': len(transactions),
+                'transaction_count': transaction_count,
                 'avg_daily_expense': float(total_expense / (end_date - start_date).days) if (end_date - start_date).days > 0 else 0,
                 'avg_daily_income': float(total_income / (end_date - start_date).days) if (end_date - start_date).days > 0 else 0
             },
@@ -138,20 +184,49 @@ class ReportingService:
             'daily_summary': daily_list
         }
     
+    @cached_report("yearly", lambda year: ((year,), [f"{year}-{month:02d}" for month in range(1, 13)]))
     def get_yearly_comparison(self, user_id: int, year: int) -> Dict[str, Any]:
         """Get yearly financial comparison by month"""
         
+        # One grouped query for the whole year instead of a summary per month
+        trans_month = extract('month', Transaction.trans_date)
+        results = self.db.query(
+            trans_month.label('month'),
+            Category.type.label('category_type'),
+            func.sum(Transaction.amount).label('total_amount'),
+            func.count(Transaction.id).label('transaction_count')
+        ).join(
+            Category, Transaction.category_id == Category.id
+        ).filter(
+            and_(
+                Transaction.user_id == user_id,
+                Transaction.trans_date >= date(year, 1, 1),
+                Transaction.trans_date < date(year + 1, 1, 1)
+            )
+        ).group_by(
+            trans_month, Category.type
+        ).all()
+        
+        totals = defaultdict(lambda: {'income': 0.0, 'expense': 0.0, 'transaction_count': 0})
+        for result in results:
+            month_totals = totals[int(result.month)]
+            if result.category_type == 'income':
+                month_totals['income'] += float(result.total_amount or 0)
+            else:
+                month_totals['expense'] += float(result.total_amount or 0)
+            month_totals['transaction_count'] += result.transaction_count
+        
         monthly_data = []
         
         for month in range(1, 13):
-            month_summary = self.get_monthly_summary(user_id, year, month)
+            month_totals = totals[month]
             monthly_data.append({
                 'month': month,
-                'month_name': calendar.month_name[month],
-                'income': month_summary['summary']['total_income'],
-                'expense': month_summary['summary']['total_expense'],
-                'balance': month_summary['summary']['balance'],
-                'transaction_count': month_summary['summary']['transaction_count']
+                'month_name': MONTH_NAMES[month],
+                'income': month_totals['income'],
+                'expense': month_totals['expense'],
+                'balance': month_totals['income'] - month_totals['expense'],
+                'transaction_count': month_totals['transaction_count']
             })
         
         # Calculate yearly totals
@@ -196,6 +271,10 @@ class ReportingService:
             }
         }
     
+    @cached_report(
+        "categories",
+        lambda start_date, end_date: ((start_date, end_date), months_between(start_date, end_date))
+    )
     def get_category_analysis(self, user_id: int, start_date: date, end_date: date) -> Dict[str, Any]:
         """Get detailed category analysis for a date range"""
         
@@ -275,11 +354,14 @@ class ReportingService:
             'expense_categories': expense_categories
         }
     
+    @cached_report(
+        "trends",
+        lambda months=6: ((months, date.today()), months_between(*_trends_period(months)))
+    )
     def get_spending_trends(self, user_id: int, months: int = 6) -> Dict[str, Any]:
         """Get spending trends for the last N months"""
         
-        end_date = date.today()
-        start_date = end_date.replace(day=1) - timedelta(days=months * 30)  # Approximate
+        start_date, end_date = _trends_period(months)
         
         # Get monthly spending for each category
         results = self.db.query(
@@ -346,6 +428,7 @@ class ReportingService:
             'trends': trend_data
         }
     
+    @cached_report("insights", lambda: _insights_scope(datetime.now()))
     def get_financial_insights(self, user_id: int) -> Dict[str, Any]:
         """Get financial insights and recommendations"""
         
@@ -354,8 +437,7 @@ class ReportingService:
         current_month = self.get_monthly_summary(user_id, now.year, now.month)
         
         # Get previous month data for comparison
-        prev_month = now.month - 1 if now.month > 1 else 12
-        prev_year = now.year if now.month > 1 else now.year - 1
+        prev_year, prev_month = _previous_month(now.year, now.month)
         previous_month = self.get_monthly_summary(user_id, prev_year, prev_month)
         
         # Calculate changes
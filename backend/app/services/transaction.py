@@ -1,66 +1,183 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
+import asyncio
+import base64
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, List, Optional, Tuple
 from datetime import date
 from fastapi import HTTPException, status
 from ..crud import transaction as crud_transaction
-from ..schemas.transaction import TransactionCreate, TransactionUpdate, TransactionFilter, TransactionSummary
+from ..schemas.transaction import (
+    Transaction as TransactionSchema, TransactionCreate, TransactionUpdate, TransactionFilter, TransactionSummary
+)
 from ..models.transaction import Transaction
+from .report_cache import ANY_MONTH, range_months, report_cache
+
+
+def _encode_cursor(transaction: Transaction) -> str:
+    """Opaque keyset cursor for the position just after ``transaction``"""
+    raw = f"{transaction.trans_date.isoformat()}:{transaction.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[date, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        trans_date, _, transaction_id = raw.partition(":")
+        return date.fromisoformat(trans_date), int(transaction_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def _transaction_key(transaction_id: int) -> str:
+    return f"tx:{transaction_id}"
+
+
+def _summary_key(start_date: Optional[date], end_date: Optional[date]) -> str:
+    return f"tx_summary:{start_date}:{end_date}"
 
 
 class TransactionService:
     @staticmethod
-    def get_transactions(
-        db: Session, 
+    async def get_transactions(
+        db: AsyncSession,
         user_id: int,
-        skip: int = 0, 
+        skip: int = 0,
         limit: int = 100,
-        filters: Optional[TransactionFilter] = None
-    ) -> List[Transaction]:
-        return crud_transaction.get_transactions(db, user_id, skip, limit, filters)
-    
+        filters: Optional[TransactionFilter] = None,
+        cursor: Optional[str] = None
+    ) -> dict:
+        before = _decode_cursor(cursor) if cursor else None
+        transactions = await crud_transaction.get_transactions(
+            db, user_id, skip, limit, filters, before=before
+        )
+        # A short, non-empty offset page (or an empty first page) already gives
+        # the total; only run COUNT(*) when it does not
+        if before is None and len(transactions) < limit and (transactions or skip == 0):
+            total = skip + len(transactions)
+        else:
+            total = await crud_transaction.count_transactions(db, user_id, filters)
+        return {
+            "transactions": transactions,
+            "total": total,
+            "next_cursor": _encode_cursor(transactions[-1]) if transactions and len(transactions) == limit else None
+        }
+
     @staticmethod
-    def get_transaction(db: Session, transaction_id: int, user_id: int) -> Transaction:
-        transaction = crud_transaction.get_transaction(db, transaction_id)
+    def stream_transactions(
+        db: AsyncSession,
+        user_id: int,
+        filters: Optional[TransactionFilter] = None,
+        cursor: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """NDJSON lines for every matching transaction, newest first"""
+        # Decoded up front so a bad cursor is a 400, not a broken stream
+        before = _decode_cursor(cursor) if cursor else None
+        
+        async def lines():
+            async for transaction in crud_transaction.stream_transactions(db, user_id, filters, before):
+                yield TransactionSchema.model_validate(transaction).model_dump_json().encode() + b"\n"
+        
+        return lines()
+
+    @staticmethod
+    async def get_transaction(db: AsyncSession, transaction_id: int, user_id: int) -> Transaction:
+        transaction = await crud_transaction.get_transaction(db, transaction_id)
         if not transaction or transaction.user_id != user_id:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Transaction not found"
             )
         return transaction
-    
+
+    @staticmethod
+    async def get_transaction_data(db: AsyncSession, transaction_id: int, user_id: int) -> dict:
+        """A transaction as response data, cached until the user's next write"""
+        async def compute():
+            transaction = await TransactionService.get_transaction(db, transaction_id, user_id)
+            return TransactionSchema.model_validate(transaction).model_dump(mode="json")
+        
+        # Category edits bump every scope, so the embedded category stays current
+        return await report_cache.get_or_compute_async(
+            user_id, _transaction_key(transaction_id), [ANY_MONTH], compute
+        )
+
+    @staticmethod
+    async def get_transaction_version(transaction_id: int, user_id: int) -> Optional[str]:
+        """Identifies the current get_transaction_data contents without loading them (None if unknown)"""
+        tag = await asyncio.to_thread(report_cache.version_tag, user_id, [ANY_MONTH])
+        return None if tag is None else f"{_transaction_key(transaction_id)}:{tag}"
+
+    @staticmethod
+    async def create_transaction(db: AsyncSession, transaction_data: TransactionCreate, user_id: int) -> Transaction:
+        transaction = await crud_transaction.create_transaction(db, transaction_data, user_id)
+        await asyncio.to_thread(report_cache.invalidate, user_id, [transaction.trans_date])
+        return transaction
+
     @staticmethod
-    def create_transaction(db: Session, transaction_data: TransactionCreate, user_id: int) -> Transaction:
-        return crud_transaction.create_transaction(db, transaction_data, user_id)
-    
+    async def create_transactions(db: AsyncSession, transactions: List[TransactionCreate], user_id: int) -> List[int]:
+        ids = await crud_transaction.create_transactions(db, transactions, user_id)
+        await asyncio.to_thread(
+            report_cache.invalidate, user_id, {transaction.trans_date for transaction in transactions}
+        )
+        return ids
+
     @staticmethod
-    def update_transaction(
-        db: Session, 
-        transaction_id: int, 
+    async def update_transaction(
+        db: AsyncSession,
+        transaction_id: int,
         transaction_data: TransactionUpdate,
         user_id: int
     ) -> Transaction:
-        transaction = crud_transaction.update_transaction(db, transaction_id, transaction_data, user_id)
+        # A moved transaction changes both its old and its new month, so only
+        # then is the old date read first
+        old_date = None
+        if "trans_date" in transaction_data.model_fields_set:
+            old_date = await crud_transaction.get_transaction_date(db, transaction_id)
+        transaction = await crud_transaction.update_transaction(db, transaction_id, transaction_data, user_id)
         if not transaction:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Transaction not found"
             )
+        await asyncio.to_thread(report_cache.invalidate, user_id, [old_date, transaction.trans_date])
         return transaction
-    
+
     @staticmethod
-    def delete_transaction(db: Session, transaction_id: int, user_id: int) -> bool:
-        if not crud_transaction.delete_transaction(db, transaction_id, user_id):
+    async def delete_transaction(db: AsyncSession, transaction_id: int, user_id: int) -> bool:
+        old_date = await crud_transaction.delete_transaction(db, transaction_id, user_id)
+        if old_date is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Transaction not found"
             )
+        await asyncio.to_thread(report_cache.invalidate, user_id, [old_date])
         return True
-    
+
     @staticmethod
-    def get_summary(
-        db: Session, 
+    async def get_summary(
+        db: AsyncSession,
         user_id: int,
         start_date: Optional[date] = None,
         end_date: Optional[date] = None
     ) -> TransactionSummary:
-        return crud_transaction.get_transaction_summary(db, user_id, start_date, end_date)
+        async def compute():
+            summary = await crud_transaction.get_transaction_summary(db, user_id, start_date, end_date)
+            return summary.model_dump(mode="json")
+        
+        # Served from the report cache until a write touches the range
+        data = await report_cache.get_or_compute_async(
+            user_id, _summary_key(start_date, end_date), range_months(start_date, end_date), compute
+        )
+        return TransactionSummary.model_validate(data)
+
+    @staticmethod
+    async def get_summary_version(
+        user_id: int,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Optional[str]:
+        """Identifies the current get_summary result without computing it (None if unknown)"""
+        tag = await asyncio.to_thread(report_cache.version_tag, user_id, range_months(start_date, end_date))
+        return None if tag is None else f"{_summary_key(start_date, end_date)}:{tag}"
@@ -0,0 +1,37 @@
+"""Add composite (user_id, id) index to categories
+
+Revision ID: 004_categories_user_id_id_index
+Revises: 003_transaction_attachments
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '004_categories_user_id_id_index'
+down_revision = '003_transaction_attachments'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Index categories for per-user keyset pages and owner-scoped lookups"""
+    
+    # CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_categories_user_id_id', 'categories', ['user_id', 'id'],
+            postgresql_concurrently=True
+        )
+        # The composite index serves every lookup the single-column one did
+        op.drop_index('idx_categories_user_id', table_name='categories', postgresql_concurrently=True)
+
+
+def downgrade():
+    """Restore the single-column user_id index"""
+    
+    with op.get_context().autocommit_block():
+        op.create_index('idx_categories_user_id', 'categories', ['user_id'], postgresql_concurrently=True)
+        op.drop_index('idx_categories_user_id_id', table_name='categories', postgresql_concurrently=True)
@@ -0,0 +1,40 @@
+"""Add covering (user_id, trans_date, category_id) index to transactions
+
+Revision ID: 005_transactions_report_index
+Revises: 004_categories_user_id_id_index
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005_transactions_report_index'
+down_revision = '004_categories_user_id_id_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Index transactions for per-user date-range report aggregates"""
+    
+    # CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        # INCLUDE (amount) lets report sums run as index-only scans
+        op.create_index(
+            'idx_transactions_user_id_trans_date', 'transactions',
+            ['user_id', 'trans_date', 'category_id'],
+            postgresql_include=['amount'],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    """Drop the report index"""
+    
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'idx_transactions_user_id_trans_date', table_name='transactions',
+            postgresql_concurrently=True
+        )
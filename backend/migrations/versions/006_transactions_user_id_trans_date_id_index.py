@@ -0,0 +1,38 @@
+"""Add (user_id, trans_date, id) index for keyset transaction pagination
+
+Revision ID: 006_transactions_keyset_index
+Revises: 005_transactions_report_index
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006_transactions_keyset_index'
+down_revision = '005_transactions_report_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Index transactions in list order so each cursor page is a single index seek"""
+    
+    # CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_transactions_user_id_trans_date_id', 'transactions',
+            ['user_id', 'trans_date', 'id'],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    """Drop the keyset pagination index"""
+    
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'idx_transactions_user_id_trans_date_id', table_name='transactions',
+            postgresql_concurrently=True
+        )
@@ -0,0 +1,40 @@
+"""Add (user_id, category_id, trans_date, id) index to transactions
+
+Revision ID: 007_transactions_category_index
+Revises: 006_transactions_keyset_index
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007_transactions_category_index'
+down_revision = '006_transactions_keyset_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Index transactions per category in list order"""
+
+    # CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        # Serves category-filtered pages and counts; the (user_id, category_id)
+        # prefix also covers per-category lookups
+        op.create_index(
+            'idx_transactions_user_id_category_id', 'transactions',
+            ['user_id', 'category_id', 'trans_date', 'id'],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    """Drop the per-category index"""
+
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'idx_transactions_user_id_category_id', table_name='transactions',
+            postgresql_concurrently=True
+        )
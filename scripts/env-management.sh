@@ -124,8 +124,8 @@ DB_PORT=5432
 DB_NAME=expense_tracker
 DB_USER=expense_tracker_user
 DB_PASSWORD=secure_database_password
-DB_POOL_SIZE=20
-DB_MAX_OVERFLOW=30
+DB_POOL_SIZE=5
+DB_MAX_OVERFLOW=5
 DB_POOL_TIMEOUT=30
 DB_POOL_RECYCLE=3600
 
@@ -433,8 +433,8 @@ DB_PORT=$DB_PORT
 DB_NAME=$DB_NAME
 DB_USER=$DB_USER
 DB_PASSWORD=$DB_PASSWORD
-DB_POOL_SIZE=20
-DB_MAX_OVERFLOW=30
+DB_POOL_SIZE=5
+DB_MAX_OVERFLOW=5
 DB_SSL_MODE=prefer
 
 # Redis Configuration